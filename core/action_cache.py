@@ -0,0 +1,179 @@
+import json
+import os
+import sys
+import threading
+import time
+from collections import OrderedDict
+
+try:
+    import persistence
+except ImportError:
+    # Fallback when imported as 'core.action_cache' (tests)
+    sys.path.append(os.path.dirname(__file__))
+    import persistence
+
+# --- PATH SETUP ---
+CURRENT_DIR = os.path.dirname(os.path.abspath(__file__))
+ROOT_DIR = os.path.dirname(CURRENT_DIR)
+PLAN_CACHE_FILE = os.path.join(ROOT_DIR, "data", "action_cache.json")
+
+# --- CONFIG ---
+MAX_PLANS = 256
+PLAN_TTL_S = 7 * 24 * 3600  # Re-resolve weekly even if nothing changed
+FORMAT_VERSION = 2  # v1 files could hold typed text
+PRIVATE_FIELDS = ("text",)  # Free-form user text never goes to disk
+
+
+def normalize_utterance(text):
+    """'Open Spotify.' and 'open spotify' are the same plan."""
+    return " ".join(text.lower().split()).rstrip(".?!, ")
+
+
+class ActionCache:
+    """
+    Persistent map from a spoken command to its fully resolved plan
+    (intent, slots, open target, app path), so repeating yourself skips
+    classification, extraction and the app search.
+
+    Plans that point into the app library remember which library version
+    they were resolved against and are dropped once a rescan changes it.
+    Plans carrying free-form user text (what to type) are not cached.
+    Writes go through one debounced writer thread (save_later()).
+    """
+
+    def __init__(self, path=PLAN_CACHE_FILE, max_plans=MAX_PLANS, ttl_s=PLAN_TTL_S):
+        self.path = path
+        self.max_plans = max_plans
+        self.ttl_s = ttl_s
+        self.lock = threading.Lock()
+        self.save_lock = threading.Lock()
+        self.plans = OrderedDict()  # utterance -> entry (least recent first)
+        self.dirty = False
+        self.hits = 0
+        self.misses = 0
+        self.expired = 0
+        self.invalidated = 0
+        self.evictions = 0
+        self._load()
+        self.saver = persistence.DebouncedSaver(self.save)
+
+    def _load(self):
+        if not os.path.exists(self.path):
+            return
+        try:
+            with open(self.path, "r", encoding="utf-8") as f:
+                data = json.load(f)
+            if data.get("version") != FORMAT_VERSION:
+                return
+            entries = sorted(data["plans"].items(), key=lambda kv: kv[1]["used"])
+        except Exception as e:
+            print(f"Action Cache Error: {e}")
+            return
+        for key, entry in entries[-self.max_plans :]:
+            self.plans[key] = entry
+
+    def get(self, utterance, library_version=None):
+        """Returns the cached plan, or None if missing, expired or stale."""
+        key = normalize_utterance(utterance)
+        now = time.time()
+        with self.lock:
+            entry = self.plans.get(key)
+            if entry is None:
+                self.misses += 1
+                return None
+            if now - entry["created"] > self.ttl_s:
+                del self.plans[key]
+                self.dirty = True
+                self.expired += 1
+                self.misses += 1
+                return None
+            if entry["library"] is not None and entry["library"] != library_version:
+                del self.plans[key]
+                self.dirty = True
+                self.invalidated += 1
+                self.misses += 1
+                return None
+            entry["used"] = now
+            self.plans.move_to_end(key)
+            self.dirty = True
+            self.hits += 1
+            return dict(entry["plan"])
+
+    def put(self, utterance, plan, library_version=None):
+        """
+        library_version: pass the app library version for plans that depend
+        on it (resolved app paths); leave None for websites.
+        Returns False for plans that carry user text and aren't cached.
+        """
+        if any(plan.get(f) or plan.get("slots", {}).get(f) for f in PRIVATE_FIELDS):
+            return False
+        key = normalize_utterance(utterance)
+        now = time.time()
+        with self.lock:
+            old = self.plans.get(key)
+            same = old and old["plan"] == plan and old["library"] == library_version
+            self.plans[key] = {
+                "plan": plan,
+                "library": library_version,
+                # Re-running a cached plan must not push back its expiry
+                "created": old["created"] if same else now,
+                "used": now,
+            }
+            self.plans.move_to_end(key)
+            while len(self.plans) > self.max_plans:
+                self.plans.popitem(last=False)
+                self.evictions += 1
+            self.dirty = True
+        return True
+
+    def forget(self, utterance):
+        """Drops one plan, e.g. when its app path stopped existing."""
+        with self.lock:
+            if self.plans.pop(normalize_utterance(utterance), None) is not None:
+                self.invalidated += 1
+                self.dirty = True
+
+    def invalidate_library(self):
+        """Drops every plan that was resolved against the app library."""
+        with self.lock:
+            stale = [k for k, e in self.plans.items() if e["library"] is not None]
+            for key in stale:
+                del self.plans[key]
+            self.invalidated += len(stale)
+            self.dirty = self.dirty or bool(stale)
+
+    def save_later(self):
+        """Queues a save on the writer thread; returns immediately."""
+        self.saver.request()
+
+    def close(self):
+        """Writes pending changes (used on shutdown)."""
+        self.saver.close()
+
+    def save(self):
+        """Atomic write, skipped when nothing changed since the last one."""
+        with self.save_lock:
+            with self.lock:
+                if not self.dirty:
+                    return
+                plans = {key: dict(entry) for key, entry in self.plans.items()}
+                self.dirty = False
+            try:
+                persistence.write_json(
+                    self.path, {"version": FORMAT_VERSION, "plans": plans}
+                )
+            except OSError as e:
+                print(f"Action Cache Error: {e}")
+
+    def stats(self):
+        with self.lock:
+            lookups = self.hits + self.misses
+            return {
+                "plans": len(self.plans),
+                "hits": self.hits,
+                "misses": self.misses,
+                "expired": self.expired,
+                "invalidated": self.invalidated,
+                "evictions": self.evictions,
+                "hit_rate": self.hits / lookups if lookups else 0.0,
+            }
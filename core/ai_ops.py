@@ -1,5 +1,6 @@
 import os
 import json
+import queue
 import threading
 import webbrowser
 import subprocess
@@ -10,14 +11,54 @@ from groq import Groq
 import google.generativeai as genai
 from PIL import ImageGrab, Image
 import cv2
-from fuzzywuzzy import process
+
+# --- LOCAL MODULES ---
+try:
+    import intent_rules
+    import intent_model
+    import conversation_store
+    import facts_index
+    import vector_index
+    import context_builder
+    import fact_learner
+    import model_clients
+    import request_policy
+    import model_selector
+    import app_index
+    import app_scanner
+    import app_launcher
+    import launch_history
+    import vision_pipeline
+    import window_ops
+except ImportError:
+    # Fallback when imported as 'core.ai_ops' (tests)
+    import sys
+
+    sys.path.append(os.path.dirname(__file__))
+    import intent_rules
+    import intent_model
+    import conversation_store
+    import facts_index
+    import vector_index
+    import context_builder
+    import fact_learner
+    import model_clients
+    import request_policy
+    import model_selector
+    import app_index
+    import app_scanner
+    import app_launcher
+    import launch_history
+    import vision_pipeline
+    import window_ops
 
 # --- PATH SETUP ---
 CURRENT_DIR = os.path.dirname(os.path.abspath(__file__))
 ROOT_DIR = os.path.dirname(CURRENT_DIR)
 DATA_DIR = os.path.join(ROOT_DIR, "data")
 APP_LIBRARY_FILE = os.path.join(DATA_DIR, "app_library.json")
-MEMORY_FILE = os.path.join(DATA_DIR, "vera_memory.json")
+LAUNCH_HISTORY_FILE = os.path.join(DATA_DIR, "launch_history.json")
+MEMORY_FILE = os.path.join(DATA_DIR, "vera_memory.json")  # Pre-JSONL history
 FACTS_FILE = os.path.join(DATA_DIR, "vera_facts.json")
 
 # Load environment variables
@@ -29,6 +70,26 @@ GOOGLE_API_KEY = os.getenv("GEMINI_API_KEY")
 MODEL_FAST = "llama-3.1-8b-instant"  # Speed (0.5s)
 MODEL_SMART = "llama-3.3-70b-versatile"  # Intelligence (2.0s)
 VISION_MODEL = "gemini-2.0-flash-exp"
+HISTORY_TURNS = 15  # Recent messages sent along with every question
+RECALL_TURNS = 3  # Older exchanges pulled back in by similarity
+RECALL_MIN_SCORE = 0.35  # Cosine; below this a "memory" is just noise
+TURN_QUEUE_SIZE = 64  # Exchanges waiting to be embedded; more are dropped
+# Prompt tokens per request; old turns beyond this get summarized instead
+CONTEXT_BUDGETS = {MODEL_FAST: 1200, MODEL_SMART: 3000}
+# Deadlines: past these the local fallback beats waiting any longer
+ROUTE_DEADLINE_S = 3.0  # Intent and slot calls (hedged at their p95)
+CHAT_DEADLINE_S = {MODEL_FAST: 8.0, MODEL_SMART: 20.0}
+VISION_DEADLINE_S = 20.0
+BACKGROUND_DEADLINE_S = 15.0  # Summaries and fact extraction
+DEGRADED_REPLY = "I can't reach my brain right now. Give me a minute."
+# Chat models per intent, best first, and the time-to-first-token each may take
+INTENT_MODELS = {"CHAT_DEEP": [MODEL_SMART, MODEL_FAST], "CHAT_FAST": [MODEL_FAST]}
+LATENCY_BUDGETS_S = {"CHAT_DEEP": 2.5, "CHAT_FAST": 1.0}
+WATCH_APPS = False  # Rescan shortcut folders in the background (no "scan" needed)
+# What of the screen is sent: None (all of it), "window" (the focused window)
+# or a (left, top, right, bottom) region
+VISION_CROP = None
+VISION_MAX_EDGE = 1600  # Screenshots are downscaled to this before upload
 
 # Safe Autofill Data
 USER_DATA = {
@@ -37,6 +98,18 @@ USER_DATA = {
     "address": "Cape Town, SA",
 }
 
+# Spoken site names that should open in the browser, not as an app
+KNOWN_WEBSITES = {
+    "google": "https://google.com",
+    "youtube": "https://youtube.com",
+    "youtube music": "https://music.youtube.com",
+    "gmail": "https://mail.google.com",
+    "github": "https://github.com",
+    "reddit": "https://reddit.com",
+    "chatgpt": "https://chatgpt.com",
+    "netflix": "https://netflix.com",
+}
+
 # --- SYSTEM INSTRUCTION (FIXED) ---
 SYSTEM_INSTRUCTION = (
     "Your name is Vera. "
@@ -47,185 +120,368 @@ SYSTEM_INSTRUCTION = (
 )
 
 # --- GLOBALS ---
-groq_client = None
-google_model = None
+intent_classifier = intent_model.IntentModel.load()  # None until trained
 
 
 # --- MEMORY SYSTEM (SHORT TERM) ---
-def load_memory():
-    if not os.path.exists(MEMORY_FILE):
-        return [{"role": "system", "content": SYSTEM_INSTRUCTION}]
-    try:
-        with open(MEMORY_FILE, "r") as f:
-            data = json.load(f)
-            # Ensure System Instruction is always up to date
-            if data and data[0]["role"] == "system":
-                data[0]["content"] = SYSTEM_INSTRUCTION
-            return data
-    except:
-        return [{"role": "system", "content": SYSTEM_INSTRUCTION}]
+# Append-only log; writes happen on its own thread, off the reply path
+conversation = conversation_store.ConversationStore()
+conversation_store.import_legacy(conversation, MEMORY_FILE)
+
 
+def load_memory(n=HISTORY_TURNS):
+    """The last n messages, newest last."""
+    return conversation.last(n)
 
-def save_memory(history):
+
+def save_memory(user_text, response_text):
+    """Records one exchange; returns immediately."""
+    with semantic_sync:
+        conversation.append("user", user_text)
+        conversation.append("assistant", response_text)
+        if not semantic:
+            return  # _load_semantic embeds it from the log once it is ready
     try:
-        if len(history) > 21:
-            history = [history[0]] + history[-20:]
-        with open(MEMORY_FILE, "w") as f:
-            json.dump(history, f, indent=2)
-    except Exception as e:
-        print(f"Memory Error: {e}")
+        turn_queue.put_nowait((user_text, response_text))
+    except queue.Full:
+        print("DEBUG: Semantic memory is behind; one exchange not embedded.")
 
 
-conversation_history = load_memory()
+def shutdown():
+    """Flushes background writers before the process exits."""
+    learner.close()
+    conversation.close()
+    history.close()
+    clients.close()
 
 
 # --- MEMORY SYSTEM (LONG TERM VAULT) ---
-def save_long_term_fact(fact):
-    """Saves a permanent truth about the user."""
-    facts = []
-    if os.path.exists(FACTS_FILE):
-        with open(FACTS_FILE, "r") as f:
-            facts = json.load(f)
+facts = facts_index.FactsIndex(FACTS_FILE)  # Loaded once, updated in place
 
-    if fact not in facts:
-        facts.append(fact)
-        with open(FACTS_FILE, "w") as f:
-            json.dump(facts, f, indent=2)
 
+def save_long_term_fact(fact):
+    """Saves a permanent truth about the user. False if already known."""
+    added = facts.add(fact)
+    if added:
+        with semantic_sync:
+            if semantic:
+                semantic.add([fact], kind="fact")
+    return added
+
+
+def get_relevant_facts(query, limit=3):
+    """Keyword matches first (BM25), then paraphrases from the vector index."""
+    found = [fact for fact, _ in facts.search(query, k=limit)]
+    if semantic and len(found) < limit:
+        for _, _, meta in semantic.search(
+            query, k=limit, kind="fact", min_score=RECALL_MIN_SCORE
+        ):
+            if meta["text"] not in found:
+                found.append(meta["text"])
+    return "\n".join(found[:limit])
+
+
+# --- MEMORY SYSTEM (SEMANTIC RECALL) ---
+semantic = None  # Loaded in the background; the embedder can take a moment
+# Held while publishing the index, so a fact or exchange saved during the
+# load is embedded exactly once: by the catch-up below or after it
+semantic_sync = threading.Lock()
+turn_queue = queue.Queue(maxsize=TURN_QUEUE_SIZE)
+
+
+def _turn_text(user_text, response_text):
+    return f"User: {user_text}\nVera: {response_text}"
+
+
+def _backfill_turns(index, history, known):
+    """Embeds the exchanges in history that aren't in known yet."""
+    for question, answer in zip(history, history[1:]):
+        if question["role"] == "user" and answer["role"] == "assistant":
+            text = _turn_text(question["content"], answer["content"])
+            if text not in known:
+                index.add([text], kind="turn", user=question["content"])
+                known.add(text)
+
+
+def _load_semantic():
+    global semantic
+    index = vector_index.VectorIndex(embedder=vector_index.default_embedder())
+    # First run, or exchanges an earlier run never got to
+    known = index.texts(kind="turn")
+    _backfill_turns(index, conversation.last(conversation_store.TAIL_SIZE), known)
+    with semantic_sync:
+        # Catch up on what was saved while the embedder was loading
+        _backfill_turns(index, conversation.last(conversation_store.TAIL_SIZE), known)
+        facts_known = index.texts(kind="fact")
+        index.add([f for f in list(facts.facts) if f not in facts_known], kind="fact")
+        semantic = index
+    print(f"DEBUG: Semantic memory ready ({len(index)} entries).")
+
+
+def _embed_turns():
+    """The one thread that embeds saved exchanges, in order."""
+    while True:
+        user_text, response_text = turn_queue.get()
+        try:
+            semantic.add(
+                [_turn_text(user_text, response_text)], kind="turn", user=user_text
+            )
+        except Exception as e:
+            print(f"Semantic Memory Error: {e}")
 
-def get_relevant_facts(query):
-    """Finds facts related to the current topic."""
-    if not os.path.exists(FACTS_FILE):
-        return ""
-    with open(FACTS_FILE, "r") as f:
-        facts = json.load(f)
-
-    # Simple keyword search to find relevant memories
-    relevant = [
-        f for f in facts if any(word in f.lower() for word in query.lower().split())
-    ]
-    if not relevant:
+
+def recall_turns(query, recent):
+    """Older exchanges similar to the query that aren't in 'recent' already."""
+    if not semantic:
         return ""
-    return "\n".join(relevant[:3])  # Limit to top 3
+    shown = {m["content"] for m in recent if m["role"] == "user"}
+    hits = semantic.search(
+        query, k=RECALL_TURNS + len(shown), kind="turn", min_score=RECALL_MIN_SCORE
+    )
+    turns = [meta["text"] for _, _, meta in hits if meta.get("user") not in shown]
+    return "\n".join(turns[:RECALL_TURNS])
 
 
-def _learn_fact_background(text):
-    """Background worker to extract facts without slowing down chat."""
-    if not groq_client:
-        return
-    try:
-        prompt = f"Extract a timeless fact about the user from: '{text}'. Return ONLY the fact (e.g. 'User lives in London'). If none, return NOTHING."
-        fact = (
-            groq_client.chat.completions.create(
-                messages=[{"role": "user", "content": prompt}], model=MODEL_FAST
-            )
-            .choices[0]
-            .message.content.strip()
-        )
+threading.Thread(target=_load_semantic, daemon=True).start()
+threading.Thread(target=_embed_turns, daemon=True).start()
 
-        if fact and "NOTHING" not in fact and len(fact) > 5:
-            save_long_term_fact(fact)
-            print(f"DEBUG: Learned -> {fact}")
-    except:
-        pass
+
+def _summarize_history(previous, messages):
+    """Folds messages that fell out of the context window into the summary."""
+    if not clients.get("groq"):
+        return None
+    lines = "\n".join(
+        f"{m['role'].upper()}: {context_builder.clip(m['content'])}" for m in messages
+    )
+    prompt = (
+        f"Running summary so far: {previous or '(none)'}\n"
+        f"New messages:\n{lines}\n"
+        "Update the summary of this conversation between the user and Vera. "
+        "Keep names, decisions and open questions. Under 80 words. "
+        "Return ONLY the summary."
+    )
+    completion = _groq_chat(
+        "summary",
+        deadline_s=BACKGROUND_DEADLINE_S,
+        messages=[{"role": "user", "content": prompt}],
+        model=MODEL_FAST,
+        temperature=0,
+        max_tokens=150,
+    )
+    return completion.choices[0].message.content
+
+
+context = context_builder.ContextBuilder(
+    summarize=_summarize_history, fetch=conversation.between
+)
+
+
+def _extract_facts(texts):
+    """One call for a whole batch of utterances; returns a list of facts."""
+    if not clients.get("groq"):
+        raise RuntimeError("Brain offline.")
+    lines = "\n".join(f"- {t}" for t in texts)
+    prompt = (
+        f"Utterances:\n{lines}\n"
+        "Extract timeless facts about the user (e.g. 'User lives in London'). "
+        'Reply with a JSON object: {"facts": ["..."]}. Use an empty list if none.'
+    )
+    completion = _groq_chat(
+        "facts",
+        deadline_s=BACKGROUND_DEADLINE_S,
+        messages=[{"role": "user", "content": prompt}],
+        model=MODEL_FAST,
+        temperature=0,
+        max_tokens=200,
+        response_format={"type": "json_object"},
+    )
+    found = json.loads(completion.choices[0].message.content).get("facts", [])
+    return [f.strip() for f in found if isinstance(f, str) and len(f.strip()) > 5]
+
+
+# Batches "my name is..." utterances into one extraction call at a time
+learner = fact_learner.FactLearner(_extract_facts, save_long_term_fact)
 
 
 # --- CONNECTION ---
-def _connect_brains():
-    global groq_client, google_model
-    try:
-        if GROQ_API_KEY:
-            groq_client = Groq(api_key=GROQ_API_KEY)
-            print("DEBUG: Brain connected.")
-    except:
-        pass
-    try:
-        if GOOGLE_API_KEY:
-            genai.configure(api_key=GOOGLE_API_KEY)
-            google_model = genai.GenerativeModel(VISION_MODEL)
-            print("DEBUG: Eyes connected.")
-    except:
-        pass
+def _connect_groq():
+    if not GROQ_API_KEY:
+        return None
+    # One keep-alive pool for every Groq call, so only the warm-up pays TLS
+    # max_retries=0: groq_policy owns retries, deadlines and hedging
+    return Groq(
+        api_key=GROQ_API_KEY,
+        http_client=model_clients.pooled_http_client(),
+        max_retries=0,
+    )
 
 
-bg_thread = threading.Thread(target=_connect_brains, daemon=True)
-bg_thread.start()
+def _warm_groq(client):
+    client.models.list()  # Free: opens the connection without spending tokens
+
+
+def _connect_gemini():
+    if not GOOGLE_API_KEY:
+        return None
+    genai.configure(api_key=GOOGLE_API_KEY)
+    return genai.GenerativeModel(VISION_MODEL)
+
+
+def _warm_gemini(model):
+    model.count_tokens("ping")
+
+
+clients = model_clients.ClientManager()
+clients.add(model_clients.Provider("groq", _connect_groq, _warm_groq))
+# Gemini talks gRPC, so its connect time isn't visible to the HTTP trace
+clients.add(
+    model_clients.Provider("gemini", _connect_gemini, _warm_gemini, traced=False)
+)
+clients.start()
+
+
+# Deadlines, hedging and circuit breaking for every model call
+groq_policy = request_policy.RequestPolicy("groq")
+gemini_policy = request_policy.RequestPolicy("gemini", deadline_s=VISION_DEADLINE_S)
+# Observed latency per model decides which one a chat request gets
+selector = model_selector.ModelSelector(INTENT_MODELS, LATENCY_BUDGETS_S)
+
+
+def _groq_chat(label, deadline_s=ROUTE_DEADLINE_S, hedge=False, **kwargs):
+    """
+    Every non-streamed Groq completion: pooled client, timed, bounded by
+    deadline_s. hedge=True races a duplicate once the call passes the p95
+    of earlier calls with the same label (the kind of call, not the model:
+    a 10-token classification and a 200-token extraction differ a lot).
+    """
+    client = clients.get("groq")
+    if not client:
+        raise RuntimeError("Brain offline.")
+    model = kwargs["model"]
+
+    def attempt(timeout):
+        with clients.timed("groq", model) as timer:
+            reply = client.chat.completions.create(timeout=timeout, **kwargs)
+        print(f"DEBUG: {timer}")
+        return reply
+
+    return groq_policy.call(
+        attempt,
+        label=label,
+        deadline_s=deadline_s,
+        hedge=hedge,
+        observe=lambda seconds: selector.observe(model, "chat", seconds),
+    )
+
+
+def model_stats():
+    """Client readiness and timings, plus deadline/hedge/breaker counters."""
+    report = clients.stats()
+    for name, policy in (("groq", groq_policy), ("gemini", gemini_policy)):
+        report[name]["policy"] = policy.stats()
+    report["groq"]["selector"] = selector.stats()
+    return report
 
 
 # --- APP SEARCH ENGINE ---
 def update_app_library():
-    """Scans Windows Start Menu for shortcuts."""
+    """Rescans the shortcut folders (only what changed); returns the app count."""
     print("DEBUG: Starting App Scan...")
-    paths = [
-        r"C:\ProgramData\Microsoft\Windows\Start Menu\Programs",
-        os.path.expanduser(r"~\AppData\Roaming\Microsoft\Windows\Start Menu\Programs"),
-    ]
-    app_map = {}
-    for path in paths:
-        for root, dirs, files in os.walk(path):
-            for file in files:
-                if file.endswith(".lnk"):
-                    clean_name = (
-                        file.lower().replace(".lnk", "").replace("shortcut", "").strip()
-                    )
-                    full_path = os.path.join(root, file)
-                    app_map[clean_name] = full_path
+    report = scanner.scan()
+    if report["added"] or report["removed"] or report["changed"]:
+        apps.invalidate()
+    print(
+        f"DEBUG: App scan: {report['apps']} apps (+{report['added']} "
+        f"-{report['removed']} ~{report['changed']}, {report['unchanged']} "
+        f"unchanged), {report['dirs_reused']}/{report['dirs']} folders reused, "
+        f"{report['ms']:.0f}ms"
+    )
+    return report["apps"]
+
+
+def app_library_version():
+    """Changes whenever a scan rewrites the library (0 before the first scan)."""
     try:
-        with open(APP_LIBRARY_FILE, "w") as f:
-            json.dump(app_map, f, indent=2)
-    except:
-        pass
+        return os.stat(APP_LIBRARY_FILE).st_mtime_ns
+    except OSError:
+        return 0
+
+
+# Loaded once, reloaded only when a scan rewrites the file
+apps = app_index.AppIndex(APP_LIBRARY_FILE)
+scanner = app_scanner.AppScanner(library_path=APP_LIBRARY_FILE)
+if WATCH_APPS:
+    app_scanner.AppWatcher(scanner, on_change=lambda report: apps.invalidate()).start()
+
+
+launcher = app_launcher.AppLauncher(list_windows=window_ops.list_window_ids)
+history = launch_history.LaunchHistory(LAUNCH_HISTORY_FILE)
+RANK_CANDIDATES = 5  # Fuzzy matches that launch history may re-order
+
+
+def find_app_entry(app_name):
+    """
+    The library entry (path + launch info + "name") for what was asked.
+    A query launched recently resolves from the hot cache; otherwise the
+    fuzzy matches above threshold are re-ranked by launch history.
+    """
+    name = history.hot(app_name)
+    entry = apps.get(name) if name else None
+    if entry is not None:
+        print(f"DEBUG: Found {name} (recent)")
+    else:
+        if name:
+            history.forget(app_name)  # Gone from the library since
+        matches = [
+            match
+            for match in apps.search(app_name, k=RANK_CANDIDATES)
+            if match[2] > app_index.MATCH_THRESHOLD
+        ]
+        if not matches:
+            return None
+        name, entry, score = history.rank(matches)[0]
+        print(f"DEBUG: Found {name} ({score}%)")
+    entry = entry if isinstance(entry, dict) else {"path": entry}
+    return dict(entry, name=name)
 
 
 def find_installed_app(app_name):
-    """Fuzzy search for an app in the library."""
-    if not os.path.exists(APP_LIBRARY_FILE):
-        return None
-    try:
-        with open(APP_LIBRARY_FILE, "r") as f:
-            app_map = json.load(f)
-        match, score = process.extractOne(app_name.lower(), list(app_map.keys()))
-        if score > 75:
-            print(f"DEBUG: Found {match} ({score}%)")
-            return app_map[match]
-    except:
-        pass
-    return None
+    """Fuzzy search for an app in the library; returns its shortcut path."""
+    entry = find_app_entry(app_name)
+    return entry["path"] if entry else None
 
 
-# --- ROUTER (CLASSIFIER) ---
-def identify_intent(user_command):
-    """Decides if the user wants to CHAT or RUN A COMMAND."""
-    cmd = user_command.lower().strip()
-
-    # 1. QUESTION GUARD (Prevents "Do you have access" -> CMD_TYPE)
-    question_starters = (
-        "what",
-        "who",
-        "where",
-        "when",
-        "why",
-        "how",
-        "do you",
-        "can you",
-        "are you",
-        "is there",
-    )
-    if cmd.startswith(question_starters):
-        if "generate" in cmd or "code" in cmd or "list" in cmd:
-            return "CHAT_DEEP"
-        return "CHAT_FAST"
+def search_installed_apps(app_name, k=5):
+    """Ranked [(name, entry, score)] for 'did you mean' style answers."""
+    return history.rank(apps.search(app_name, k=k))
+
+
+def launch_app(app_name, entry=None):
+    """
+    Starts an app (found by name unless entry is given), without a shell
+    when it can, and counts the launch in the history. False if unknown.
+    """
+    entry = entry or find_app_entry(app_name)
+    if not entry:
+        return False
+    launcher.launch(entry, app_name)
+    if entry.get("name"):
+        history.record(app_name, entry["name"])
+        history.save_later()
+    return True
+
+
+def launch_stats():
+    """Direct vs shell launches with timings, plus launch history counters."""
+    report = launcher.stats()
+    report["history"] = history.stats()
+    return report
 
-    # 2. KEYWORDS
-    if cmd.startswith("open "):
-        return "CMD_OPEN"
-    if "screenshot" in cmd:
-        return "CMD_SEE"
-    if "webcam" in cmd:
-        return "CMD_CAM"
 
-    # 3. AI CLASSIFICATION
-    if not groq_client:
+# --- ROUTER (CLASSIFIER) ---
+def _classify_with_llm(user_command):
+    """Network fallback for utterances the rule table can't place."""
+    if not clients.get("groq"):
         return "CHAT_FAST"
 
     prompt = f"""
@@ -236,23 +492,118 @@ def identify_intent(user_command):
     - CMD_SEE: Look at screen.
     - CMD_CAM: Check webcam.
     - CHAT_FAST: General conversation.
+    - CHAT_DEEP: Code, lists, long explanations.
     Return ONLY the code.
     """
     try:
-        completion = groq_client.chat.completions.create(
+        completion = _groq_chat(
+            "classify",
+            hedge=True,
             messages=[{"role": "user", "content": prompt}],
             model=MODEL_FAST,
             temperature=0,
             max_tokens=10,
         )
-        return completion.choices[0].message.content.strip()
+        label = completion.choices[0].message.content.strip()
+        # Every LLM answer becomes training data for the local model
+        intent_model.log_example(user_command, label)
+        return label
     except:
         return "CHAT_FAST"
 
 
+def _route_with_llm(user_command):
+    """
+    One JSON-mode round trip for intent *and* slots, so opening or typing
+    doesn't need a second extraction call. Returns None if the reply
+    doesn't validate; the caller then drops back to the label-only prompt.
+    Network errors are raised, since a second call would only fail again.
+    """
+    if not clients.get("groq"):
+        return None
+
+    prompt = f"""
+    Route this voice command: "{user_command}"
+    Reply with a JSON object:
+    {{"intent": "CMD_OPEN" | "CMD_TYPE" | "CMD_SEE" | "CMD_CAM" | "CHAT_FAST" | "CHAT_DEEP",
+      "target_type": "web" | "app" | null,
+      "target": "URL_OR_APP_NAME" | null,
+      "text": "TEXT_TO_TYPE" | null}}
+    - CMD_OPEN: open apps or websites (fill target_type and target).
+    - CMD_TYPE: type text (fill text with ONLY the words to type).
+    - CMD_SEE: look at the screen. CMD_CAM: check the webcam.
+    - CHAT_DEEP: code, lists, long explanations. CHAT_FAST: everything else.
+    Examples:
+    - "Open Google" -> {{"intent": "CMD_OPEN", "target_type": "web", "target": "https://google.com", "text": null}}
+    - "Launch Blender" -> {{"intent": "CMD_OPEN", "target_type": "app", "target": "blender", "text": null}}
+    """
+    completion = _groq_chat(
+        "route",
+        hedge=True,
+        messages=[{"role": "user", "content": prompt}],
+        model=MODEL_FAST,
+        temperature=0,
+        max_tokens=120,
+        response_format={"type": "json_object"},
+    )
+    try:
+        data = json.loads(completion.choices[0].message.content)
+    except ValueError as e:
+        print(f"Routing Error: {e}")
+        return None
+
+    route = intent_rules.validate_llm_route(data)
+    if route:
+        intent_model.log_example(user_command, route["intent"])
+    return route
+
+
+def route_command(user_command):
+    """
+    Returns {"intent", "slots", "rule"}.
+    The local rule table answers in microseconds, then the offline model if
+    it is confident enough; only what's left goes to the LLM (rule=None).
+    """
+    return intent_rules.route(
+        user_command,
+        classify=intent_classifier.predict if intent_classifier else None,
+        threshold=intent_model.CONFIDENCE_THRESHOLD,
+        route_llm=_route_with_llm,
+        label_llm=_classify_with_llm,
+        offline=groq_policy.breaker.is_open(),
+    )
+
+
+def identify_intent(user_command):
+    """Decides if the user wants to CHAT or RUN A COMMAND."""
+    return route_command(user_command)["intent"]
+
+
+def open_target_from_slots(slots):
+    """Turns an extracted 'target' into an open command without another call."""
+    target = slots.get("target")
+    if not target:
+        return None
+    if slots.get("type") in intent_rules.TARGET_TYPES:
+        return {"type": slots["type"], "target": target}  # Already resolved
+    if target in KNOWN_WEBSITES:
+        return {"type": "web", "target": KNOWN_WEBSITES[target]}
+    if "." in target and " " not in target:
+        url = target if target.startswith("http") else f"https://{target}"
+        return {"type": "web", "target": url}
+    return {"type": "app", "target": target}
+
+
+def type_text_from_slots(slots):
+    """Autofill fields or the literal text the rule captured."""
+    if slots.get("field") in USER_DATA:
+        return USER_DATA[slots["field"]]
+    return slots.get("text")
+
+
 # --- SMART EXTRACTION ---
 def extract_open_intent(user_command):
-    if not groq_client:
+    if not clients.get("groq"):
         return None
     prompt = f"""
     Extract target from: "{user_command}"
@@ -262,7 +613,9 @@ def extract_open_intent(user_command):
     - "Launch Blender" -> {{ "type": "app", "target": "blender" }}
     """
     try:
-        completion = groq_client.chat.completions.create(
+        completion = _groq_chat(
+            "extract_open",
+            hedge=True,
             messages=[{"role": "user", "content": prompt}],
             model=MODEL_FAST,
             temperature=0,
@@ -280,7 +633,7 @@ def extract_open_intent(user_command):
 
 
 def extract_type_intent(user_command):
-    if not groq_client:
+    if not clients.get("groq"):
         return None
     lower_cmd = user_command.lower()
     if "email" in lower_cmd:
@@ -290,7 +643,9 @@ def extract_type_intent(user_command):
 
     prompt = f"""User said: "{user_command}". Extract ONLY the text to type."""
     try:
-        completion = groq_client.chat.completions.create(
+        completion = _groq_chat(
+            "extract_type",
+            hedge=True,
             messages=[{"role": "user", "content": prompt}],
             model=MODEL_FAST,
             temperature=0,
@@ -329,97 +684,230 @@ def execute_open_command(command, speak_func):
             webbrowser.open(f"https://{target}")
             return
 
-    # Try App Library
-    path = find_installed_app(target)
-    if path:
-        os.startfile(path)
-        speak_func(f"Launching {target}")
-        return
-
-    # Windows Fallback
+    # Try App Library (no Start-menu typing: it steals focus and races)
     try:
-        pyautogui.press("win")
-        time.sleep(0.1)
-        pyautogui.write(target)
-        time.sleep(0.2)
-        pyautogui.press("enter")
-        speak_func(f"Searching for {target}")
-    except:
-        speak_func(f"I couldn't open {target}")
+        if launch_app(target):
+            speak_func(f"Launching {target}")
+            return
+    except OSError as e:
+        print(f"Launch Error: {e}")
+    speak_func(f"I couldn't open {target}")
 
 
 # --- CORE BRAIN (INTELLIGENT) ---
-def ask_brain(user_text, use_smart_model=False):
-    global conversation_history
-    if not groq_client:
-        return "Brain offline."
+def ask_brain_stream(user_text, use_smart_model=False):
+    """
+    Yields the reply as Groq generates it. The exchange is saved to memory
+    once the stream completes, so a half-read reply never becomes history.
+    """
+    if not clients.get("groq"):
+        yield "Brain offline."
+        return
 
-    # A. LEARN: Check if user shared a fact (Background Thread)
+    # A. LEARN: Check if user shared a fact (Background Queue)
     if any(
         x in user_text.lower() for x in ["my name is", "i live in", "i like", "i am a"]
     ):
-        threading.Thread(target=lambda: _learn_fact_background(user_text)).start()
+        learner.submit(user_text)
 
-    # B. RECALL: Get facts relevant to this exact question
+    # B. RECALL: Get facts relevant to this exact question, and older turns
     memory_context = get_relevant_facts(user_text)
+    first, recent = conversation.window(HISTORY_TURNS)
+    earlier = recall_turns(user_text, recent)
 
     # C. THINK: Inject memory into the system prompt (invisible to you)
-    system_msg = {
-        "role": "system",
-        "content": SYSTEM_INSTRUCTION + f"\nKNOWN FACTS:\n{memory_context}",
-    }
+    system_prompt = SYSTEM_INSTRUCTION + f"\nKNOWN FACTS:\n{memory_context}"
+    if earlier:
+        system_prompt += f"\nEARLIER CONVERSATION:\n{earlier}"
+
+    # Pick the best model that is currently fast enough for this intent
+    intent = "CHAT_DEEP" if use_smart_model else "CHAT_FAST"
+    model, reason = selector.choose(intent)
+    print(f"DEBUG: {intent} -> {model} ({reason})")
 
     # Create temporary history so we don't mess up the chat logs
-    # We use -15 to keep context but allow room for the memory injection
-    temp_history = (
-        [system_msg]
-        + conversation_history[-15:]
-        + [{"role": "user", "content": user_text}]
+    temp_history, report = context.build(
+        system_prompt, recent, user_text, CONTEXT_BUDGETS[model], first=first
     )
 
-    try:
-        completion = groq_client.chat.completions.create(
+    if groq_policy.breaker.is_open():
+        yield DEGRADED_REPLY
+        return
+    usage = None
+
+    def open_stream(timeout):
+        return clients.get("groq").chat.completions.create(
             messages=temp_history,
-            model=MODEL_SMART if use_smart_model else MODEL_FAST,
+            model=model,
             temperature=0.7,
             max_tokens=400 if use_smart_model else 150,
+            stream=True,
+            timeout=timeout,  # Also bounds each wait between chunks
         )
 
-        response_text = completion.choices[0].message.content.strip()
-
+    def text_of(chunk):
+        nonlocal usage
+        # Groq reports usage on the last chunk
+        usage = getattr(getattr(chunk, "x_groq", None), "usage", None) or usage
+        return chunk.choices[0].delta.content if chunk.choices else None
+
+    def finished(text):
+        print(
+            f"DEBUG: Prompt ~{report['prompt_tokens']}/{report['budget']} tokens "
+            f"(actual {getattr(usage, 'prompt_tokens', '?')}, "
+            f"kept {report['kept']}, dropped {report['dropped']}, "
+            f"clipped {report['clipped']})"
+        )
         # Save to Short-Term Memory (for flow)
-        conversation_history.append({"role": "user", "content": user_text})
-        conversation_history.append({"role": "assistant", "content": response_text})
-        save_memory(conversation_history)
+        if text.strip():
+            save_memory(user_text, text.strip())
 
-        return response_text
+    try:
+        with clients.timed("groq", model) as timer:
+            for delta in groq_policy.stream(
+                open_stream,
+                text_of,
+                label=f"{model}:stream",
+                deadline_s=CHAT_DEADLINE_S[model],
+                observe=lambda seconds: selector.observe(model, "stream", seconds),
+                on_complete=finished,  # Never called for a cut-off reply
+            ):
+                timer.first_token()
+                yield delta
+        print(f"DEBUG: {timer}")
+    except request_policy.CircuitOpen:
+        yield DEGRADED_REPLY
     except Exception as e:
-        return f"Brain Error: {e}"
+        yield f"Brain Error: {e}"
 
 
-def see_screen(user_prompt="Describe this"):
-    if not google_model:
-        return "Vision offline."
+def ask_brain(user_text, use_smart_model=False):
+    return "".join(ask_brain_stream(user_text, use_smart_model)).strip()
+
+
+vision_answers = vision_pipeline.AnswerCache()
+vision_reports = vision_pipeline.VisionReports()
+
+
+def vision_stats():
+    """Bytes uploaded, end-to-end latency and answer-cache hits."""
+    report = vision_reports.stats()
+    report["cache"] = vision_answers.stats()
+    return report
+
+
+def _stream_vision(parts, failure, outcome=None):
+    """Yields Gemini's answer chunk by chunk, or 'failure' if it errors first."""
+    sent = False
+    try:
+        gemini_policy.allow()
+    except request_policy.CircuitOpen:
+        yield "Vision is having trouble right now."
+        return
+    start = time.monotonic()
+    try:
+        with clients.timed("gemini", VISION_MODEL) as timer:
+            for chunk in clients.get("gemini").generate_content(
+                parts, stream=True, request_options={"timeout": VISION_DEADLINE_S}
+            ):
+                if time.monotonic() - start > VISION_DEADLINE_S:
+                    raise request_policy.DeadlineExceeded(
+                        f"vision took longer than {VISION_DEADLINE_S:.0f}s"
+                    )
+                if chunk.text:
+                    timer.first_token()
+                    sent = True
+                    yield chunk.text
+        print(f"DEBUG: {timer}")
+        gemini_policy.record(VISION_MODEL, time.monotonic() - start, True)
+        if outcome is not None:
+            outcome["ok"] = True
+    except Exception as e:
+        gemini_policy.record(VISION_MODEL, time.monotonic() - start, False)
+        print(f"Vision Error: {e}")
+        if not sent:
+            yield failure
+
+
+def _see(label, user_prompt, image, failure, start, box=None, cache=True):
+    """
+    Crops, downscales and compresses the capture, then answers from the
+    cache if this exact screen was just asked the same thing, else from
+    Gemini. Bytes sent and time since capture are reported either way.
+    Camera frames never repeat exactly, so they pass cache=False.
+    """
+    prepared = vision_pipeline.prepare(image, box=box, max_edge=VISION_MAX_EDGE)
+    report = {
+        key: prepared[key] for key in ("original", "size", "format", "bytes", "prep_ms")
+    }
+    report.update(label=label, cached=False)
+    try:
+        answer = vision_answers.get(prepared["digest"], user_prompt) if cache else None
+        if answer is not None:
+            report.update(cached=True, bytes=0)
+            yield answer
+            return
+        outcome = {}
+        parts = []
+        for chunk in _stream_vision([user_prompt, prepared["blob"]], failure, outcome):
+            parts.append(chunk)
+            yield chunk
+        if cache and outcome.get("ok"):
+            vision_answers.put(prepared["digest"], user_prompt, "".join(parts))
+    finally:
+        report["total_ms"] = (time.monotonic() - start) * 1000
+        vision_reports.add(report)
+
+
+def _vision_box():
+    if VISION_CROP == "window":
+        return window_ops.active_window_box()
+    return VISION_CROP
+
+
+def see_screen_stream(user_prompt="Describe this"):
+    if not clients.get("gemini"):
+        yield "Vision offline."
+        return
+    start = time.monotonic()
     try:
         screenshot = ImageGrab.grab()
-        response = google_model.generate_content([user_prompt, screenshot])
-        return response.text
     except:
-        return "Screen capture failed."
+        yield "Screen capture failed."
+        return
+    yield from _see(
+        "screen",
+        user_prompt,
+        screenshot,
+        "Screen capture failed.",
+        start,
+        _vision_box(),
+    )
 
 
-def see_camera(user_prompt="Describe this"):
-    if not google_model:
-        return "Camera offline."
+def see_screen(user_prompt="Describe this"):
+    return "".join(see_screen_stream(user_prompt))
+
+
+def see_camera_stream(user_prompt="Describe this"):
+    if not clients.get("gemini"):
+        yield "Camera offline."
+        return
+    start = time.monotonic()
     cap = cv2.VideoCapture(0)
     if not cap.isOpened():
-        return "Camera broken."
+        yield "Camera broken."
+        return
     ret, frame = cap.read()
     cap.release()
     if not ret:
-        return "Camera error."
+        yield "Camera error."
+        return
 
     rgb = cv2.cvtColor(frame, cv2.COLOR_BGR2RGB)
     img = Image.fromarray(rgb)
-    response = google_model.generate_content([user_prompt, img])
-    return response.text
+    yield from _see("camera", user_prompt, img, "Camera error.", start, cache=False)
+
+
+def see_camera(user_prompt="Describe this"):
+    return "".join(see_camera_stream(user_prompt))
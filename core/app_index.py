@@ -0,0 +1,198 @@
+import heapq
+import json
+import os
+import random
+import sys
+import threading
+import time
+from collections import Counter
+
+from fuzzywuzzy import fuzz, process
+
+# --- PATH SETUP ---
+CURRENT_DIR = os.path.dirname(os.path.abspath(__file__))
+ROOT_DIR = os.path.dirname(CURRENT_DIR)
+APP_LIBRARY_FILE = os.path.join(ROOT_DIR, "data", "app_library.json")
+
+# --- CONFIG ---
+PREFILTER = 20  # Trigram candidates that get a full fuzzy score
+MATCH_THRESHOLD = 75  # Same bar as the old extractOne lookup
+
+
+def normalize_name(name):
+    return " ".join(name.lower().split())
+
+
+def trigrams(text):
+    """Character trigrams with word-boundary padding ("vlc" -> " vl", "vlc", "lc ")."""
+    padded = f" {normalize_name(text)} "
+    return {padded[i : i + 3] for i in range(len(padded) - 2)}
+
+
+class AppIndex:
+    """
+    The app library, loaded once and kept in memory. A trigram inverted
+    index narrows thousands of names down to PREFILTER candidates; only
+    those get the (slow) fuzzy score. The file is re-read only when its
+    mtime changes, i.e. after a scan.
+    """
+
+    def __init__(self, path=APP_LIBRARY_FILE, prefilter=PREFILTER):
+        self.path = path
+        self.prefilter = prefilter
+        self.lock = threading.Lock()
+        self.version = None  # mtime_ns of the loaded file
+        self.names = []
+        self.entries = []
+        self.postings = {}  # trigram -> [name ids]
+        self.exact = {}  # normalized name -> id
+        self.loads = 0
+
+    def _current_version(self):
+        try:
+            return os.stat(self.path).st_mtime_ns
+        except OSError:
+            return 0
+
+    def _ensure_fresh(self):
+        version = self._current_version()
+        if version == self.version:
+            return
+        app_map = {}
+        if version:
+            try:
+                with open(self.path, "r") as f:
+                    app_map = json.load(f)
+            except Exception as e:
+                print(f"App Index Error: {e}")
+        self.build(app_map)
+        self.version = version
+        self.loads += 1
+
+    def build(self, app_map):
+        """Indexes {name: entry}; also used directly by tests and benchmarks."""
+        self.names = list(app_map)
+        self.entries = [app_map[name] for name in self.names]
+        self.postings = {}
+        self.exact = {}
+        for i, name in enumerate(self.names):
+            self.exact.setdefault(normalize_name(name), i)
+            for gram in trigrams(name):
+                self.postings.setdefault(gram, []).append(i)
+
+    def get(self, name):
+        """Entry for a name exactly as listed, or None (no fuzzy scoring)."""
+        with self.lock:
+            if self.path:
+                self._ensure_fresh()
+            i = self.exact.get(normalize_name(name))
+            return None if i is None else self.entries[i]
+
+    def invalidate(self):
+        with self.lock:
+            self.version = None
+
+    def search(self, query, k=5):
+        """
+        Best matches first: [(name, entry, score)], score 0-100. A name
+        said exactly as listed is the only match, whatever k is.
+        """
+        with self.lock:
+            if self.path:
+                self._ensure_fresh()
+            query = normalize_name(query)
+            if query in self.exact:
+                i = self.exact[query]  # Said exactly as it's listed
+                return [(self.names[i], self.entries[i], 100)]
+            grams = trigrams(query)
+            shared = Counter()
+            for gram in grams:
+                shared.update(self.postings.get(gram, ()))
+            if not shared:
+                return []
+
+            # Names sharing the most query trigrams; shorter ones win ties
+            def overlap(item):
+                i, count = item
+                return count, -len(self.names[i])
+
+            candidates = [
+                i
+                for i, _ in heapq.nlargest(self.prefilter, shared.items(), key=overlap)
+            ]
+            scored = [
+                (self.names[i], self.entries[i], fuzz.WRatio(query, self.names[i]))
+                for i in candidates
+            ]
+        scored.sort(key=lambda match: match[2], reverse=True)
+        return scored[:k]
+
+    def find(self, query, threshold=MATCH_THRESHOLD):
+        """The library entry of the best match above threshold, or None."""
+        matches = self.search(query, k=1)
+        if matches and matches[0][2] > threshold:
+            return matches[0][1]
+        return None
+
+    def __len__(self):
+        with self.lock:
+            if self.path:
+                self._ensure_fresh()
+            return len(self.names)
+
+
+def benchmark(n_apps=10000, n_queries=200):
+    """Synthetic library: index lookup vs the old load + extractOne path (ms)."""
+    rng = random.Random(0)
+    vendors = [f"vendor{i}" for i in range(300)]
+    products = [f"app{i}" for i in range(2000)]
+    suffixes = ["", "studio", "player", "editor", "manager", "tools", "2024"]
+    app_map = {}
+    while len(app_map) < n_apps:
+        name = " ".join(
+            w
+            for w in (rng.choice(vendors), rng.choice(products), rng.choice(suffixes))
+            if w
+        )
+        app_map[name] = f"C:\\Start Menu\\{name}.lnk"
+    queries = [rng.choice(list(app_map)).split(" ", 1)[1] for _ in range(n_queries)]
+
+    index = AppIndex(path="")
+    start = time.perf_counter()
+    index.build(app_map)
+    build_ms = (time.perf_counter() - start) * 1000
+
+    def measure(lookup, queries):
+        latencies = []
+        for query in queries:
+            start = time.perf_counter()
+            lookup(query)
+            latencies.append((time.perf_counter() - start) * 1000)
+        latencies.sort()
+        return (
+            sum(latencies) / len(latencies),
+            latencies[int(len(latencies) * 0.95)],
+        )
+
+    index_mean, index_p95 = measure(index.find, queries)
+    blob = json.dumps(app_map)
+
+    def old_lookup(query):
+        names = json.loads(blob)  # The old path re-read the file every call
+        process.extractOne(query, list(names.keys()))
+
+    # extractOne is slow enough that a few queries tell the story
+    old_mean, old_p95 = measure(old_lookup, queries[:10])
+    return {
+        "apps": len(app_map),
+        "build_ms": build_ms,
+        "index_mean_ms": index_mean,
+        "index_p95_ms": index_p95,
+        "extractone_mean_ms": old_mean,
+        "extractone_p95_ms": old_p95,
+    }
+
+
+if __name__ == "__main__":
+    # Usage: python core/app_index.py [n_apps]
+    print(benchmark(int(sys.argv[1]) if len(sys.argv) > 1 else 10000))
@@ -0,0 +1,204 @@
+import os
+import shutil
+import subprocess
+import sys
+import threading
+import time
+from collections import deque
+
+try:
+    import metrics
+except ImportError:
+    # Fallback when imported as 'core.app_launcher' (tests)
+    sys.path.append(os.path.dirname(__file__))
+    import metrics
+
+# --- CONFIG ---
+WINDOW_TIMEOUT_S = 15.0  # Stop watching for the app's window after this
+WINDOW_POLL_S = 0.05
+TIMING_WINDOW = 50  # Launches kept per method for percentiles
+SCRIPT_SUFFIXES = (".bat", ".cmd")  # Need cmd.exe, so they go through the shell
+
+if sys.platform == "win32":
+    # Own process group, no console window: the app outlives VERA
+    SPAWN_OPTIONS = {
+        "creationflags": subprocess.DETACHED_PROCESS
+        | subprocess.CREATE_NEW_PROCESS_GROUP
+    }
+else:
+    SPAWN_OPTIONS = {"start_new_session": True}
+
+
+def shell_open(path):
+    """The old way: the shell resolves the shortcut or name by association."""
+    if hasattr(os, "startfile"):
+        os.startfile(path)
+    else:
+        subprocess.Popen(
+            ["xdg-open", path], stdout=subprocess.DEVNULL, stderr=subprocess.DEVNULL
+        )
+
+
+class AppLauncher:
+    """
+    Starts app library entries ({"path", "target", "args", "cwd"}).
+
+    An entry whose target was resolved at scan time is exec'd directly:
+    no shell, no shortcut lookup, no keystrokes. Anything else (advertised
+    shortcuts, batch files, old bare-path libraries) falls back to
+    shell_open(path).
+
+    Every launch records its spawn time; with list_windows (returns the
+    ids of the open top-level windows) it also records launch-to-window
+    time, i.e. how long until a window that wasn't there before appears.
+    """
+
+    def __init__(
+        self,
+        list_windows=None,
+        window_timeout_s=WINDOW_TIMEOUT_S,
+        poll_s=WINDOW_POLL_S,
+        opener=shell_open,
+    ):
+        self.list_windows = list_windows
+        self.window_timeout_s = window_timeout_s
+        self.poll_s = poll_s
+        self.opener = opener
+        self.lock = threading.Lock()
+        self.timings = {
+            method: {
+                "spawn": deque(maxlen=TIMING_WINDOW),
+                "window": deque(maxlen=TIMING_WINDOW),
+            }
+            for method in ("direct", "shell")
+        }
+        self.launches = {"direct": 0, "shell": 0}
+        self.counters = {"failed": 0, "window_timeouts": 0}
+
+    def launch(self, entry, label=None):
+        """Starts one entry; returns "direct" or "shell". Raises OSError."""
+        label = label or os.path.basename(entry.get("path") or "app")
+        before = self._windows()
+        start = time.perf_counter()
+        method = "direct"
+        try:
+            started = self._exec(entry)
+        except OSError as e:
+            print(f"Launch Error: {e}")
+            started = False
+        try:
+            if not started:
+                method = "shell"
+                if not entry.get("path"):
+                    raise FileNotFoundError(f"Nothing to launch for {label}")
+                self.opener(entry["path"])
+        except OSError:
+            with self.lock:
+                self.counters["failed"] += 1
+            raise
+
+        spawn_ms = (time.perf_counter() - start) * 1000
+        with self.lock:
+            self.launches[method] += 1
+            self.timings[method]["spawn"].append(spawn_ms)
+        print(f"DEBUG: Launched {label} ({method}, {spawn_ms:.0f}ms)")
+        if before is not None:
+            threading.Thread(
+                target=self._watch_window,
+                args=(before, start, method, label),
+                daemon=True,
+            ).start()
+        return method
+
+    def launch_command(self, command, label=None):
+        """A bare program name ("notepad", "code"), found on PATH without a shell."""
+        entry = {
+            "path": command,
+            "target": shutil.which(command),
+            "args": [],
+            "cwd": None,
+        }
+        return self.launch(entry, label or command)
+
+    def _exec(self, entry):
+        """True once the target is running; False if it can't be exec'd."""
+        target = entry.get("target")
+        if not target or not os.path.isfile(target):
+            return False  # Unresolved, or uninstalled since the scan
+        if target.lower().endswith(SCRIPT_SUFFIXES):
+            return False
+        cwd = entry.get("cwd")
+        if not cwd or not os.path.isdir(cwd):
+            cwd = os.path.dirname(target)
+        subprocess.Popen(
+            [target, *entry.get("args", [])],
+            cwd=cwd,
+            stdin=subprocess.DEVNULL,
+            stdout=subprocess.DEVNULL,
+            stderr=subprocess.DEVNULL,
+            close_fds=True,
+            **SPAWN_OPTIONS,
+        )
+        return True
+
+    def _windows(self):
+        if not self.list_windows:
+            return None
+        try:
+            return set(self.list_windows())
+        except Exception as e:
+            print(f"Launch Error: {e}")
+            return None
+
+    def _watch_window(self, before, start, method, label):
+        deadline = start + self.window_timeout_s
+        while time.perf_counter() < deadline:
+            time.sleep(self.poll_s)
+            current = self._windows()
+            if current and current - before:
+                window_ms = (time.perf_counter() - start) * 1000
+                with self.lock:
+                    self.timings[method]["window"].append(window_ms)
+                print(f"DEBUG: {label} window after {window_ms:.0f}ms ({method})")
+                return
+        # Single-instance apps just focus their existing window
+        with self.lock:
+            self.counters["window_timeouts"] += 1
+
+    def stats(self):
+        """Launch counts, and spawn / launch-to-window ms per method."""
+        with self.lock:
+            report = dict(self.counters)
+            for method, timings in self.timings.items():
+                spawn = list(timings["spawn"])
+                window = list(timings["window"])
+                report[method] = {
+                    "launches": self.launches[method],
+                    "spawn_p50_ms": metrics.percentile(spawn, 50),
+                    "window_p50_ms": metrics.percentile(window, 50),
+                    "window_p90_ms": metrics.percentile(window, 90),
+                    "windows_seen": len(window),
+                }
+        return report
+
+
+def benchmark(runs=20):
+    """Spawn-to-exit ms of the same program, exec'd directly vs via the shell."""
+    argv = [sys.executable, "-c", "pass"]
+
+    def measure(spawn):
+        latencies = []
+        for _ in range(runs):
+            start = time.perf_counter()
+            spawn().wait()
+            latencies.append((time.perf_counter() - start) * 1000)
+        return metrics.percentile(latencies, 50)
+
+    direct = measure(lambda: subprocess.Popen(argv))
+    shell = measure(lambda: subprocess.Popen(subprocess.list2cmdline(argv), shell=True))
+    return {"runs": runs, "direct_p50_ms": direct, "shell_p50_ms": shell}
+
+
+if __name__ == "__main__":
+    # Usage: python core/app_launcher.py [runs]
+    print(benchmark(int(sys.argv[1]) if len(sys.argv) > 1 else 20))
@@ -0,0 +1,440 @@
+import json
+import os
+import shlex
+import shutil
+import struct
+import sys
+import threading
+import time
+from concurrent.futures import FIRST_COMPLETED, ThreadPoolExecutor, wait
+
+try:
+    import persistence
+except ImportError:
+    # Fallback when imported as 'core.app_scanner' (tests)
+    sys.path.append(os.path.dirname(__file__))
+    import persistence
+
+# --- PATH SETUP ---
+CURRENT_DIR = os.path.dirname(os.path.abspath(__file__))
+ROOT_DIR = os.path.dirname(CURRENT_DIR)
+DATA_DIR = os.path.join(ROOT_DIR, "data")
+APP_LIBRARY_FILE = os.path.join(DATA_DIR, "app_library.json")
+MANIFEST_FILE = os.path.join(DATA_DIR, "app_manifest.json")
+
+# --- CONFIG ---
+if sys.platform == "win32":
+    SCAN_ROOTS = [
+        r"C:\ProgramData\Microsoft\Windows\Start Menu\Programs",
+        os.path.expanduser(r"~\AppData\Roaming\Microsoft\Windows\Start Menu\Programs"),
+    ]
+else:
+    SCAN_ROOTS = [
+        "/usr/share/applications",
+        "/usr/local/share/applications",
+        "/var/lib/flatpak/exports/share/applications",
+        "/var/lib/snapd/desktop/applications",
+        os.path.expanduser("~/.local/share/applications"),
+    ]
+SHORTCUT_FORMATS = (".lnk", ".desktop")
+SCAN_WORKERS = 8
+WATCH_INTERVAL_S = 30.0
+# A directory touched this recently may change again within the same mtime
+# tick, so its manifest entry isn't trusted yet
+RACY_S = 2.0
+FORMAT_VERSION = 2  # 2: library entries carry launch metadata
+
+# --- SHELL LINK (.lnk) LAYOUT ---
+LNK_HEADER_SIZE = 0x4C
+HAS_ID_LIST = 0x01
+HAS_LINK_INFO = 0x02
+HAS_NAME = 0x04
+HAS_RELATIVE_PATH = 0x08
+HAS_WORKING_DIR = 0x10
+HAS_ARGUMENTS = 0x20
+HAS_ICON_LOCATION = 0x40
+IS_UNICODE = 0x80
+ENV_BLOCK_SIGNATURE = 0xA0000001
+# Exec= field codes are for file managers passing files/URLs; we pass none
+DESKTOP_FIELD_CODES = {
+    "%f",
+    "%F",
+    "%u",
+    "%U",
+    "%d",
+    "%D",
+    "%n",
+    "%N",
+    "%i",
+    "%c",
+    "%k",
+    "%v",
+    "%m",
+}
+
+
+def read_desktop_entry(path):
+    """The [Desktop Entry] group of a freedesktop .desktop file as a dict."""
+    entry = {}
+    group = None
+    try:
+        with open(path, "r", encoding="utf-8", errors="replace") as f:
+            for line in f:
+                line = line.strip()
+                if not line or line.startswith("#"):
+                    continue
+                if line.startswith("["):
+                    group = line
+                elif group == "[Desktop Entry]" and "=" in line:
+                    key, value = line.split("=", 1)
+                    entry.setdefault(key.strip(), value.strip())
+    except OSError:
+        pass
+    return entry
+
+
+def _c_string(data, offset, wide=False):
+    if wide:
+        end = offset
+        while end + 1 < len(data) and data[end : end + 2] != b"\0\0":
+            end += 2
+        return data[offset:end].decode("utf-16-le", errors="replace")
+    end = data.find(b"\0", offset)
+    return data[offset : end if end >= 0 else len(data)].decode(
+        "mbcs" if sys.platform == "win32" else "latin-1", errors="replace"
+    )
+
+
+def split_windows_args(args):
+    """A Windows command line tail as a list (quotes group, backslashes kept)."""
+    argv, current, quoted, started = [], [], False, False
+    for ch in args:
+        if ch == '"':
+            quoted = not quoted
+            started = True
+        elif ch in " \t" and not quoted:
+            if started:
+                argv.append("".join(current))
+                current, started = [], False
+        else:
+            current.append(ch)
+            started = True
+    if started:
+        argv.append("".join(current))
+    return argv
+
+
+def read_lnk(path):
+    """
+    Target, arguments and working directory of a Windows shortcut, read
+    straight from the Shell Link format (no COM, no shell). Returns None
+    for files that aren't shortcuts. target is None for links without a
+    file target, e.g. MSI "advertised" shortcuts; those still need the
+    shell to launch.
+    """
+    try:
+        with open(path, "rb") as f:
+            data = f.read()
+        if len(data) < LNK_HEADER_SIZE:
+            return None
+        (header_size,) = struct.unpack_from("<I", data, 0)
+        if header_size != LNK_HEADER_SIZE:
+            return None
+        (flags,) = struct.unpack_from("<I", data, 0x14)
+        pos = LNK_HEADER_SIZE
+        if flags & HAS_ID_LIST:
+            (id_list_size,) = struct.unpack_from("<H", data, pos)
+            pos += 2 + id_list_size
+
+        target = None
+        if flags & HAS_LINK_INFO:
+            info_size, info_header_size, info_flags = struct.unpack_from(
+                "<III", data, pos
+            )
+            # LocalBasePathOffset, (network link offset), CommonPathSuffixOffset
+            base_offset, suffix_offset = struct.unpack_from("<I4xI", data, pos + 16)
+            if info_flags & 1:  # VolumeIDAndLocalBasePath
+                if info_header_size >= 0x24:
+                    base_w, suffix_w = struct.unpack_from("<II", data, pos + 28)
+                    target = _c_string(data, pos + base_w, wide=True) + _c_string(
+                        data, pos + suffix_w, wide=True
+                    )
+                else:
+                    target = _c_string(data, pos + base_offset) + _c_string(
+                        data, pos + suffix_offset
+                    )
+            pos += info_size
+
+        wide = bool(flags & IS_UNICODE)
+        strings = {}
+        for flag in (
+            HAS_NAME,
+            HAS_RELATIVE_PATH,
+            HAS_WORKING_DIR,
+            HAS_ARGUMENTS,
+            HAS_ICON_LOCATION,
+        ):
+            if flags & flag:
+                (count,) = struct.unpack_from("<H", data, pos)
+                size = count * 2 if wide else count
+                raw = data[pos + 2 : pos + 2 + size]
+                strings[flag] = raw.decode(
+                    "utf-16-le" if wide else "latin-1", errors="replace"
+                )
+                pos += 2 + size
+
+        # %ProgramFiles%-style targets live in an extra data block
+        while pos + 8 <= len(data):
+            block_size, signature = struct.unpack_from("<II", data, pos)
+            if block_size < 8:
+                break
+            if signature == ENV_BLOCK_SIGNATURE and block_size >= 0x314:
+                env_target = _c_string(data, pos + 8 + 260, wide=True) or _c_string(
+                    data, pos + 8
+                )
+                if env_target:
+                    target = os.path.expandvars(env_target)
+                break
+            pos += block_size
+
+        if not target and HAS_RELATIVE_PATH in strings:
+            target = os.path.normpath(
+                os.path.join(os.path.dirname(path), strings[HAS_RELATIVE_PATH])
+            )
+    except (OSError, struct.error):
+        return None
+    cwd = os.path.expandvars(strings.get(HAS_WORKING_DIR, "")) or None
+    args = split_windows_args(os.path.expandvars(strings.get(HAS_ARGUMENTS, "")))
+    return {"target": target or None, "args": args, "cwd": cwd}
+
+
+def parse_desktop_exec(entry):
+    """
+    Launch metadata from a .desktop entry's Exec/Path keys. target is None
+    for terminal apps and commands that aren't installed.
+    """
+    try:
+        argv = shlex.split(entry.get("Exec", ""))
+    except ValueError:
+        argv = []
+    argv = [arg.replace("%%", "%") for arg in argv if arg not in DESKTOP_FIELD_CODES]
+    if not argv or entry.get("Terminal") == "true":
+        return {"target": None, "args": [], "cwd": None}
+    target = argv[0] if os.path.isabs(argv[0]) else shutil.which(argv[0])
+    return {"target": target, "args": argv[1:], "cwd": entry.get("Path") or None}
+
+
+def read_shortcut(path):
+    """
+    (spoken name, library entry) for a shortcut file, or None if it
+    shouldn't be listed. The entry keeps the shortcut path plus what it
+    launches: {"path", "target", "args", "cwd"}.
+    """
+    file_name = os.path.basename(path)
+    if file_name.endswith(".desktop"):
+        entry = read_desktop_entry(path)
+        if entry.get("Type", "Application") != "Application":
+            return None
+        if entry.get("NoDisplay") == "true" or entry.get("Hidden") == "true":
+            return None
+        name = entry.get("Name") or file_name[: -len(".desktop")]
+        launch = parse_desktop_exec(entry)
+    else:
+        name = os.path.splitext(file_name)[0].lower().replace("shortcut", "")
+        launch = read_lnk(path) or {"target": None, "args": [], "cwd": None}
+    name = " ".join(name.lower().split())
+    if not name:
+        return None
+    return name, dict(path=path, **launch)
+
+
+class AppScanner:
+    """
+    Incremental Start Menu / applications scanner.
+
+    The manifest remembers, per directory, its mtime, the shortcuts in it
+    and its subdirectories. A directory's mtime only changes when entries
+    are added, removed or renamed in it, so an unchanged directory costs
+    one stat: its shortcuts are reused and only its subdirectories are
+    visited. Directories are scanned in parallel.
+    """
+
+    def __init__(
+        self,
+        roots=None,
+        formats=SHORTCUT_FORMATS,
+        library_path=APP_LIBRARY_FILE,
+        manifest_path=MANIFEST_FILE,
+        workers=SCAN_WORKERS,
+    ):
+        self.roots = list(roots or SCAN_ROOTS)
+        self.formats = tuple(formats)
+        self.library_path = library_path
+        self.manifest_path = manifest_path
+        self.workers = workers
+        self.scan_lock = threading.Lock()
+        self.manifest = self._load_manifest()
+        self.last = None  # Report of the most recent scan
+
+    def _load_manifest(self):
+        try:
+            with open(self.manifest_path, "r") as f:
+                data = json.load(f)
+            header = data.get("header", {})
+            # Different roots or formats would reuse the wrong shortcuts
+            if header == self._header():
+                return data.get("dirs", {})
+        except Exception:
+            pass
+        return {}
+
+    def _header(self):
+        return {
+            "version": FORMAT_VERSION,
+            "roots": self.roots,
+            "formats": list(self.formats),
+        }
+
+    def _scan_dir(self, path, now):
+        """(record, reused) for one directory; record is None if it's gone."""
+        try:
+            mtime = os.stat(path).st_mtime_ns
+        except OSError:
+            return None, False
+        known = self.manifest.get(path)
+        if known and known["mtime"] == mtime and now - mtime / 1e9 > RACY_S:
+            return known, True
+
+        apps = {}
+        subdirs = []
+        try:
+            with os.scandir(path) as entries:
+                for entry in entries:
+                    try:
+                        if entry.is_dir(follow_symlinks=False):
+                            subdirs.append(entry.path)
+                        elif entry.name.lower().endswith(self.formats):
+                            shortcut = read_shortcut(entry.path)
+                            if shortcut:
+                                apps[shortcut[0]] = shortcut[1]
+                    except OSError:
+                        continue
+        except OSError:
+            return None, False
+        return {"mtime": mtime, "apps": apps, "subdirs": sorted(subdirs)}, False
+
+    def scan(self, save=True):
+        """
+        Brings the library up to date and returns a report:
+        apps, added, removed, changed, unchanged, dirs, dirs_reused, ms.
+        """
+        with self.scan_lock:
+            start = time.perf_counter()
+            now = time.time()
+            previous = self._merge(self.manifest)
+            dirs = {}
+            reused = 0
+            with ThreadPoolExecutor(max_workers=self.workers) as pool:
+                pending = {
+                    pool.submit(self._scan_dir, root, now): root for root in self.roots
+                }
+                while pending:
+                    done, _ = wait(list(pending), return_when=FIRST_COMPLETED)
+                    for future in done:
+                        path = pending.pop(future)
+                        record, was_reused = future.result()
+                        if record is None:
+                            continue
+                        dirs[path] = record
+                        reused += was_reused
+                        for sub in record["subdirs"]:
+                            pending[pool.submit(self._scan_dir, sub, now)] = sub
+
+            self.manifest = dirs
+            apps = self._merge(dirs)
+            report = {
+                "apps": len(apps),
+                "added": sum(1 for n in apps if n not in previous),
+                "removed": sum(1 for n in previous if n not in apps),
+                "changed": sum(
+                    1 for n in apps if n in previous and previous[n] != apps[n]
+                ),
+                "unchanged": sum(
+                    1 for n in apps if n in previous and previous[n] == apps[n]
+                ),
+                "dirs": len(dirs),
+                "dirs_reused": reused,
+                "ms": (time.perf_counter() - start) * 1000,
+            }
+            if save:
+                # Rewriting an unchanged library would bump its mtime and
+                # throw away every index and cached plan built on it
+                changed = apps != previous or not os.path.exists(self.library_path)
+                self._save(apps if changed else None, reused < len(dirs))
+            self.last = report
+            return report
+
+    def _merge(self, dirs):
+        """One name -> entry map; later roots win, like the old full scan."""
+        apps = {}
+        for root in self.roots:
+            prefix = root.rstrip("\\/")
+            for path in sorted(dirs):
+                if path == prefix or path.startswith(prefix + os.sep):
+                    apps.update(dirs[path]["apps"])
+        return apps
+
+    def library(self):
+        return self._merge(self.manifest)
+
+    def _save(self, apps, manifest_changed):
+        try:
+            if apps is not None:
+                persistence.write_json(self.library_path, apps, indent=2)
+            if manifest_changed or apps is not None:
+                persistence.write_json(
+                    self.manifest_path,
+                    {"header": self._header(), "dirs": self.manifest},
+                    indent=2,
+                )
+        except Exception as e:
+            print(f"App Scan Error: {e}")
+
+
+class AppWatcher:
+    """
+    Keeps the library fresh without "scan for apps": rescans every
+    interval_s (cheap, thanks to the manifest) and calls on_change(report)
+    when apps were added, removed or moved.
+    """
+
+    def __init__(self, scanner, on_change=None, interval_s=WATCH_INTERVAL_S):
+        self.scanner = scanner
+        self.on_change = on_change
+        self.interval_s = interval_s
+        self.stop_event = threading.Event()
+        self.thread = None
+
+    def start(self):
+        if self.thread is None:
+            self.thread = threading.Thread(target=self._run, daemon=True)
+            self.thread.start()
+        return self
+
+    def _run(self):
+        while not self.stop_event.wait(self.interval_s):
+            try:
+                report = self.scanner.scan()
+            except Exception as e:
+                print(f"App Watch Error: {e}")
+                continue
+            if report["added"] or report["removed"] or report["changed"]:
+                print(
+                    f"DEBUG: Apps changed (+{report['added']} "
+                    f"-{report['removed']} ~{report['changed']})"
+                )
+                if self.on_change:
+                    self.on_change(report)
+
+    def stop(self):
+        self.stop_event.set()
@@ -0,0 +1,162 @@
+import threading
+
+# --- CONFIG ---
+CHARS_PER_TOKEN = 4  # Good enough for English; we only need a budget, not a bill
+MESSAGE_OVERHEAD = 4  # Role markers etc. per chat message
+MAX_MESSAGE_TOKENS = 300  # Older messages longer than this get clipped
+CLIP_MARKER = " ...[trimmed]... "
+FOLD_BATCH = 40  # Messages per summary call
+FOLD_BACKLOG = 60  # At startup, older messages than this go unsummarized
+
+
+def estimate_tokens(text):
+    return len(text) // CHARS_PER_TOKEN + 1
+
+
+def message_tokens(message):
+    return estimate_tokens(message["content"]) + MESSAGE_OVERHEAD
+
+
+def clip(text, max_tokens=MAX_MESSAGE_TOKENS):
+    """Keeps the head and tail of a long message (a stack trace's top and error)."""
+    max_chars = max_tokens * CHARS_PER_TOKEN
+    if len(text) <= max_chars:
+        return text
+    head = int(max_chars * 0.6)
+    tail = max_chars - head - len(CLIP_MARKER)
+    return text[:head] + CLIP_MARKER + text[-tail:]
+
+
+class ContextBuilder:
+    """
+    Fits system prompt + history + question into a token budget. Recent
+    messages are kept newest-first until the budget runs out; whatever
+    falls off is folded into a rolling summary by a background thread, so
+    a request only ever uses a summary that is already computed.
+
+    Messages are identified by their position in the conversation log:
+    history[0] sits at position `first`. Messages that aged out of the
+    history window (positions below `first`) are pulled with
+    fetch(start, end) -> messages so they get folded too.
+
+    summarize(previous_summary, messages) -> str does the folding (an LLM
+    call); without it old messages are simply dropped.
+    """
+
+    def __init__(
+        self, summarize=None, fetch=None, max_message_tokens=MAX_MESSAGE_TOKENS
+    ):
+        self.summarize = summarize
+        self.fetch = fetch
+        self.max_message_tokens = max_message_tokens
+        self.lock = threading.Lock()
+        self.summary = ""
+        self.summary_upto = None  # Highest log position folded into the summary
+        self.folding = False
+        self.requests = 0
+        self.prompt_tokens = 0
+        self.raw_tokens = 0  # What we would have sent without a budget
+        self.summaries = 0
+
+    def build(self, system, history, user_text, budget, first=0):
+        """Returns (messages, report). first is the log position of history[0]."""
+        question = {"role": "user", "content": user_text}
+        used = estimate_tokens(system) + MESSAGE_OVERHEAD + message_tokens(question)
+        raw = used + sum(message_tokens(m) for m in history)
+
+        with self.lock:
+            if self.summary_upto is None:
+                backlog = FOLD_BACKLOG if self.fetch else 0
+                self.summary_upto = first - backlog - 1
+            summary, summary_upto = self.summary, self.summary_upto
+
+        summary_tokens = estimate_tokens(summary) if summary else 0
+        kept = []
+        clipped = 0
+        cut = len(history)
+        for i in range(len(history) - 1, -1, -1):
+            message = history[i]
+            if i < len(history) - 2:  # Leave the last exchange verbatim
+                content = clip(message["content"], self.max_message_tokens)
+                if content != message["content"]:
+                    clipped += 1
+                    message = {"role": message["role"], "content": content}
+            cost = message_tokens(message)
+            if used + summary_tokens + cost > budget:
+                break
+            kept.append(message)
+            used += cost
+            cut = i
+        kept.reverse()
+
+        dropped = history[:cut]
+        if summary and (dropped or first > 0):
+            system = f"{system}\nSUMMARY OF EARLIER CONVERSATION:\n{summary}"
+            used += summary_tokens
+        else:
+            summary_tokens = 0
+
+        if self.summarize and summary_upto + 1 < first + cut:
+            self._fold_later(history, first, cut, summary_upto + 1)
+
+        report = {
+            "prompt_tokens": used,
+            "budget": budget,
+            "kept": len(kept),
+            "dropped": len(dropped),
+            "clipped": clipped,
+            "summary_tokens": summary_tokens,
+        }
+        with self.lock:
+            self.requests += 1
+            self.prompt_tokens += used
+            self.raw_tokens += raw
+        messages = [{"role": "system", "content": system}] + kept + [question]
+        return messages, report
+
+    def _fold_later(self, history, first, cut, start):
+        """Folds positions start..first+cut-1, oldest first, FOLD_BATCH at a time."""
+        with self.lock:
+            if self.folding:
+                return  # The next request will pick up whatever is still pending
+            self.folding = True
+            previous = self.summary
+        end = min(first + cut, start + FOLD_BATCH)
+        messages = history[max(0, start - first) : max(0, end - first)]
+        threading.Thread(
+            target=self._fold,
+            args=(previous, start, end, messages, first),
+            daemon=True,
+        ).start()
+
+    def _fold(self, previous, start, end, messages, first):
+        try:
+            if start < first and self.fetch:
+                # Aged out of the window since the last fold
+                messages = self.fetch(start, min(end, first)) + messages
+            upto = end - 1
+            summary = self.summarize(previous, messages) if messages else None
+            if summary:
+                with self.lock:
+                    self.summary = summary.strip()
+                    self.summary_upto = max(self.summary_upto, upto)
+                    self.summaries += 1
+            elif not messages:
+                with self.lock:  # Compacted away: nothing left to fold
+                    self.summary_upto = max(self.summary_upto, upto)
+        except Exception as e:
+            print(f"Summary Error: {e}")
+        finally:
+            with self.lock:
+                self.folding = False
+
+    def stats(self):
+        with self.lock:
+            return {
+                "requests": self.requests,
+                "prompt_tokens": self.prompt_tokens,
+                "raw_tokens": self.raw_tokens,
+                "saved_tokens": self.raw_tokens - self.prompt_tokens,
+                "summaries": self.summaries,
+                "summary_tokens": estimate_tokens(self.summary) if self.summary else 0,
+            }
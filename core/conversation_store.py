@@ -0,0 +1,220 @@
+import json
+import os
+import queue
+import threading
+import time
+from collections import deque
+
+# --- PATH SETUP ---
+CURRENT_DIR = os.path.dirname(os.path.abspath(__file__))
+ROOT_DIR = os.path.dirname(CURRENT_DIR)
+DATA_DIR = os.path.join(ROOT_DIR, "data")
+CONVERSATION_LOG = os.path.join(DATA_DIR, "conversation.jsonl")
+
+# --- CONFIG ---
+TAIL_SIZE = 200  # Messages kept in RAM for last(n)
+MAX_LOG_BYTES = 8 * 1024 * 1024  # Compact once the log grows past this
+COMPACT_KEEP = 2000  # Messages that survive a compaction
+READ_BLOCK = 64 * 1024
+
+_COMPACT = object()
+_STOP = object()
+
+
+def read_tail(path, n, block_size=READ_BLOCK):
+    """
+    Last n records of a JSONL file, reading backwards from the end so the
+    cost depends on n, not on how long the file has grown.
+    """
+    if n <= 0 or not os.path.exists(path):
+        return []
+    with open(path, "rb") as f:
+        f.seek(0, os.SEEK_END)
+        pos = f.tell()
+        data = b""
+        while pos > 0 and data.count(b"\n") <= n:
+            step = min(block_size, pos)
+            pos -= step
+            f.seek(pos)
+            data = f.read(step) + data
+    records = []
+    for line in data.splitlines()[-(n + 1) :]:
+        try:
+            records.append(json.loads(line))
+        except ValueError:
+            continue  # Partial first line or a torn write at the end
+    return records[-n:]
+
+
+def _message(record):
+    return {"role": record["role"], "content": record["content"]}
+
+
+class ConversationStore:
+    """
+    Append-only chat log. append() only touches an in-memory deque and a
+    queue; a writer thread batches the queued lines onto the end of the
+    file and compacts it (rewrite + atomic rename) when it grows too big.
+    """
+
+    def __init__(
+        self,
+        path=CONVERSATION_LOG,
+        tail_size=TAIL_SIZE,
+        max_bytes=MAX_LOG_BYTES,
+        compact_keep=COMPACT_KEEP,
+    ):
+        self.path = path
+        self.max_bytes = max_bytes
+        self.compact_keep = compact_keep
+        self.tail = deque(read_tail(path, tail_size), maxlen=tail_size)
+        # Log position of the next message; the tail read at startup sits
+        # at 0..len-1, anything older on disk has negative positions
+        self.total = len(self.tail)
+        self.lock = threading.Lock()
+        self.pending = queue.Queue()
+        self.appended = 0
+        self.written = 0
+        self.compactions = 0
+        self.writer = threading.Thread(target=self._write_loop, daemon=True)
+        self.writer.start()
+
+    def append(self, role, content):
+        record = {"role": role, "content": content, "ts": time.time()}
+        with self.lock:
+            self.tail.append(record)
+            self.appended += 1
+            self.total += 1
+        self.pending.put(json.dumps(record, ensure_ascii=False))
+        return record
+
+    def last(self, n):
+        """The newest n messages as {"role", "content"} dicts, oldest first."""
+        return self.window(n)[1]
+
+    def window(self, n):
+        """(log position of the first message, newest n messages)."""
+        if n <= 0:
+            return self.total, []
+        records, end = self._newest(n)
+        return end - len(records), [_message(r) for r in records]
+
+    def between(self, start, end):
+        """Messages at log positions start <= position < end, oldest first."""
+        records, total = self._newest(self.total - start)
+        first = total - len(records)
+        end = max(0, min(end, total) - first)
+        return [_message(r) for r in records[max(0, start - first) : end]]
+
+    def _newest(self, n):
+        """(newest n records, log position just past the last one)."""
+        if n <= 0:
+            return [], self.total
+        if n <= self.tail.maxlen:
+            # The deque always holds the newest messages, so this is exact
+            with self.lock:
+                return list(self.tail)[-n:], self.total
+        self.flush()
+        with self.lock:
+            total = self.total
+        return read_tail(self.path, n), total
+
+    def compact(self):
+        """Queues a compaction behind any pending writes."""
+        self.pending.put(_COMPACT)
+
+    def flush(self, timeout=None):
+        """Blocks until every queued write has reached the file."""
+        done = threading.Event()
+        self.pending.put(done)
+        return done.wait(timeout)
+
+    def close(self, timeout=2.0):
+        self.pending.put(_STOP)
+        self.writer.join(timeout)
+
+    def _write_loop(self):
+        f = None
+        while True:
+            item = self.pending.get()
+            batch = []
+            # Drain whatever else is waiting so one write covers a burst
+            while True:
+                if isinstance(item, str):
+                    batch.append(item)
+                else:
+                    f = self._write_batch(f, batch)
+                    batch = []
+                    if item is _STOP:
+                        if f:
+                            f.close()
+                        return
+                    if item is _COMPACT:
+                        f = self._compact(f)
+                    elif isinstance(item, threading.Event):
+                        item.set()
+                try:
+                    item = self.pending.get_nowait()
+                except queue.Empty:
+                    break
+            f = self._write_batch(f, batch)
+            if f and f.tell() > self.max_bytes:
+                f = self._compact(f)
+
+    def _write_batch(self, f, lines):
+        if not lines:
+            return f
+        try:
+            if f is None:
+                os.makedirs(os.path.dirname(self.path), exist_ok=True)
+                f = open(self.path, "a", encoding="utf-8")
+            f.write("\n".join(lines) + "\n")
+            f.flush()
+            self.written += len(lines)
+        except OSError as e:
+            print(f"Memory Error: {e}")
+        return f
+
+    def _compact(self, f):
+        """Keeps the newest records; readers never see a half-written file."""
+        if f:
+            f.close()
+        keep = read_tail(self.path, self.compact_keep)
+        tmp_path = self.path + ".tmp"
+        try:
+            with open(tmp_path, "w", encoding="utf-8") as out:
+                for record in keep:
+                    out.write(json.dumps(record, ensure_ascii=False) + "\n")
+            os.replace(tmp_path, self.path)
+            self.compactions += 1
+        except OSError as e:
+            print(f"Memory Error: {e}")
+        return None  # Reopened on the next write
+
+    def stats(self):
+        size = os.path.getsize(self.path) if os.path.exists(self.path) else 0
+        return {
+            "appended": self.appended,
+            "written": self.written,
+            "pending": self.pending.qsize(),
+            "compactions": self.compactions,
+            "bytes": size,
+        }
+
+
+def import_legacy(store, legacy_path):
+    """One-off: moves an old vera_memory.json history into the log."""
+    if not os.path.exists(legacy_path) or os.path.exists(store.path):
+        return 0
+    try:
+        with open(legacy_path, "r") as f:
+            history = json.load(f)
+    except (OSError, ValueError):
+        return 0
+    count = 0
+    for message in history:
+        if message.get("role") in ("user", "assistant"):
+            store.append(message["role"], message.get("content", ""))
+            count += 1
+    store.flush()
+    return count
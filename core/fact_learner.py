@@ -0,0 +1,163 @@
+import threading
+import time
+from collections import deque
+
+# --- CONFIG ---
+MAX_PENDING = 32  # Utterances waiting for extraction; newer ones are dropped
+BATCH_SIZE = 8  # Utterances per extraction call
+LINGER_S = 2.0  # Wait this long for more utterances before calling out
+MIN_INTERVAL_S = 10.0  # At most one extraction call per interval
+
+
+class FactLearner:
+    """
+    One background thread that turns "my name is..." style utterances into
+    long-term facts. Utterances queue up (bounded), identical ones coalesce,
+    and each call to extract(texts) -> [facts] covers a whole batch.
+
+    store(fact) -> bool saves a fact and returns False if it was known.
+    """
+
+    def __init__(
+        self,
+        extract,
+        store,
+        max_pending=MAX_PENDING,
+        batch_size=BATCH_SIZE,
+        linger_s=LINGER_S,
+        min_interval_s=MIN_INTERVAL_S,
+    ):
+        self.extract = extract
+        self.store = store
+        self.max_pending = max_pending
+        self.batch_size = batch_size
+        self.linger_s = linger_s
+        self.min_interval_s = min_interval_s
+        self.pending = deque()
+        self.cond = threading.Condition()
+        self.last_call = 0.0
+        self.oldest_at = 0.0  # When the oldest pending utterance arrived
+        self.draining = False
+        self.closed = False
+        self.busy = False
+        self.counters = {
+            "queued": 0,
+            "merged": 0,  # Utterances that didn't need a call of their own
+            "dropped": 0,
+            "batches": 0,
+            "learned": 0,
+            "duplicates": 0,
+            "failed": 0,
+        }
+        self.worker = threading.Thread(target=self._run, daemon=True)
+        self.worker.start()
+
+    def submit(self, text):
+        """Queues an utterance; returns False if it was dropped."""
+        text = " ".join(text.split())
+        with self.cond:
+            if self.closed:
+                self.counters["dropped"] += 1
+                return False
+            if text in self.pending:
+                self.counters["merged"] += 1
+                return True
+            if len(self.pending) >= self.max_pending:
+                self.counters["dropped"] += 1
+                return False
+            if not self.pending:
+                self.oldest_at = time.monotonic()
+            self.pending.append(text)
+            self.counters["queued"] += 1
+            self.cond.notify_all()
+            return True
+
+    def _next_batch(self):
+        """Blocks until a batch is due. Returns None when closed and empty."""
+        with self.cond:
+            while True:
+                if not self.pending:
+                    if self.closed:
+                        return None
+                    self.cond.wait()
+                    continue
+                if self.draining or self.closed:
+                    break
+                # Linger for company, and respect the rate limit
+                due = max(
+                    self.oldest_at + self.linger_s,
+                    self.last_call + self.min_interval_s,
+                )
+                if len(self.pending) >= self.batch_size:
+                    due = self.last_call + self.min_interval_s
+                wait = due - time.monotonic()
+                if wait <= 0:
+                    break
+                self.cond.wait(wait)
+            batch = [
+                self.pending.popleft()
+                for _ in range(min(self.batch_size, len(self.pending)))
+            ]
+            self.last_call = time.monotonic()
+            self.oldest_at = self.last_call  # Leftovers have lingered enough
+            self.busy = True
+            return batch
+
+    def _run(self):
+        while True:
+            batch = self._next_batch()
+            if batch is None:
+                return
+            self._learn(batch)
+            with self.cond:
+                self.busy = False
+                self.cond.notify_all()
+
+    def _learn(self, batch):
+        try:
+            facts = self.extract(batch) or []
+        except Exception as e:
+            print(f"Learner Error: {e}")
+            with self.cond:
+                self.counters["failed"] += len(batch)
+            return
+        learned = duplicates = 0
+        for fact in facts:
+            if self.store(fact):
+                learned += 1
+                print(f"DEBUG: Learned -> {fact}")
+            else:
+                duplicates += 1
+        with self.cond:
+            self.counters["batches"] += 1
+            self.counters["merged"] += len(batch) - 1
+            self.counters["learned"] += learned
+            self.counters["duplicates"] += duplicates
+
+    def flush(self, timeout=None):
+        """Extracts everything pending now, ignoring linger and rate limit."""
+        deadline = None if timeout is None else time.monotonic() + timeout
+        with self.cond:
+            self.draining = True
+            self.cond.notify_all()
+            try:
+                while self.pending or self.busy:
+                    left = None if deadline is None else deadline - time.monotonic()
+                    if left is not None and left <= 0:
+                        return False
+                    self.cond.wait(left)
+                return True
+            finally:
+                self.draining = False
+
+    def close(self, timeout=5.0):
+        """Flushes and stops the worker (used on shutdown)."""
+        with self.cond:
+            self.closed = True
+            self.cond.notify_all()
+        self.worker.join(timeout)
+        return not self.worker.is_alive()
+
+    def stats(self):
+        with self.cond:
+            return dict(self.counters, pending=len(self.pending))
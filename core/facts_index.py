@@ -0,0 +1,248 @@
+import hashlib
+import heapq
+import json
+import math
+import os
+import random
+import re
+import sys
+import threading
+import time
+from collections import Counter
+
+try:
+    import persistence
+except ImportError:
+    # Fallback when imported as 'core.facts_index' (tests)
+    sys.path.append(os.path.dirname(__file__))
+    import persistence
+
+# --- PATH SETUP ---
+CURRENT_DIR = os.path.dirname(os.path.abspath(__file__))
+ROOT_DIR = os.path.dirname(CURRENT_DIR)
+FACTS_FILE = os.path.join(ROOT_DIR, "data", "vera_facts.json")
+
+# --- CONFIG ---
+BM25_K1 = 1.5
+BM25_B = 0.75
+# A term in more than this share of facts ("likes") says little about any
+# one of them: it re-scores what rarer terms found instead of dragging in
+# every fact, and on its own only its COMMON_POSTINGS best facts compete
+COMMON_DF_FRACTION = 0.1
+COMMON_POSTINGS = 256
+TOKEN = re.compile(r"[a-z0-9']+")
+# Words that would otherwise match every fact ("user", since they all start so)
+STOPWORDS = frozenset(
+    """
+    a an and are as at be but by can could did do does for from had has have
+    he her him his how i i'm if in into is it it's its just me my of on or our
+    she so than that the their them then there these they this to too was we
+    were what when where which who why will with would you your user vera
+    """.split()
+)
+
+
+def tokenize(text):
+    return [t for t in TOKEN.findall(text.lower()) if t not in STOPWORDS]
+
+
+def fact_key(fact):
+    """Dedup key: case and spacing don't make a new fact."""
+    normalized = " ".join(fact.lower().split()).rstrip(".")
+    return hashlib.sha1(normalized.encode("utf-8")).hexdigest()
+
+
+class FactsIndex:
+    """
+    Inverted index over the long-term facts vault with BM25 ranking.
+    Loaded from disk once; add() updates the postings in place and saves
+    the vault without re-reading it.
+    """
+
+    def __init__(self, path=FACTS_FILE, k1=BM25_K1, b=BM25_B):
+        self.path = path
+        self.k1 = k1
+        self.b = b
+        self.lock = threading.Lock()
+        self.save_lock = threading.Lock()
+        self.facts = []
+        self.keys = set()
+        self.postings = {}  # term -> {fact_id: term frequency}
+        self.lengths = []
+        self.total_length = 0
+        self.max_tf = {}  # term -> highest tf in its postings
+        self.min_length = {}  # term -> shortest fact containing it
+        self.impacts = {}  # common term -> (vault size, best fact ids)
+        self._load()
+
+    def _load(self):
+        if not os.path.exists(self.path):
+            return
+        try:
+            with open(self.path, "r") as f:
+                facts = json.load(f)
+        except (OSError, ValueError) as e:
+            print(f"Facts Error: {e}")
+            return
+        for fact in facts:
+            if isinstance(fact, str):
+                self._insert(fact)
+
+    def _insert(self, fact):
+        key = fact_key(fact)
+        if key in self.keys:
+            return False
+        fact_id = len(self.facts)
+        self.facts.append(fact)
+        self.keys.add(key)
+        terms = Counter(tokenize(fact))
+        length = sum(terms.values())
+        for term, tf in terms.items():
+            self.postings.setdefault(term, {})[fact_id] = tf
+            self.max_tf[term] = max(tf, self.max_tf.get(term, 0))
+            self.min_length[term] = min(length, self.min_length.get(term, length))
+        self.lengths.append(length)
+        self.total_length += length
+        return True
+
+    def add(self, fact, save=True):
+        """Returns False if the fact (or a case/spacing variant) is known."""
+        fact = fact.strip()
+        if not fact:
+            return False
+        with self.lock:
+            added = self._insert(fact)
+            snapshot = list(self.facts) if added and save else None
+        if snapshot is not None:
+            self._save(snapshot)
+        return added
+
+    def __contains__(self, fact):
+        return fact_key(fact) in self.keys
+
+    def __len__(self):
+        return len(self.facts)
+
+    def _save(self, facts):
+        with self.save_lock:
+            try:
+                persistence.write_json(self.path, facts, indent=2)
+            except OSError as e:
+                print(f"Facts Error: {e}")
+
+    def _weight(self, tf, length, avg_length):
+        """BM25 term-frequency part (times idf gives the score)."""
+        norm = self.k1 * (1 - self.b + self.b * length / avg_length)
+        return tf * (self.k1 + 1) / (tf + norm)
+
+    def _top_postings(self, term, avg_length):
+        """A common term's COMMON_POSTINGS best facts, rebuilt after inserts."""
+        cached = self.impacts.get(term)
+        if cached and cached[0] == len(self.facts):
+            return cached[1]
+        postings = self.postings[term]
+        best = heapq.nlargest(
+            COMMON_POSTINGS,
+            postings,
+            key=lambda i: (self._weight(postings[i], self.lengths[i], avg_length), -i),
+        )
+        self.impacts[term] = (len(self.facts), best)
+        return best
+
+    def search(self, query, k=3):
+        """
+        Top-k (fact, score) pairs; only facts sharing a real word score.
+
+        Terms are scored rarest-first (max-score order). Once the k-th best
+        score so far beats the most the remaining terms could add, no unseen
+        fact can make the top k, and the rest only re-score the candidates.
+        """
+        terms = set(tokenize(query))
+        with self.lock:
+            n = len(self.facts)
+            if not n or not terms:
+                return []
+            avg_length = self.total_length / n or 1.0
+            plan = []
+            for term in terms:
+                postings = self.postings.get(term)
+                if not postings:
+                    continue
+                df = len(postings)
+                idf = math.log(1 + (n - df + 0.5) / (df + 0.5))
+                bound = idf * self._weight(
+                    self.max_tf[term], self.min_length[term], avg_length
+                )
+                plan.append((bound, idf, term, postings))
+            plan.sort(key=lambda item: (-item[0], item[2]))
+            remaining = sum(item[0] for item in plan)
+            # Short lists are cheap to walk whatever their share
+            common = max(COMMON_DF_FRACTION * n, COMMON_POSTINGS)
+
+            scores = {}
+            for bound, idf, term, postings in plan:
+                closed = len(scores) >= k and (
+                    heapq.nlargest(k, scores.values())[-1] >= remaining
+                )
+                if closed or (scores and len(postings) > common):
+                    fact_ids = [i for i in scores if i in postings]
+                elif len(postings) > common:
+                    fact_ids = self._top_postings(term, avg_length)
+                else:
+                    fact_ids = postings
+                for fact_id in fact_ids:
+                    scores[fact_id] = scores.get(fact_id, 0.0) + idf * self._weight(
+                        postings[fact_id], self.lengths[fact_id], avg_length
+                    )
+                remaining -= bound
+            best = sorted(scores.items(), key=lambda kv: (-kv[1], kv[0]))[:k]
+            return [(self.facts[i], score) for i, score in best]
+
+
+def benchmark(n_facts=20000, n_queries=500):
+    """Synthetic vault: build time and mean/p95 query latency in ms."""
+    rng = random.Random(0)
+    words = [f"w{i}" for i in range(5000)]
+    index = FactsIndex(path="")  # Nothing to load, nothing saved
+    start = time.perf_counter()
+    for _ in range(n_facts):
+        index.add(f"User likes {' '.join(rng.sample(words, 6))}", save=False)
+    build_ms = (time.perf_counter() - start) * 1000
+
+    def measure(queries):
+        latencies = []
+        for query in queries:
+            start = time.perf_counter()
+            index.search(query)
+            latencies.append((time.perf_counter() - start) * 1000)
+        latencies.sort()
+        return (
+            sum(latencies) / len(latencies),
+            latencies[int(len(latencies) * 0.95)],
+        )
+
+    rare = [
+        f"what about {rng.choice(words)} and {rng.choice(words)}"
+        for _ in range(n_queries)
+    ]
+    # "likes" is in every fact: the worst case for walking postings
+    common = [
+        rng.choice(["which things he likes", f"does he like {rng.choice(words)}"])
+        + rng.choice(["", " likes"])
+        for _ in range(n_queries)
+    ]
+    rare_mean, rare_p95 = measure(rare)
+    common_mean, common_p95 = measure(common)
+    return {
+        "facts": len(index),
+        "build_ms": build_ms,
+        "query_mean_ms": rare_mean,
+        "query_p95_ms": rare_p95,
+        "common_query_mean_ms": common_mean,
+        "common_query_p95_ms": common_p95,
+    }
+
+
+if __name__ == "__main__":
+    # Usage: python core/facts_index.py [n_facts]
+    print(benchmark(int(sys.argv[1]) if len(sys.argv) > 1 else 20000))
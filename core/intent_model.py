@@ -0,0 +1,192 @@
+import json
+import os
+import threading
+import time
+import zlib
+import numpy as np
+
+# --- PATH SETUP ---
+CURRENT_DIR = os.path.dirname(os.path.abspath(__file__))
+ROOT_DIR = os.path.dirname(CURRENT_DIR)
+DATA_DIR = os.path.join(ROOT_DIR, "data")
+MODEL_FILE = os.path.join(DATA_DIR, "intent_model.npz")
+INTENT_LOG_FILE = os.path.join(DATA_DIR, "intent_log.jsonl")
+
+# --- CONFIG ---
+FORMAT_VERSION = 1  # Bump when features change; old files are then ignored
+N_FEATURES = 2**12  # Hashed n-gram buckets
+NGRAM_RANGE = (2, 4)
+CONFIDENCE_THRESHOLD = 0.75  # Below this we still ask the LLM
+MIN_CLASSES = 2  # A one-class model answers everything with confidence 1.0
+MIN_PER_CLASS = 5  # Rarer labels stay with the LLM until they have this many
+LABELS = ["CMD_OPEN", "CMD_TYPE", "CMD_SEE", "CMD_CAM", "CHAT_FAST", "CHAT_DEEP"]
+
+_log_lock = threading.Lock()
+
+
+def clean_label(label):
+    """LLMs add dots and spaces; returns a known label or None."""
+    if not label:
+        return None
+    label = label.strip().strip(".`'\"").upper()
+    return label if label in LABELS else None
+
+
+def log_example(text, label, path=INTENT_LOG_FILE):
+    """Appends one (utterance, label) pair for the next training run."""
+    label = clean_label(label)
+    if not label or not text:
+        return
+    line = json.dumps({"text": text, "label": label, "ts": time.time()})
+    with _log_lock:
+        try:
+            with open(path, "a", encoding="utf-8") as f:
+                f.write(line + "\n")
+        except OSError as e:
+            print(f"Intent Log Error: {e}")
+
+
+def load_examples(path=INTENT_LOG_FILE):
+    """Reads the log back as (texts, labels), newest label wins per text."""
+    latest = {}
+    if not os.path.exists(path):
+        return [], []
+    with open(path, "r", encoding="utf-8") as f:
+        for line in f:
+            try:
+                row = json.loads(line)
+            except ValueError:
+                continue
+            label = clean_label(row.get("label"))
+            if label and row.get("text"):
+                latest[" ".join(row["text"].lower().split())] = label
+    return list(latest.keys()), list(latest.values())
+
+
+def _ngram_ids(text, n_features=N_FEATURES, ngram_range=NGRAM_RANGE):
+    padded = f" {' '.join(text.lower().split())} "
+    ids = []
+    for n in range(ngram_range[0], ngram_range[1] + 1):
+        for i in range(len(padded) - n + 1):
+            # crc32 is stable across runs, unlike hash()
+            ids.append(zlib.crc32(padded[i : i + n].encode("utf-8")) % n_features)
+    return ids
+
+
+def term_counts(texts, n_features=N_FEATURES):
+    """Raw hashed character n-gram counts, one row per text."""
+    X = np.zeros((len(texts), n_features), dtype=np.float32)
+    for row, text in enumerate(texts):
+        ids = _ngram_ids(text, n_features)
+        if ids:
+            np.add.at(X[row], ids, 1.0)
+    return X
+
+
+class IntentModel:
+    """Hashed char n-gram TF-IDF features + multinomial logistic regression."""
+
+    def __init__(self, weights, bias, idf, labels, meta=None):
+        self.weights = weights
+        self.bias = bias
+        self.idf = idf
+        self.labels = list(labels)
+        self.meta = meta or {}
+
+    def _features(self, texts):
+        X = np.log1p(term_counts(texts, len(self.idf))) * self.idf
+        norms = np.linalg.norm(X, axis=1, keepdims=True)
+        return X / np.maximum(norms, 1e-8)
+
+    def predict_proba(self, texts):
+        logits = self._features(texts) @ self.weights + self.bias
+        logits -= logits.max(axis=1, keepdims=True)
+        probs = np.exp(logits)
+        return probs / probs.sum(axis=1, keepdims=True)
+
+    def predict(self, text):
+        """Returns (label, confidence)."""
+        probs = self.predict_proba([text])[0]
+        best = int(np.argmax(probs))
+        return self.labels[best], float(probs[best])
+
+    @classmethod
+    def train(cls, texts, labels, epochs=300, lr=2.0, l2=1e-4):
+        """
+        Full-batch gradient descent; a few hundred examples train in ~1s.
+        Labels with fewer than MIN_PER_CLASS examples are left out; raises
+        ValueError if that leaves fewer than MIN_CLASSES.
+        """
+        label_set = [l for l in LABELS if labels.count(l) >= MIN_PER_CLASS]
+        if len(label_set) < MIN_CLASSES:
+            raise ValueError(
+                f"Need {MIN_CLASSES}+ labels with {MIN_PER_CLASS}+ examples each"
+            )
+        keep = [i for i, l in enumerate(labels) if l in label_set]
+        texts = [texts[i] for i in keep]
+        y = np.array([label_set.index(labels[i]) for i in keep])
+
+        counts = term_counts(texts)
+        df = (counts > 0).sum(axis=0)
+        idf = (np.log((1 + len(texts)) / (1 + df)) + 1).astype(np.float32)
+
+        model = cls(
+            np.zeros((N_FEATURES, len(label_set)), dtype=np.float32),
+            np.zeros(len(label_set), dtype=np.float32),
+            idf,
+            label_set,
+        )
+        X = model._features(texts)
+        onehot = np.eye(len(label_set), dtype=np.float32)[y]
+
+        for _ in range(epochs):
+            logits = X @ model.weights + model.bias
+            logits -= logits.max(axis=1, keepdims=True)
+            probs = np.exp(logits)
+            probs /= probs.sum(axis=1, keepdims=True)
+            grad = (probs - onehot) / len(texts)
+            model.weights -= lr * (X.T @ grad + l2 * model.weights)
+            model.bias -= lr * grad.sum(axis=0)
+
+        model.meta = {
+            "version": FORMAT_VERSION,
+            "n_features": N_FEATURES,
+            "ngram_range": list(NGRAM_RANGE),
+            "examples": len(texts),
+            "trained_at": time.strftime("%Y-%m-%d %H:%M:%S"),
+        }
+        return model
+
+    def save(self, path=MODEL_FILE):
+        tmp_path = path + ".tmp.npz"
+        np.savez_compressed(
+            tmp_path,
+            weights=self.weights,
+            bias=self.bias,
+            idf=self.idf,
+            labels=np.array(self.labels),
+            meta=np.array(json.dumps(self.meta)),
+        )
+        os.replace(tmp_path, path)
+
+    @classmethod
+    def load(cls, path=MODEL_FILE):
+        """Returns the model, or None if missing or from an older format."""
+        if not os.path.exists(path):
+            return None
+        try:
+            with np.load(path, allow_pickle=False) as data:
+                meta = json.loads(str(data["meta"]))
+                if meta.get("version") != FORMAT_VERSION:
+                    print("DEBUG: Intent model format outdated, retrain it.")
+                    return None
+                return cls(
+                    data["weights"],
+                    data["bias"],
+                    data["idf"],
+                    [str(l) for l in data["labels"]],
+                    meta,
+                )
+        except Exception as e:
+            print(f"Intent Model Error: {e}")
+            return None
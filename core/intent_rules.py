@@ -0,0 +1,217 @@
+import re
+import threading
+from collections import Counter
+
+# --- RULE TABLE ---
+# Checked top to bottom; the first rule that matches wins.
+# "anywhere": the phrase may appear mid-sentence (otherwise it must lead).
+# Named groups become slots; "slots" adds fixed ones.
+QUESTION = r"(?:what|who|where|when|why|how|do you|can you|are you|is there)\b"
+
+RULES = [
+    {
+        "name": "scan",
+        "intent": "CMD_SCAN",
+        "pattern": r"(?:scan(?: for)?(?: new)? apps?|app scan|update apps?|scan)$",
+    },
+    # Question-shaped commands must lead the utterance: matched anywhere,
+    # "what is a webcam" would beat the question guard below
+    {
+        "name": "time",
+        "intent": "CMD_TIME",
+        "pattern": r"(?:what(?:'s| is)? the time|what time is it)(?: now| please)?$",
+    },
+    {
+        "name": "status",
+        "intent": "CMD_STATUS",
+        "pattern": r"(?:system )?status\b|system check\b|cpu level\b",
+    },
+    {
+        "name": "screen",
+        "intent": "CMD_SEE",
+        "pattern": (
+            r"(?:take a )?screenshot\b|(?:look at|check|read) (?:my |the |this )?screen\b"
+            r"|what(?:'s| is) on (?:my |the |this )?screen$|what is this error\b"
+        ),
+    },
+    {
+        "name": "camera",
+        "intent": "CMD_CAM",
+        "pattern": r"webcam\b|(?:check|look through) (?:the |my )?(?:camera|webcam)\b"
+        r"|what am i holding\b",
+    },
+    {
+        "name": "question_deep",
+        "intent": "CHAT_DEEP",
+        "pattern": QUESTION + r".*\b(?:generate|code|list)\b",
+    },
+    # Prevents "Do you have access" -> CMD_TYPE
+    {"name": "question", "intent": "CHAT_FAST", "pattern": QUESTION},
+    {
+        "name": "open",
+        "intent": "CMD_OPEN",
+        # No "start"/"run": "start the timer" is not an app
+        "pattern": r"(?:open|launch)(?: up)?(?: the)? "
+        r"(?P<target>[\w.+-]+(?: [\w.+-]+){0,3}?)(?: app| application| please)?$",
+    },
+    {
+        "name": "type_autofill",
+        "intent": "CMD_TYPE",
+        "pattern": r"type (?:in |out )?my (?P<field>email|username|address)\b",
+    },
+    {
+        "name": "type",
+        "intent": "CMD_TYPE",
+        # Longest first, or "type out hi" types "out hi"
+        "pattern": r"(?:type out|write out|type) (?P<text>.+)$",
+    },
+    {
+        "name": "chat_deep",
+        "intent": "CHAT_DEEP",
+        "pattern": r"(?:write|explain|generate|create|compare|summari[sz]e)\b",
+    },
+    {
+        "name": "smalltalk",
+        "intent": "CHAT_FAST",
+        "pattern": r"(?:hi|hello|hey|thanks|thank you|good (?:morning|afternoon|"
+        r"evening|night)|tell me a joke)\b",
+    },
+]
+
+# What the combined LLM router may answer (see validate_llm_route)
+LLM_INTENTS = ("CMD_OPEN", "CMD_TYPE", "CMD_SEE", "CMD_CAM", "CHAT_FAST", "CHAT_DEEP")
+TARGET_TYPES = ("web", "app")
+
+SLOT_GROUP = re.compile(r"\(\?P<(\w+)>")
+TRAILING_PUNCT = ".?!, "
+
+
+def normalize(text):
+    """Lowercase, single-spaced, no trailing punctuation."""
+    return " ".join(text.lower().split()).rstrip(TRAILING_PUNCT)
+
+
+class IntentRouter:
+    """
+    Compiles the whole rule table into one regex. Each rule becomes a
+    named alternative anchored at the start of the utterance, so the regex
+    engine tries them in table order and a single match() call returns the
+    winning rule together with its slots.
+    """
+
+    def __init__(self, rules=RULES):
+        self.rules = {}
+        parts = []
+        for i, rule in enumerate(rules):
+            group = f"r{i}"
+            body = SLOT_GROUP.sub(
+                lambda m, g=group: f"(?P<{g}__{m.group(1)}>", rule["pattern"]
+            )
+            prefix = ".*?" if rule.get("anywhere") else ""
+            parts.append(f"(?P<{group}>{prefix}(?:{body}))")
+            self.rules[group] = rule
+        self.pattern = re.compile("|".join(parts))
+        self.hits = Counter()
+        self.lock = threading.Lock()
+
+    def match(self, text):
+        """Returns {"intent", "slots", "rule"} or None if no rule fits."""
+        m = self.pattern.match(normalize(text))
+        if not m:
+            with self.lock:
+                self.hits["<no match>"] += 1
+            return None
+
+        group = m.lastgroup
+        rule = self.rules[group]
+        slots = dict(rule.get("slots", {}))
+        prefix = f"{group}__"
+        for key, value in m.groupdict().items():
+            if value is not None and key.startswith(prefix):
+                slots[key[len(prefix) :]] = value.strip()
+
+        with self.lock:
+            self.hits[rule["name"]] += 1
+        return {"intent": rule["intent"], "slots": slots, "rule": rule["name"]}
+
+    def stats(self):
+        """Per-rule hit counts, plus how many utterances fell through."""
+        with self.lock:
+            return dict(self.hits)
+
+
+def validate_llm_route(data):
+    """
+    Checks the combined router's JSON against the schema:
+      {"intent": LLM_INTENTS,
+       "target_type": "web" | "app" | null, "target": str | null,  # CMD_OPEN
+       "text": str | null}                                         # CMD_TYPE
+    Returns {"intent", "slots"} in the same shape the rules produce, or None
+    if the reply is unusable. Missing slots leave 'slots' empty so the
+    caller can fall back to the per-step extractors.
+    """
+    if not isinstance(data, dict):
+        return None
+    intent = data.get("intent")
+    if not isinstance(intent, str):
+        return None
+    intent = intent.strip().strip(".").upper()
+    if intent not in LLM_INTENTS:
+        return None
+
+    slots = {}
+    if intent == "CMD_OPEN":
+        target = data.get("target")
+        target_type = data.get("target_type")
+        if isinstance(target, str) and target.strip() and target_type in TARGET_TYPES:
+            target = target.strip()
+            if target_type == "web" and "://" not in target:
+                target = f"https://{target}"
+            slots = {"target": target, "type": target_type}
+    elif intent == "CMD_TYPE":
+        text = data.get("text")
+        if isinstance(text, str) and text.strip():
+            slots = {"text": text.strip()}
+    return {"intent": intent, "slots": slots}
+
+
+router = IntentRouter()
+
+
+def match(text):
+    return router.match(text)
+
+
+def route(
+    text, classify=None, threshold=1.0, route_llm=None, label_llm=None, offline=False
+):
+    """
+    The routing cascade. Returns {"intent", "slots", "rule"}.
+    The rule table answers first, then classify(text) -> (label, confidence)
+    if it reaches threshold; only what's left goes to route_llm(text) ->
+    {"intent", "slots"} or None, then label_llm(text) -> intent (rule=None).
+    offline=True, or route_llm raising, falls back to the classifier's best
+    guess instead of waiting on another LLM call.
+    """
+    found = match(text)
+    if found:
+        return found
+
+    guess = None
+    if classify:
+        label, confidence = classify(text)
+        if confidence >= threshold:
+            return {"intent": label, "slots": {}, "rule": f"model:{confidence:.2f}"}
+        guess = label
+
+    fallback = {"intent": guess or "CHAT_FAST", "slots": {}, "rule": "fallback"}
+    if offline:
+        return fallback  # The LLM is degraded: a local guess beats a timeout
+    try:
+        routed = route_llm(text)
+    except Exception as e:
+        print(f"Routing Error: {e}")
+        return fallback
+    if routed:
+        return {"intent": routed["intent"], "slots": routed["slots"], "rule": None}
+    return {"intent": label_llm(text), "slots": {}, "rule": None}
@@ -0,0 +1,131 @@
+import threading
+import time
+from contextlib import contextmanager
+
+# --- CONFIG ---
+FILLER_THRESHOLD_S = 0.7  # Silence shorter than this doesn't need covering
+FILLER_REPEAT_S = 4.0  # Another filler if the wait drags on (0 = only one)
+FADE_MS = 250  # Filler fades out under the real answer
+POLL_S = 0.02
+
+
+class _Mask:
+    def __init__(self, label):
+        self.label = label
+        self.started = time.monotonic()
+        self.done = threading.Event()
+
+
+class LatencyMasker:
+    """
+    Covers the silence while a slow backend call runs:
+
+        with masker.mask("see_screen"):
+            answer = slow_call()
+
+    or masker.answer("see_screen", slow_call, speak) to cover just the call.
+
+    Once the block has run threshold_s, play() starts a filler (as soon as
+    nothing else is audible). finish() - called on exit, or earlier when the
+    answer text is in - stops any new filler; fade() - called by whatever
+    starts the answer audio - fades a playing filler out under it.
+
+    play() starts a filler, fade(ms) fades it out, busy() is True while
+    other audio is playing. All three come from the audio layer.
+    """
+
+    def __init__(
+        self,
+        play,
+        fade,
+        busy=None,
+        threshold_s=FILLER_THRESHOLD_S,
+        repeat_s=FILLER_REPEAT_S,
+        fade_ms=FADE_MS,
+    ):
+        self.play = play
+        self.fade_out = fade
+        self.busy = busy or (lambda: False)
+        self.threshold_s = threshold_s
+        self.repeat_s = repeat_s
+        self.fade_ms = fade_ms
+        self.lock = threading.Lock()
+        self.current = None
+        self.playing = False
+        self.counters = {"masks": 0, "fillers": 0, "covered_ms": 0.0}
+        self.filler_started = 0.0
+
+    @contextmanager
+    def mask(self, label="call"):
+        mask = _Mask(label)
+        with self.lock:
+            if self.current:
+                self.current.done.set()  # Only the newest wait is covered
+            self.current = mask
+            self.counters["masks"] += 1
+        threading.Thread(target=self._watch, args=(mask,), daemon=True).start()
+        try:
+            yield self
+        finally:
+            self.finish(mask)
+
+    def answer(self, label, fetch, speak):
+        """
+        speak(fetch()), covering only the fetch: once the answer is in, the
+        wait is over, however long speaking it takes.
+        """
+        with self.mask(label):
+            reply = fetch()
+        return speak(reply)
+
+    def _watch(self, mask):
+        wait = self.threshold_s
+        while not mask.done.wait(wait):
+            # Don't talk over an acknowledgement that is still playing
+            while self.busy() and not mask.done.is_set():
+                time.sleep(POLL_S)
+            with self.lock:
+                if mask.done.is_set() or self.current is not mask:
+                    return
+                self.playing = True
+                self.filler_started = time.monotonic()
+                self.counters["fillers"] += 1
+            print(
+                f"DEBUG: Filler after {time.monotonic() - mask.started:.1f}s "
+                f"({mask.label})"
+            )
+            try:
+                self.play()
+            except Exception as e:
+                print(f"Filler Error: {e}")
+            if not self.repeat_s:
+                return
+            wait = self.repeat_s
+
+    def finish(self, mask=None):
+        """No new filler for this wait (the answer is on its way)."""
+        with self.lock:
+            mask = mask or self.current
+            if not mask:
+                return
+            mask.done.set()
+            if self.current is mask:
+                self.current = None
+
+    def fade(self):
+        """The answer audio is ready: fade out a playing filler."""
+        with self.lock:
+            if not self.playing:
+                return
+            self.playing = False
+            self.counters["covered_ms"] += (
+                time.monotonic() - self.filler_started
+            ) * 1000
+        try:
+            self.fade_out(self.fade_ms)
+        except Exception as e:
+            print(f"Filler Error: {e}")
+
+    def stats(self):
+        with self.lock:
+            return dict(self.counters, playing=self.playing)
@@ -0,0 +1,188 @@
+import json
+import os
+import sys
+import threading
+import time
+from collections import OrderedDict
+
+try:
+    import persistence
+except ImportError:
+    # Fallback when imported as 'core.launch_history' (tests)
+    sys.path.append(os.path.dirname(__file__))
+    import persistence
+
+# --- PATH SETUP ---
+CURRENT_DIR = os.path.dirname(os.path.abspath(__file__))
+ROOT_DIR = os.path.dirname(CURRENT_DIR)
+LAUNCH_HISTORY_FILE = os.path.join(ROOT_DIR, "data", "launch_history.json")
+
+# --- CONFIG ---
+HOT_SIZE = 32  # Recently resolved names answered without fuzzy scoring
+FREQUENCY_HALF_LIFE_S = 14 * 24 * 3600  # A launch counts half after two weeks
+RECENCY_HALF_LIFE_S = 24 * 3600
+FREQUENCY_BOOST = 8.0  # Max fuzzy points a habitually used app gains
+RECENCY_BOOST = 4.0  # Max points for an app launched moments ago
+FREQUENCY_SATURATION = 3.0  # Decayed launches that earn half the boost
+FORMAT_VERSION = 1
+
+
+def normalize_query(text):
+    return " ".join(text.lower().split())
+
+
+class LaunchHistory:
+    """
+    What actually gets launched, used to rank fuzzy matches.
+
+    Each app keeps an exponentially decayed launch count (frequency) and
+    its last launch time (recency). Both turn into a bonus of at most
+    FREQUENCY_BOOST + RECENCY_BOOST points on top of the 0-100 fuzzy
+    score: enough to break near-ties ("code" -> the editor you use, not
+    codeblocks), not enough to drag a poor match past a good one.
+
+    On top of that, a small LRU maps recently launched queries straight to
+    the app name, so saying the same thing again skips the search.
+    Writes go through one debounced writer thread (save_later()).
+    """
+
+    def __init__(
+        self,
+        path=LAUNCH_HISTORY_FILE,
+        hot_size=HOT_SIZE,
+        frequency_half_life_s=FREQUENCY_HALF_LIFE_S,
+        recency_half_life_s=RECENCY_HALF_LIFE_S,
+    ):
+        self.path = path
+        self.hot_size = hot_size
+        self.frequency_half_life_s = frequency_half_life_s
+        self.recency_half_life_s = recency_half_life_s
+        self.lock = threading.Lock()
+        self.save_lock = threading.Lock()
+        self.apps = {}  # name -> {"count", "at", "last", "launches"}
+        self.hot_names = OrderedDict()  # query -> name (least recent first)
+        self.dirty = False
+        self.hot_hits = 0
+        self.hot_misses = 0
+        self.reranked = 0
+        self._load()
+        self.saver = persistence.DebouncedSaver(self.save)
+
+    def _load(self):
+        if not self.path or not os.path.exists(self.path):
+            return
+        try:
+            with open(self.path, "r", encoding="utf-8") as f:
+                data = json.load(f)
+            if data.get("version") == FORMAT_VERSION:
+                self.apps = data["apps"]
+        except Exception as e:
+            print(f"Launch History Error: {e}")
+
+    def _decay(self, age_s, half_life_s):
+        return 0.5 ** (max(0.0, age_s) / half_life_s)
+
+    def record(self, query, name, now=None):
+        """One launch of name, asked for as query."""
+        now = time.time() if now is None else now
+        with self.lock:
+            app = self.apps.get(name)
+            if app is None:
+                app = self.apps[name] = {"count": 0.0, "at": now, "launches": 0}
+            app["count"] = (
+                app["count"] * self._decay(now - app["at"], self.frequency_half_life_s)
+                + 1
+            )
+            app["at"] = app["last"] = now
+            app["launches"] += 1
+            self._remember(normalize_query(query), name)
+            self.dirty = True
+
+    def _remember(self, key, name):
+        self.hot_names[key] = name
+        self.hot_names.move_to_end(key)
+        while len(self.hot_names) > self.hot_size:
+            self.hot_names.popitem(last=False)
+
+    def hot(self, query):
+        """App name last launched for this exact query, or None. O(1)."""
+        key = normalize_query(query)
+        with self.lock:
+            name = self.hot_names.get(key)
+            if name is None:
+                self.hot_misses += 1
+                return None
+            self.hot_names.move_to_end(key)
+            self.hot_hits += 1
+            return name
+
+    def forget(self, query):
+        """Drops a hot entry whose app left the library."""
+        with self.lock:
+            self.hot_names.pop(normalize_query(query), None)
+
+    def boost(self, name, now=None):
+        """Bonus points for name from its decayed frequency and recency."""
+        now = time.time() if now is None else now
+        with self.lock:
+            app = self.apps.get(name)
+            if app is None:
+                return 0.0
+            count = app["count"] * self._decay(
+                now - app["at"], self.frequency_half_life_s
+            )
+            recency = self._decay(now - app["last"], self.recency_half_life_s)
+        return (
+            FREQUENCY_BOOST * count / (count + FREQUENCY_SATURATION)
+            + RECENCY_BOOST * recency
+        )
+
+    def rank(self, matches, now=None):
+        """Re-orders [(name, entry, score)] by score plus boost; scores unchanged."""
+        if len(matches) < 2:
+            return list(matches)
+        now = time.time() if now is None else now
+        ranked = sorted(
+            matches,
+            key=lambda match: (match[2] + self.boost(match[0], now), match[2]),
+            reverse=True,
+        )
+        if ranked[0][0] != matches[0][0]:
+            with self.lock:
+                self.reranked += 1
+        return ranked
+
+    def save_later(self):
+        """Queues a save on the writer thread; returns immediately."""
+        self.saver.request()
+
+    def close(self):
+        """Writes pending changes (used on shutdown)."""
+        self.saver.close()
+
+    def save(self):
+        """Atomic write, skipped when nothing changed since the last one."""
+        with self.save_lock:
+            with self.lock:
+                if not self.dirty or not self.path:
+                    return
+                apps = {name: dict(app) for name, app in self.apps.items()}
+                self.dirty = False
+            try:
+                persistence.write_json(
+                    self.path, {"version": FORMAT_VERSION, "apps": apps}
+                )
+            except OSError as e:
+                print(f"Launch History Error: {e}")
+
+    def stats(self):
+        with self.lock:
+            lookups = self.hot_hits + self.hot_misses
+            return {
+                "apps": len(self.apps),
+                "hot": len(self.hot_names),
+                "hot_hits": self.hot_hits,
+                "hot_misses": self.hot_misses,
+                "hot_hit_rate": self.hot_hits / lookups if lookups else 0.0,
+                "reranked": self.reranked,
+            }
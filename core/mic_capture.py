@@ -0,0 +1,219 @@
+import threading
+import numpy as np
+
+# Try to import sounddevice, capture is disabled without it (or PortAudio)
+try:
+    import sounddevice as sd
+
+    SOUNDDEVICE_AVAILABLE = True
+except (ImportError, OSError):
+    SOUNDDEVICE_AVAILABLE = False
+
+# speech_recognition only needs our source to *be* an AudioSource
+try:
+    import speech_recognition as sr
+
+    _AudioSourceBase = sr.AudioSource
+except ImportError:
+    _AudioSourceBase = object
+
+# --- CONFIG ---
+SAMPLE_RATE = 16000  # What the recognizer and the voice encoder both want
+BLOCK_SIZE = 480  # 30ms blocks
+RING_SECONDS = 30
+
+
+class RingBuffer:
+    """
+    Preallocated float32 ring. Every sample is stored twice (at i and
+    i + capacity) so any window up to 'capacity' long is one contiguous
+    slice, which lets readers take views instead of copies.
+    """
+
+    def __init__(self, capacity):
+        self.capacity = capacity
+        self.data = np.zeros(2 * capacity, dtype=np.float32)
+        self.written = 0  # Absolute sample count, never wraps
+
+    def write(self, block):
+        """Appends samples and returns the new absolute end index."""
+        block = block[-self.capacity :]
+        n = len(block)
+        pos = self.written % self.capacity
+        first = min(n, self.capacity - pos)
+        self.data[pos : pos + first] = block[:first]
+        self.data[pos + self.capacity : pos + self.capacity + first] = block[:first]
+        rest = n - first
+        if rest:
+            self.data[:rest] = block[first:]
+            self.data[self.capacity : self.capacity + rest] = block[first:]
+        self.written += n
+        return self.written
+
+    def window(self, n, end=None):
+        """
+        View of the n samples ending at absolute index 'end' (default: now).
+        The view is only valid until the writer laps it, so copy anything
+        you need to keep for longer than the ring holds.
+        """
+        end = self.written if end is None else end
+        n = min(n, self.capacity, end)
+        start = (end - n) % self.capacity
+        return self.data[start : start + n]
+
+
+class MicCapture:
+    """
+    The one InputStream in the app. Consumers subscribe and receive each
+    block as a view into the ring, or read the ring directly.
+    """
+
+    def __init__(
+        self, sample_rate=SAMPLE_RATE, block_size=BLOCK_SIZE, seconds=RING_SECONDS
+    ):
+        self.sample_rate = sample_rate
+        self.block_size = block_size
+        self.ring = RingBuffer(sample_rate * seconds)
+        self.subscribers = {}
+        self.next_token = 0
+        self.lock = threading.Lock()
+        self.data_ready = threading.Condition()
+        self.stream = None
+
+    def start(self):
+        with self.lock:
+            if self.stream is not None:
+                return True
+            if not SOUNDDEVICE_AVAILABLE:
+                return False
+            self.stream = sd.InputStream(
+                samplerate=self.sample_rate,
+                channels=1,
+                dtype="float32",
+                blocksize=self.block_size,
+                callback=self._callback,
+            )
+            self.stream.start()
+            return True
+
+    def stop(self):
+        with self.lock:
+            if self.stream is not None:
+                self.stream.stop()
+                self.stream.close()
+                self.stream = None
+
+    def _callback(self, indata, frames, time_info, status):
+        self.push(indata[:, 0])
+
+    def push(self, block):
+        """Writes a block and fans it out (also used to replay recordings)."""
+        end = self.ring.write(block)
+        view = self.ring.window(len(block), end)
+        for callback in list(self.subscribers.values()):
+            try:
+                callback(view)
+            except Exception as e:
+                print(f"Mic Subscriber Error: {e}")
+        with self.data_ready:
+            self.data_ready.notify_all()
+
+    def subscribe(self, callback):
+        """callback(block_view) runs on the audio thread, so keep it cheap."""
+        with self.lock:
+            token = self.next_token
+            self.next_token += 1
+            self.subscribers[token] = callback
+        return token
+
+    def unsubscribe(self, token):
+        with self.lock:
+            self.subscribers.pop(token, None)
+
+    def wait_until(self, sample_index, timeout=None):
+        """Blocks until the ring holds sample_index. Returns False on timeout."""
+        with self.data_ready:
+            return self.data_ready.wait_for(
+                lambda: self.ring.written >= sample_index, timeout
+            )
+
+
+class _RingReader:
+    """File-like reader over the ring that speech_recognition can pull from."""
+
+    def __init__(self, capture):
+        self.capture = capture
+        self.cursor = capture.ring.written
+
+    def read(self, size):
+        ring = self.capture.ring
+        self.capture.wait_until(self.cursor + size)
+        if ring.written - self.cursor > ring.capacity:
+            self.cursor = ring.written - size  # We fell a whole ring behind
+        view = ring.window(size, self.cursor + size)
+        self.cursor += size
+        return (np.clip(view, -1.0, 1.0) * 32767).astype("<i2").tobytes()
+
+    def wait_for_speech(self, detector, preroll_s=0.3, timeout=None):
+        """
+        Listening gate: consumes the ring frame by frame until the VAD
+        fires, then rewinds so the recognizer still hears the first word.
+        Returns False on timeout. Only audio from pre-roll before the call
+        on is considered: what played while VERA was busy (her own reply
+        included) is skipped.
+        """
+        ring = self.capture.ring
+        frame = detector.frame_len
+        preroll = int(preroll_s * self.capture.sample_rate)
+        start = self.cursor = max(self.cursor, ring.written - preroll)
+        detector.reset()
+        while True:
+            if not self.capture.wait_until(self.cursor + frame, timeout):
+                return False
+            if ring.written - self.cursor > ring.capacity:
+                self.cursor = ring.written - frame
+            self.cursor += frame
+            if detector.process(ring.window(frame, self.cursor)):
+                break
+        onset = (detector.onset_frames + 1) * frame
+        self.rewind(onset + preroll)
+        self.cursor = max(self.cursor, start)
+        return True
+
+    def rewind(self, samples):
+        """Steps back so the next read includes audio that already went by."""
+        oldest = max(0, self.capture.ring.written - self.capture.ring.capacity)
+        self.cursor = max(oldest, self.cursor - samples)
+
+
+class SharedMicSource(_AudioSourceBase):
+    """Drop-in for sr.Microphone that reads from the shared capture."""
+
+    def __init__(self, capture, chunk_size=1024):
+        self.capture = capture
+        self.SAMPLE_RATE = capture.sample_rate
+        self.SAMPLE_WIDTH = 2
+        self.CHUNK = chunk_size
+        self.stream = None
+
+    def __enter__(self):
+        if not self.capture.start():
+            raise RuntimeError("Shared microphone capture is unavailable.")
+        self.stream = _RingReader(self.capture)
+        return self
+
+    def __exit__(self, exc_type, exc_value, traceback):
+        self.stream = None
+
+
+_shared = None
+_shared_lock = threading.Lock()
+
+
+def shared_capture():
+    """Returns the process-wide capture (created on first use)."""
+    global _shared
+    with _shared_lock:
+        if _shared is None:
+            _shared = MicCapture()
+        return _shared
@@ -0,0 +1,259 @@
+import os
+import sys
+import threading
+import time
+from collections import deque
+from contextlib import contextmanager
+
+import httpx
+
+try:
+    import metrics
+except ImportError:
+    # Fallback when imported as 'core.model_clients' (tests)
+    sys.path.append(os.path.dirname(__file__))
+    import metrics
+
+# --- CONFIG ---
+KEEPALIVE_S = 120  # Pooled connections stay open this long while idle
+MAX_KEEPALIVE = 8  # Idle connections kept per host
+READY_WAIT_S = 3.0  # How long a caller waits for a client that is still connecting
+REWARM_IDLE_S = 45  # Re-warm a provider after this long without a request
+RETRY_S = 30  # Try a failed provider again after this long
+TIMING_WINDOW = 100  # Requests kept per provider for the stats
+
+# --- STATES ---
+OFFLINE = "offline"  # No API key
+CONNECTING = "connecting"
+WARMING = "warming"  # Client built, warm-up request in flight (already usable)
+READY = "ready"
+FAILED = "failed"
+
+_trace = threading.local()  # Connect time of the request on this thread
+
+
+def _on_trace(event, info):
+    """httpcore trace hook: adds up TCP + TLS setup for the current request."""
+    if event.endswith(".started"):
+        _trace.started = time.perf_counter()
+    elif event in (
+        "connection.connect_tcp.complete",
+        "connection.start_tls.complete",
+    ):
+        _trace.connect_ms = getattr(_trace, "connect_ms", 0.0) + (
+            (time.perf_counter() - _trace.started) * 1000
+        )
+
+
+class TimedTransport(httpx.HTTPTransport):
+    """Pooled transport that reports connection setup time per request."""
+
+    def handle_request(self, request):
+        request.extensions["trace"] = _on_trace
+        return super().handle_request(request)
+
+
+def pooled_http_client(**kwargs):
+    """One keep-alive pool for every call to a provider."""
+    limits = httpx.Limits(
+        max_keepalive_connections=MAX_KEEPALIVE, keepalive_expiry=KEEPALIVE_S
+    )
+    return httpx.Client(transport=TimedTransport(limits=limits), **kwargs)
+
+
+class RequestTimer:
+    """Connect, time-to-first-token and total for one request."""
+
+    def __init__(self, provider, label):
+        self.provider = provider
+        self.label = label
+        self.start = time.perf_counter()
+        self.connect_ms = None
+        self.ttft_ms = None
+        self.total_ms = None
+
+    def first_token(self):
+        if self.ttft_ms is None:
+            self.ttft_ms = (time.perf_counter() - self.start) * 1000
+
+    def finish(self, connect_ms):
+        self.total_ms = (time.perf_counter() - self.start) * 1000
+        self.connect_ms = connect_ms
+        if self.ttft_ms is None:
+            self.ttft_ms = self.total_ms  # Not streamed: the reply is the first token
+
+    def __str__(self):
+        connect = "n/a" if self.connect_ms is None else f"{self.connect_ms:.0f}ms"
+        return (
+            f"{self.provider} {self.label}: connect {connect}, "
+            f"first token {self.ttft_ms:.0f}ms, total {self.total_ms:.0f}ms"
+        )
+
+
+class Provider:
+    """One remote model service: how to build its client and how to warm it."""
+
+    def __init__(self, name, connect, warm=None, traced=True):
+        self.name = name
+        self.connect = connect  # () -> client, or None if there is no key
+        self.warm = warm  # (client) -> anything; a cheap request
+        self.traced = traced  # False if its calls don't go through TimedTransport
+        self.client = None
+        self.state = CONNECTING
+        self.error = None
+        self.changed_at = time.monotonic()
+        self.last_used = 0.0
+        self.usable = threading.Event()  # Set once a client exists (or never will)
+        self.timings = deque(maxlen=TIMING_WINDOW)
+        self.warmups = 0
+
+
+class ClientManager:
+    """
+    Builds every model client once, off the voice thread, and keeps its
+    connections hot. Each provider moves CONNECTING -> WARMING -> READY (or
+    OFFLINE / FAILED); a keeper thread re-warms providers that have been
+    idle long enough for their pooled connection to go cold and retries
+    ones that failed.
+    """
+
+    def __init__(self, rewarm_idle_s=REWARM_IDLE_S, retry_s=RETRY_S):
+        self.rewarm_idle_s = rewarm_idle_s
+        self.retry_s = retry_s
+        self.providers = {}
+        self.lock = threading.Lock()
+        self.stop_event = threading.Event()
+        self.keeper = None
+
+    def add(self, provider):
+        self.providers[provider.name] = provider
+        return provider
+
+    def start(self):
+        """Connects and warms everything in the background."""
+        for provider in self.providers.values():
+            threading.Thread(
+                target=self._bring_up, args=(provider,), daemon=True
+            ).start()
+        self.keeper = threading.Thread(target=self._keep_warm, daemon=True)
+        self.keeper.start()
+
+    def _set_state(self, provider, state, error=None):
+        with self.lock:
+            provider.state = state
+            provider.error = error
+            provider.changed_at = time.monotonic()
+
+    def _bring_up(self, provider):
+        self._set_state(provider, CONNECTING)
+        try:
+            client = provider.connect()
+        except Exception as e:
+            print(f"{provider.name} Connect Error: {e}")
+            self._set_state(provider, FAILED, str(e))
+            provider.usable.set()
+            return
+        if client is None:
+            self._set_state(provider, OFFLINE)
+            provider.usable.set()
+            return
+        provider.client = client
+        self._set_state(provider, WARMING)
+        provider.usable.set()
+        print(f"DEBUG: {provider.name} connected.")
+        self._warm(provider)
+
+    def _warm(self, provider):
+        if not provider.warm:
+            self._set_state(provider, READY)
+            return
+        try:
+            with self.timed(provider.name, "warm-up") as timer:
+                provider.warm(provider.client)
+            provider.warmups += 1
+            self._set_state(provider, READY)
+            print(f"DEBUG: Warm-up {timer}")
+        except Exception as e:
+            # The client still works; the next real request just pays the setup
+            print(f"{provider.name} Warm-up Error: {e}")
+            self._set_state(provider, READY, str(e))
+
+    def _keep_warm(self):
+        while not self.stop_event.wait(min(self.rewarm_idle_s, self.retry_s) / 3):
+            now = time.monotonic()
+            for provider in list(self.providers.values()):
+                if (
+                    provider.state == FAILED
+                    and now - provider.changed_at > self.retry_s
+                ):
+                    self._bring_up(provider)
+                elif (
+                    provider.state == READY
+                    and now - max(provider.last_used, provider.changed_at)
+                    > self.rewarm_idle_s
+                ):
+                    self._warm(provider)
+
+    def get(self, name, wait=READY_WAIT_S):
+        """
+        The provider's client, waiting up to 'wait' seconds if it is still
+        connecting. None if it is offline, failed or too slow to come up.
+        """
+        provider = self.providers.get(name)
+        if not provider:
+            return None
+        provider.usable.wait(wait)
+        return provider.client if provider.state in (WARMING, READY) else None
+
+    def state(self, name):
+        provider = self.providers.get(name)
+        return provider.state if provider else OFFLINE
+
+    @contextmanager
+    def timed(self, name, label):
+        """
+        Times one request: with clients.timed("groq", model) as t: ...
+        Call t.first_token() when a streamed reply starts arriving.
+        """
+        provider = self.providers[name]
+        timer = RequestTimer(name, label)
+        _trace.connect_ms = 0.0
+        try:
+            yield timer
+        finally:
+            timer.finish(_trace.connect_ms if provider.traced else None)
+            with self.lock:
+                provider.last_used = time.monotonic()
+                provider.timings.append(timer)
+
+    def stats(self):
+        report = {}
+        with self.lock:
+            for name, provider in self.providers.items():
+                timings = list(provider.timings)
+                connects = [t.connect_ms for t in timings if t.connect_ms is not None]
+                report[name] = {
+                    "state": provider.state,
+                    "error": provider.error,
+                    "requests": len(timings),
+                    "warmups": provider.warmups,
+                    "cold": sum(1 for c in connects if c > 0),
+                    "connect_ms_avg": (
+                        sum(connects) / len(connects) if connects else None
+                    ),
+                    "ttft_ms_p50": metrics.percentile([t.ttft_ms for t in timings], 50),
+                    "total_ms_p50": metrics.percentile(
+                        [t.total_ms for t in timings], 50
+                    ),
+                }
+        return report
+
+    def close(self):
+        self.stop_event.set()
+        for provider in self.providers.values():
+            close = getattr(provider.client, "close", None)
+            if close:
+                try:
+                    close()
+                except Exception:
+                    pass
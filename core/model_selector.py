@@ -0,0 +1,134 @@
+import os
+import sys
+import threading
+import time
+from collections import deque
+
+try:
+    import metrics
+except ImportError:
+    # Fallback when imported as 'core.model_selector' (tests)
+    sys.path.append(os.path.dirname(__file__))
+    import metrics
+
+# --- CONFIG ---
+EWMA_ALPHA = 0.3  # Weight of the newest sample; higher reacts faster
+LATENCY_WINDOW = 100  # Samples kept per (model, endpoint) for percentiles
+BUDGET_PERCENTILE = 90  # The tail that must also fit the budget
+MIN_SAMPLES = 3  # Below this a model is trusted to fit
+PROBE_AFTER_S = 120  # Re-try a downgraded model after this long without data
+
+
+class LatencyStats:
+    """EWMA plus a window for percentiles, for one model on one endpoint."""
+
+    def __init__(self, alpha=EWMA_ALPHA, window=LATENCY_WINDOW):
+        self.alpha = alpha
+        self.ewma = None
+        self.samples = deque(maxlen=window)
+        self.updated = 0.0
+
+    def add(self, seconds):
+        if self.ewma is None:
+            self.ewma = seconds
+        else:
+            self.ewma = self.alpha * seconds + (1 - self.alpha) * self.ewma
+        self.samples.append(seconds)
+        self.updated = time.monotonic()
+
+    def percentile(self, pct):
+        return metrics.percentile(list(self.samples), pct)
+
+
+class ModelSelector:
+    """
+    Picks, per intent, the best model whose observed latency fits that
+    intent's budget. candidates[intent] lists models best-first; budgets
+    [intent] is in seconds. A model fits while both its EWMA (how it is
+    doing right now) and its BUDGET_PERCENTILE (its tail) are in budget.
+    If none fits, the fastest one is used. A model nobody has picked for
+    PROBE_AFTER_S gets one request again so it can earn its way back.
+    """
+
+    def __init__(
+        self,
+        candidates,
+        budgets,
+        percentile=BUDGET_PERCENTILE,
+        min_samples=MIN_SAMPLES,
+        probe_after_s=PROBE_AFTER_S,
+    ):
+        self.candidates = candidates
+        self.budgets = budgets
+        self.percentile = percentile
+        self.min_samples = min_samples
+        self.probe_after_s = probe_after_s
+        self.stats_by_key = {}  # (model, endpoint) -> LatencyStats
+        self.lock = threading.Lock()
+        self.decisions = {"fits": 0, "downgraded": 0, "probe": 0, "no_data": 0}
+
+    def observe(self, model, endpoint, seconds):
+        """Records one latency (time to first token for streams)."""
+        with self.lock:
+            key = (model, endpoint)
+            if key not in self.stats_by_key:
+                self.stats_by_key[key] = LatencyStats()
+            self.stats_by_key[key].add(seconds)
+
+    def _judge(self, model, endpoint, budget, now):
+        """(fits, reason) for one candidate."""
+        stats = self.stats_by_key.get((model, endpoint))
+        if not stats or len(stats.samples) < self.min_samples:
+            return True, "no_data", f"{model}: not enough data yet"
+        tail = stats.percentile(self.percentile)
+        if stats.ewma <= budget and tail <= budget:
+            return (
+                True,
+                "fits",
+                f"{model}: ewma {stats.ewma:.2f}s, p{self.percentile} "
+                f"{tail:.2f}s within {budget:.1f}s",
+            )
+        if now - stats.updated > self.probe_after_s:
+            return True, "probe", f"{model}: re-trying after {self.probe_after_s}s"
+        slow = "ewma" if stats.ewma > budget else f"p{self.percentile}"
+        value = stats.ewma if stats.ewma > budget else tail
+        return False, "downgraded", f"{model} {slow} {value:.2f}s > {budget:.1f}s"
+
+    def choose(self, intent, endpoint="stream"):
+        """Returns (model, reason)."""
+        models = self.candidates[intent]
+        budget = self.budgets[intent]
+        now = time.monotonic()
+        with self.lock:
+            skipped = []
+            for model in models:
+                fits, kind, reason = self._judge(model, endpoint, budget, now)
+                if fits:
+                    if skipped:
+                        kind = "downgraded"
+                        reason = f"{'; '.join(skipped)} -> {reason}"
+                    self.decisions[kind] += 1
+                    return model, reason
+                skipped.append(reason)
+
+            # Nothing fits: the least slow model is still the best bet
+            def ewma(model):
+                stats = self.stats_by_key.get((model, endpoint))
+                return stats.ewma if stats and stats.ewma is not None else 0.0
+
+            model = min(models, key=ewma)
+            self.decisions["downgraded"] += 1
+            return model, f"{'; '.join(skipped)} -> fastest is {model}"
+
+    def stats(self):
+        with self.lock:
+            latency = {
+                f"{model}/{endpoint}": {
+                    "ewma_s": stats.ewma,
+                    "p50_s": stats.percentile(50),
+                    f"p{self.percentile}_s": stats.percentile(self.percentile),
+                    "samples": len(stats.samples),
+                }
+                for (model, endpoint), stats in self.stats_by_key.items()
+            }
+            return {"latency": latency, "decisions": dict(self.decisions)}
@@ -0,0 +1,74 @@
+import json
+import os
+import threading
+import time
+
+# --- CONFIG ---
+SAVE_DELAY_S = 2.0  # Changes within this window share one write
+
+
+def write_json(path, data, indent=None):
+    """
+    Atomic write: data goes to a temp file that then replaces path, so a
+    reader (or a crash) sees the old file or the new one, never half.
+    """
+    directory = os.path.dirname(path)
+    if directory:
+        os.makedirs(directory, exist_ok=True)
+    tmp_path = path + ".tmp"
+    with open(tmp_path, "w", encoding="utf-8") as f:
+        json.dump(data, f, indent=indent)
+    os.replace(tmp_path, path)
+
+
+class DebouncedSaver:
+    """
+    One writer thread for one file. request() only flags that something
+    changed and returns; the thread calls save() once the changes have
+    settled for delay_s, so a burst becomes a single write and two writes
+    of the same file never overlap.
+    """
+
+    def __init__(self, save, delay_s=SAVE_DELAY_S):
+        self.save = save
+        self.delay_s = delay_s
+        self.cond = threading.Condition()
+        self.requested = False
+        self.closed = False
+        self.requests = 0
+        self.saves = 0
+        self.worker = threading.Thread(target=self._run, daemon=True)
+        self.worker.start()
+
+    def request(self):
+        with self.cond:
+            self.requested = True
+            self.requests += 1
+            self.cond.notify_all()
+
+    def close(self, timeout=2.0):
+        """Writes anything still pending, then stops the thread."""
+        with self.cond:
+            self.closed = True
+            self.cond.notify_all()
+        self.worker.join(timeout)
+
+    def _run(self):
+        while True:
+            with self.cond:
+                while not self.requested and not self.closed:
+                    self.cond.wait()
+                if not self.requested:
+                    return
+                deadline = time.monotonic() + self.delay_s
+                while not self.closed:
+                    left = deadline - time.monotonic()
+                    if left <= 0:
+                        break
+                    self.cond.wait(left)
+                self.requested = False
+            try:
+                self.save()
+                self.saves += 1
+            except Exception as e:
+                print(f"Save Error: {e}")
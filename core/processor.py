@@ -3,13 +3,13 @@ import edge_tts
 import os
 import pygame
 import datetime
+import random
 import psutil
 import threading
-import sounddevice as sd
+import contextlib
 import numpy as np
 import time
 import webbrowser
-import subprocess
 import pyautogui
 from fuzzywuzzy import process
 
@@ -17,18 +17,60 @@ from fuzzywuzzy import process
 # We import these directly because 'core' is now in the system path
 import ai_ops
 import voice_lock
+import speech_cache
+import speech_stream
+import speech_pipeline
+import speech_service
+import mic_capture
+import vad
+import action_cache
+import latency_masker
+from speech_service import PRIORITY_ALARM, PRIORITY_NORMAL, PRIORITY_CHATTER
 
 # --- PATH SETUP ---
 # Get the root VERA folder (Up one level from core)
 CURRENT_DIR = os.path.dirname(os.path.abspath(__file__))
 ROOT_DIR = os.path.dirname(CURRENT_DIR)
-OUTPUT_FILE = os.path.join(ROOT_DIR, "assets", "speech.mp3")
 
 # --- CONFIG ---
 VOICE = "en-US-AriaNeural"
+RATE = "+0%"
+PITCH = "+0Hz"
+STREAM_SPEECH = True  # Start talking while edge_tts is still synthesizing
+PIPELINE_SPEECH = True  # Multi-sentence replies are synthesized sentence by sentence
+STREAM_REPLIES = True  # Speak LLM replies while they are still being generated
+
+# Latency masking: a short filler once a slow call has kept us quiet this long
+MASK_LATENCY = True
+FILLER_THRESHOLD_S = 0.7
+FILLER_FADE_MS = 250
+FILLER_FILES = [os.path.join(ROOT_DIR, "assets", "filler.mp3")]
+FILLER_CHANNEL = 0  # Reserved, so streamed speech never lands on it
+
+# Barge-in: VERA's own voice leaks into the mic, so learn its level for the
+# first few frames of every reply and demand real speech well above it.
+BARGE_IN_CALIBRATION_FRAMES = 10  # ~300ms
+BARGE_IN_MARGIN_DB = 12.0
+BARGE_IN_ONSET_FRAMES = 8  # ~240ms of sustained speech
+
+# Acknowledgements we say all day; synthesized once and replayed from disk
+COMMON_PHRASES = [
+    "On it.",
+    "Typing.",
+    "Checking screen.",
+    "Checking camera.",
+    "Let me think...",
+    "Scanning system for apps...",
+    "Voice authorization failed.",
+    "I'm not sure what to open.",
+    "I'm not sure what to type.",
+    "I had a glitch.",
+    "Shutting down. Goodbye.",
+]
 
 # --- HOOKS ---
 gui_popup_hook = None
+gui_stream_hook = None  # (text, done): each streamed sentence, then the full reply
 gui_stats_hook = None
 toggle_hand_mouse = None
 shutdown_hook = None
@@ -36,43 +78,279 @@ shutdown_hook = None
 
 class VeraState:
     is_speaking = False
+    fillers = None  # Pre-decoded pygame Sounds, loaded with the mixer
+    last_ttfa_ms = None  # Time-to-first-audio of the last uncached reply
+    barge_in_token = None
 
 
 state = VeraState()
+tts_cache = speech_cache.SpeechCache()
+mic = mic_capture.shared_capture()
+plan_cache = action_cache.ActionCache()
+barge_in_vad = vad.VoiceActivityDetector(
+    sample_rate=mic.sample_rate,
+    energy_margin_db=BARGE_IN_MARGIN_DB,
+    onset_frames=BARGE_IN_ONSET_FRAMES,
+)
 
 
 # --- AUDIO SYSTEMS ---
-def listen_for_interrupt():
+def stop_audio():
+    """Silences both file playback and streamed channels."""
+    state.is_speaking = False
+    if pygame.mixer.get_init():
+        pygame.mixer.music.stop()
+        pygame.mixer.stop()
+
+
+def listen_for_interrupt(block):
     """Stops speaking if the user interrupts (talks over VERA)."""
-    time.sleep(1.0)
-    noise_start = [None]
+    if not state.is_speaking:
+        return
+    if barge_in_vad.process(block):
+        print("DEBUG: Interrupt detected! Stopping audio.")
+        stop_audio()
+
+
+def _ensure_barge_in():
+    # Subscribed once for the whole session; no per-utterance device open
+    if state.barge_in_token is None and mic.start():
+        state.barge_in_token = mic.subscribe(listen_for_interrupt)
+
+
+def _ensure_mixer():
+    # Only ever called on the speech thread, so there is exactly one device
+    if not pygame.mixer.get_init():
+        pygame.mixer.init()
+        pygame.mixer.set_reserved(FILLER_CHANNEL + 1)
+        _load_fillers()
+
+
+def _load_fillers():
+    """Decodes the filler bank once so starting one costs nothing."""
+    state.fillers = []
+    for path in FILLER_FILES:
+        try:
+            state.fillers.append(pygame.mixer.Sound(path))
+        except Exception as e:
+            print(f"Filler Error: {path}: {e}")
+
+
+async def _start_filler():
+    _ensure_mixer()
+    if state.fillers:
+        pygame.mixer.Channel(FILLER_CHANNEL).play(random.choice(state.fillers))
+
+
+def _play_filler():
+    # Called from the masker's thread; the mixer belongs to the speech thread
+    speech_worker.run(_start_filler())
+
+
+def _fade_filler(fade_ms):
+    if pygame.mixer.get_init():
+        pygame.mixer.Channel(FILLER_CHANNEL).fadeout(fade_ms)
+
+
+def _audio_busy():
+    if not pygame.mixer.get_init():
+        return False
+    return pygame.mixer.music.get_busy() or pygame.mixer.get_busy()
+
+
+async def _synthesize(text):
+    """Returns the mp3 bytes for text straight from edge_tts."""
+    communicate = edge_tts.Communicate(text, VOICE, rate=RATE, pitch=PITCH)
+    audio = bytearray()
+    async for chunk in communicate.stream():
+        if chunk["type"] == "audio":
+            audio.extend(chunk["data"])
+    return bytes(audio)
+
 
-    def audio_callback(indata, frames, time_info, status):
-        if not state.is_speaking:
+async def _synthesize_cached(text):
+    """Returns an mp3 path for text, hitting edge_tts only on a cache miss."""
+    path = tts_cache.get(text, VOICE, RATE, PITCH)
+    if path:
+        return path
+    return tts_cache.put(text, VOICE, RATE, PITCH, await _synthesize(text))
+
+
+def prewarm_speech_cache(phrases=None):
+    """Fills the TTS cache so the usual acknowledgements play instantly."""
+    added = tts_cache.prewarm(
+        phrases or COMMON_PHRASES,
+        lambda phrase: speech_worker.run(_synthesize(phrase)).result(),
+        VOICE,
+        RATE,
+        PITCH,
+    )
+    print(f"DEBUG: TTS cache warmed ({added} new). {tts_cache.stats()}")
+    return added
+
+
+def _start_speaking():
+    _ensure_barge_in()
+    barge_in_vad.reset(calibration_frames=BARGE_IN_CALIBRATION_FRAMES)
+    state.is_speaking = True
+
+
+async def _play_file_async(audio_file):
+    """Plays an mp3 to the end. Returns False if the user talked over it."""
+    _ensure_mixer()
+    masker.fade()  # Cross-fade: the filler dies away under the answer
+    pygame.mixer.music.load(audio_file)
+    pygame.mixer.music.play()
+
+    # Wait for audio to finish
+    while pygame.mixer.music.get_busy() and state.is_speaking:
+        await asyncio.sleep(0.01)
+
+    completed = state.is_speaking
+    pygame.mixer.music.stop()
+    pygame.mixer.music.unload()
+    return completed
+
+
+async def _speak_file(audio_file):
+    _start_speaking()
+    try:
+        await _play_file_async(audio_file)
+    finally:
+        state.is_speaking = False
+
+
+async def _speak_pipelined(segments):
+    """
+    Plays sentence N while sentence N+1 (and a few more) are synthesized.
+    segments may still be arriving (a SegmentFeed from an LLM stream).
+    """
+    _start_speaking()
+    first = True
+
+    async def play(audio):
+        nonlocal first
+        if first:
+            # A streamed reply can start well after we began; relearn our level
+            first = False
+            barge_in_vad.reset(calibration_frames=BARGE_IN_CALIBRATION_FRAMES)
+        return await _play_file_async(audio)
+
+    try:
+        stats = await speech_pipeline.run_pipeline(
+            segments,
+            _synthesize_cached,
+            play,
+            lambda: state.is_speaking,
+        )
+    finally:
+        state.is_speaking = False
+
+    if stats["first_audio_ms"] is not None:
+        print(
+            f"DEBUG: Time to first audio {stats['first_audio_ms']:.0f}ms "
+            f"({stats['played']}/{stats['segments']} sentences)"
+        )
+    state.last_ttfa_ms = stats["first_audio_ms"]
+
+
+async def _speak_streaming(text):
+    """Plays edge_tts audio as it arrives instead of waiting for the full file."""
+    _ensure_mixer()
+    freq, _, channels = pygame.mixer.get_init()
+    decoder = speech_stream.StreamDecoder(freq, channels)
+    audio = bytearray()
+
+    async def chunks():
+        communicate = edge_tts.Communicate(text, VOICE, rate=RATE, pitch=PITCH)
+        async for chunk in communicate.stream():
+            if chunk["type"] == "audio":
+                audio.extend(chunk["data"])
+                yield chunk["data"]
+
+    def make_sound(pcm):
+        masker.fade()  # The first decoded audio is the moment to let go
+        return pygame.mixer.Sound(buffer=pcm)
+
+    _start_speaking()
+    try:
+        stats = await speech_stream.play_stream(
+            chunks(),
+            decoder,
+            pygame.mixer.find_channel(True),
+            make_sound,
+            lambda: state.is_speaking,
+        )
+    finally:
+        decoder.close()
+        state.is_speaking = False
+
+    state.last_ttfa_ms = stats["ttfa_ms"]
+    if stats["ttfa_ms"] is not None:
+        print(f"DEBUG: Time to first audio {stats['ttfa_ms']:.0f}ms")
+    if stats["completed"]:
+        # Only whole utterances go in the cache, never a barged-in fragment
+        tts_cache.put(text, VOICE, RATE, PITCH, bytes(audio))
+
+
+async def _speak_async(clean_text):
+    """Picks the fastest way to get clean_text out of the speakers."""
+    try:
+        if isinstance(clean_text, speech_pipeline.SegmentFeed):
+            await _speak_pipelined(clean_text)
             return
-        # Check volume level
-        volume_norm = np.linalg.norm(indata) * 10
-        if volume_norm > 45:  # Sensitivity threshold
-            if noise_start[0] is None:
-                noise_start[0] = time.time()
-            elif time.time() - noise_start[0] > 0.7:
-                print("DEBUG: Interrupt detected! Stopping audio.")
-                pygame.mixer.music.stop()
-                state.is_speaking = False
+
+        # Cache hits skip the network entirely
+        segments = speech_pipeline.split_sentences(clean_text)
+        cached_file = tts_cache.get(clean_text, VOICE, RATE, PITCH)
+        if cached_file:
+            await _speak_file(cached_file)
+        elif PIPELINE_SPEECH and len(segments) > 1:
+            await _speak_pipelined(segments)
+        elif STREAM_SPEECH and speech_stream.STREAMING_AVAILABLE:
+            await _speak_streaming(clean_text)
         else:
-            noise_start[0] = None
+            audio_file = await _synthesize_cached(clean_text)
+            if audio_file:
+                await _speak_file(audio_file)
 
-    try:
-        with sd.InputStream(callback=audio_callback):
-            while state.is_speaking:
-                sd.sleep(100)
-    except:
-        pass
+    except Exception as e:
+        print(f"Audio Error: {e}")
+        state.is_speaking = False
+
+
+speech_worker = speech_service.SpeechService(_speak_async, preempt=stop_audio)
+masker = latency_masker.LatencyMasker(
+    _play_filler,
+    _fade_filler,
+    busy=_audio_busy,
+    threshold_s=FILLER_THRESHOLD_S,
+    fade_ms=FILLER_FADE_MS,
+)
 
 
-def speak(text):
+def masked(label):
+    """with masked("scan"): ... covers a slow call with filler audio."""
+    if MASK_LATENCY:
+        return masker.mask(label)
+    return contextlib.nullcontext()
+
+
+def answer(label, fetch):
+    """Speaks fetch()'s reply; only the wait for it is covered with filler."""
+    if MASK_LATENCY:
+        return masker.answer(label, fetch, speak)
+    return speak(fetch())
+
+
+def speak(text, priority=PRIORITY_NORMAL, wait=True):
+    """
+    Queues text on the speech thread.
+    wait=True blocks until it has been spoken (so the mic doesn't hear VERA);
+    wait=False returns the Future straight away.
+    """
     if not text:
-        return
+        return None
 
     # Pronunciation Fixes
     clean_text = text.replace("V.E.R.A.", "Vera").replace("VERA", "Vera")
@@ -85,32 +363,72 @@ def speak(text):
         except:
             pass
 
+    spoken = speech_pipeline.strip_markup(clean_text)  # Tags are for the UI
+    if not spoken:
+        return None  # Markup only: the UI shows it, there is nothing to say
+    future = speech_worker.submit(spoken, priority)
+    if wait and not speech_worker.in_worker():
+        future.result()
+    return future
+
+
+def speak_stream(chunks, priority=PRIORITY_NORMAL):
+    """
+    Speaks a token stream (e.g. ai_ops.ask_brain_stream) sentence by
+    sentence while it is still being generated. Blocks until everything
+    has been spoken and returns the full text.
+    """
+    feed = speech_pipeline.SegmentFeed(speech_worker.loop)
+    future = speech_worker.submit(feed, priority)
+    assembler = speech_pipeline.SentenceAssembler()
+    sentences = []
+
+    def emit(sentence):
+        masker.finish()  # The answer is here; its audio will fade any filler
+        sentence = sentence.replace("V.E.R.A.", "Vera").replace("VERA", "Vera")
+        print(f"VERA: {sentence}")
+        sentences.append(sentence)
+        if gui_stream_hook:
+            try:
+                gui_stream_hook(sentence, False)
+            except:
+                pass
+        spoken = speech_pipeline.strip_markup(sentence)
+        if spoken:
+            feed.put(spoken)
+
     try:
-        # Generate Audio
-        communicate = edge_tts.Communicate(clean_text, VOICE)
-        asyncio.run(communicate.save(OUTPUT_FILE))
+        for chunk in chunks:
+            for sentence in assembler.feed(chunk):
+                emit(sentence)
+        for sentence in assembler.finish():
+            emit(sentence)
+    finally:
+        feed.close()
+
+    full_text = " ".join(sentences)
+    hook = gui_stream_hook or gui_popup_hook
+    if hook and full_text:
+        try:
+            if gui_stream_hook:
+                gui_stream_hook(full_text, True)
+            else:
+                gui_popup_hook(full_text)
+        except:
+            pass
 
-        # Play Audio
-        if not pygame.mixer.get_init():
-            pygame.mixer.init()
-        pygame.mixer.music.load(OUTPUT_FILE)
-        pygame.mixer.music.play()
+    if not speech_worker.in_worker():
+        future.result()
+    return full_text
 
-        state.is_speaking = True
-        # Start looking for interruptions in a background thread
-        threading.Thread(target=listen_for_interrupt, daemon=True).start()
 
-        # Wait for audio to finish
-        while pygame.mixer.music.get_busy() and state.is_speaking:
-            pygame.time.Clock().tick(10)
+def speak_alarm(text):
+    """For timers and warnings: jumps the queue and cuts off chatter."""
+    return speak(text, priority=PRIORITY_ALARM, wait=False)
 
-        pygame.mixer.music.stop()
-        pygame.mixer.music.unload()
-        state.is_speaking = False
 
-    except Exception as e:
-        print(f"Audio Error: {e}")
-        state.is_speaking = False
+def get_speech_stats():
+    return speech_worker.stats()
 
 
 # --- UTILS ---
@@ -127,6 +445,35 @@ def get_time():
 
 
 # --- BRAIN ---
+def _remember_plan(command, intent, slots, target=None, app=None, library_version=None):
+    """Caches what a command resolved to; written after the action has fired."""
+    plan = {"intent": intent, "slots": slots, "target": target}
+    if app:
+        plan["app"] = app  # Library entry: shortcut path and launch info
+    # Only resolved apps go stale when the library is rescanned
+    if plan_cache.put(command, plan, library_version if app else None):
+        plan_cache.save_later()
+
+
+def get_plan_cache_stats():
+    return plan_cache.stats()
+
+
+def get_vision_stats():
+    """Bytes uploaded and end-to-end latency per vision request, cache hits."""
+    return ai_ops.vision_stats()
+
+
+def get_launch_stats():
+    """Direct vs shell app launches, with launch-to-window timings."""
+    return ai_ops.launch_stats()
+
+
+def get_model_stats():
+    """Readiness, timings, deadlines, hedges and breaker state per provider."""
+    return ai_ops.model_stats()
+
+
 def process_command(command, audio_data=None, source=None):
     if not command:
         return
@@ -154,11 +501,18 @@ def process_command(command, audio_data=None, source=None):
             threading.Timer(2.0, shutdown_hook).start()
         return
 
-    # 3. IDENTIFY INTENT
-    intent = ai_ops.identify_intent(command)
-    print(f"DEBUG: Intent = {intent}")
-
-    # 4. SECURITY CHECK
+    # 3. IDENTIFY INTENT (cached plan, then local rules, LLM only when ambiguous)
+    library_version = ai_ops.app_library_version()
+    plan = plan_cache.get(command, library_version)
+    if plan:
+        intent, slots = plan["intent"], plan["slots"]
+        print(f"DEBUG: Intent = {intent} (cached plan)")
+    else:
+        route = ai_ops.route_command(command)
+        intent, slots = route["intent"], route["slots"]
+        print(f"DEBUG: Intent = {intent} (rule: {route['rule']})")
+
+    # 4. SECURITY CHECK (cached plans included)
     if intent in ["CMD_OPEN", "CMD_TYPE", "CMD_SCAN"]:
         if audio_data:
             print("DEBUG: Checking Voice ID...")
@@ -170,33 +524,60 @@ def process_command(command, audio_data=None, source=None):
 
     try:
         # --- ROUTING ---
-        if "scan" in command:
-            speak("Scanning system for apps...")
-            count = ai_ops.update_app_library()
-            speak(f"Done. Found {count} apps.")
+        if intent == "CMD_SCAN" or "scan" in command:
+            speak("Scanning system for apps...", wait=False)
+            with masked("scan"):
+                count = ai_ops.update_app_library()
+            report = ai_ops.scanner.last
+            if report["added"] or report["removed"] or report["changed"]:
+                plan_cache.invalidate_library()
+            added = report["added"]
+            if added:
+                speak(f"Done. Found {count} apps, {added} new.")
+            else:
+                speak(f"Done. Found {count} apps.")
 
         elif intent == "CMD_OPEN":
-            target = ai_ops.extract_open_intent(command)
+            target = plan.get("target") if plan else None
+            if not target:
+                target = ai_ops.open_target_from_slots(slots)
+            if not target:
+                with masked("extract"):
+                    target = ai_ops.extract_open_intent(command)
             if target:
-                speak("On it.")
+                speak("On it.", wait=False)
                 if target["type"] == "web":
                     webbrowser.open(target["target"])
+                    _remember_plan(command, intent, slots, target)
                 elif target["type"] == "app":
                     app_cmd = target["target"].lower().strip()
                     SAFE_APPS = ["notepad", "calc", "code", "spotify", "explorer"]
                     if app_cmd in SAFE_APPS:
-                        subprocess.Popen(app_cmd, shell=True)
+                        ai_ops.launcher.launch_command(app_cmd)
+                        _remember_plan(command, intent, slots, target)
                     else:
-                        path = ai_ops.find_installed_app(app_cmd)
-                        if path:
-                            os.startfile(path)
+                        app = plan.get("app") if plan else None
+                        if app and not os.path.exists(app["path"]):
+                            app = None  # Uninstalled since we cached it
+                        if not app:
+                            app = ai_ops.find_app_entry(app_cmd)
+                        if app:
+                            ai_ops.launch_app(app_cmd, app)
+                            _remember_plan(
+                                command, intent, slots, target, app, library_version
+                            )
                         else:
+                            plan_cache.forget(command)
                             speak(f"I couldn't find {app_cmd}.")
             else:
                 speak("I'm not sure what to open.")
 
         elif intent == "CMD_TYPE":
-            text = ai_ops.extract_type_intent(command)
+            # Never cached: what to type is the user's own text
+            text = ai_ops.type_text_from_slots(slots)
+            if not text:
+                with masked("extract"):
+                    text = ai_ops.extract_type_intent(command)
             if text:
                 speak("Typing.")
                 time.sleep(0.5)
@@ -205,28 +586,48 @@ def process_command(command, audio_data=None, source=None):
                 speak("I'm not sure what to type.")
 
         elif intent == "CMD_SEE":
-            speak("Checking screen.")
-            speak(ai_ops.see_screen(command))
+            speak("Checking screen.", wait=False)
+            if STREAM_REPLIES:
+                with masked("see_screen"):
+                    speak_stream(ai_ops.see_screen_stream(command))
+            else:
+                answer("see_screen", lambda: ai_ops.see_screen(command))
 
         elif intent == "CMD_CAM":
-            speak("Checking camera.")
-            speak(ai_ops.see_camera(command))
+            speak("Checking camera.", wait=False)
+            if STREAM_REPLIES:
+                with masked("see_camera"):
+                    speak_stream(ai_ops.see_camera_stream(command))
+            else:
+                answer("see_camera", lambda: ai_ops.see_camera(command))
 
         elif intent == "CMD_TIME":
             speak(get_time())
 
-        elif "status" in command:
+        elif intent == "CMD_STATUS" or "status" in command:
             stats = get_system_stats()
             if gui_stats_hook:
                 gui_stats_hook(stats)
             speak(f"Systems green. CPU {stats['cpu']}%.")
 
         elif intent == "CHAT_DEEP":
-            speak("Let me think...")
-            speak(ai_ops.ask_brain(command, use_smart_model=True))
+            speak("Let me think...", wait=False)
+            if STREAM_REPLIES:
+                with masked("chat_deep"):
+                    speak_stream(ai_ops.ask_brain_stream(command, use_smart_model=True))
+            else:
+                answer(
+                    "chat_deep", lambda: ai_ops.ask_brain(command, use_smart_model=True)
+                )
 
         else:
-            speak(ai_ops.ask_brain(command, use_smart_model=False))
+            if STREAM_REPLIES:
+                with masked("chat"):
+                    speak_stream(
+                        ai_ops.ask_brain_stream(command, use_smart_model=False)
+                    )
+            else:
+                answer("chat", lambda: ai_ops.ask_brain(command, use_smart_model=False))
 
     except Exception as e:
         print(f"Error: {e}")
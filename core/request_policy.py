@@ -0,0 +1,286 @@
+import os
+import sys
+import threading
+import time
+from collections import deque
+from concurrent.futures import FIRST_COMPLETED, ThreadPoolExecutor, wait
+
+try:
+    import metrics
+except ImportError:
+    # Fallback when imported as 'core.request_policy' (tests)
+    sys.path.append(os.path.dirname(__file__))
+    import metrics
+
+# --- CONFIG ---
+DEFAULT_DEADLINE_S = 10.0  # No model call may hold the voice loop longer
+HEDGE_PERCENTILE = 95  # Fire a duplicate once a call is slower than this
+HEDGE_DEFAULT_S = 1.5  # Hedge delay until enough latencies are known
+HEDGE_MIN_SAMPLES = 20
+LATENCY_WINDOW = 200  # Successful calls kept per label
+FAILURE_THRESHOLD = 3  # Consecutive failures that open the circuit
+RESET_S = 30.0  # Open circuit lets one trial call through after this long
+MAX_WORKERS = 8
+
+# --- BREAKER STATES ---
+CLOSED = "closed"
+OPEN = "open"
+HALF_OPEN = "half_open"
+
+
+class DeadlineExceeded(Exception):
+    pass
+
+
+class CircuitOpen(Exception):
+    pass
+
+
+class CircuitBreaker:
+    """
+    Fails fast while a provider is degraded. FAILURE_THRESHOLD failures in
+    a row open it; after reset_s one trial call is let through (half-open)
+    and its outcome closes or re-opens the circuit.
+    """
+
+    def __init__(self, failure_threshold=FAILURE_THRESHOLD, reset_s=RESET_S):
+        self.failure_threshold = failure_threshold
+        self.reset_s = reset_s
+        self.state = CLOSED
+        self.failures = 0
+        self.opened_at = 0.0
+        self.trial = False  # A half-open trial call is in flight
+        self.lock = threading.Lock()
+
+    def allow(self):
+        with self.lock:
+            if self.state == CLOSED:
+                return True
+            if self.state == OPEN and time.monotonic() - self.opened_at >= self.reset_s:
+                self.state = HALF_OPEN
+            if self.state == HALF_OPEN and not self.trial:
+                self.trial = True
+                return True
+            return False
+
+    def is_open(self):
+        """True while calls would be refused (no side effects, unlike allow)."""
+        with self.lock:
+            return (
+                self.state == OPEN and time.monotonic() - self.opened_at < self.reset_s
+            )
+
+    def record(self, ok):
+        with self.lock:
+            self.trial = False
+            if ok:
+                self.state = CLOSED
+                self.failures = 0
+                return
+            self.failures += 1
+            if self.state == HALF_OPEN or self.failures >= self.failure_threshold:
+                if self.state != OPEN:
+                    print(f"DEBUG: Circuit open after {self.failures} failures.")
+                self.state = OPEN
+                self.opened_at = time.monotonic()
+
+
+class RequestPolicy:
+    """
+    Deadlines, hedging and circuit breaking for one provider.
+
+    call(fn, label) runs fn(timeout) - timeout being the seconds left before
+    the deadline, to pass on to the HTTP client - and returns its result.
+    If a hedged call is still running at the label's p95 latency, a
+    duplicate is started and whichever answers first wins.
+    Raises DeadlineExceeded, CircuitOpen, or the call's own error.
+    stream() does the same for streamed replies, without hedging.
+    """
+
+    def __init__(
+        self,
+        name,
+        deadline_s=DEFAULT_DEADLINE_S,
+        breaker=None,
+        hedge_percentile=HEDGE_PERCENTILE,
+        hedge_default_s=HEDGE_DEFAULT_S,
+        hedge_min_samples=HEDGE_MIN_SAMPLES,
+        max_workers=MAX_WORKERS,
+    ):
+        self.name = name
+        self.deadline_s = deadline_s
+        self.breaker = breaker or CircuitBreaker()
+        self.hedge_percentile = hedge_percentile
+        self.hedge_default_s = hedge_default_s
+        self.hedge_min_samples = hedge_min_samples
+        self.executor = ThreadPoolExecutor(
+            max_workers=max_workers, thread_name_prefix=f"Policy-{name}"
+        )
+        self.latencies = {}  # label -> deque of seconds (successful calls)
+        self.lock = threading.Lock()
+        self.counters = {
+            "calls": 0,
+            "failed": 0,
+            "deadline_exceeded": 0,
+            "short_circuited": 0,
+            "hedged": 0,
+            "hedge_wins": 0,
+        }
+
+    def _count(self, key):
+        with self.lock:
+            self.counters[key] += 1
+
+    def hedge_delay(self, label):
+        """p95 of this label's recent latencies, or the default until known."""
+        with self.lock:
+            samples = list(self.latencies.get(label, ()))
+        if len(samples) < self.hedge_min_samples:
+            return self.hedge_default_s
+        return metrics.percentile(samples, self.hedge_percentile)
+
+    def allow(self):
+        """For calls that can't go through call() (streams): raises if open."""
+        if not self.breaker.allow():
+            self._count("short_circuited")
+            raise CircuitOpen(f"{self.name} is failing; using fallback.")
+        self._count("calls")
+
+    def record(self, label, seconds, ok):
+        """Outcome of a call made after allow()."""
+        self.breaker.record(ok)
+        if ok:
+            with self.lock:
+                self.latencies.setdefault(label, deque(maxlen=LATENCY_WINDOW)).append(
+                    seconds
+                )
+        else:
+            self._count("failed")
+
+    def call(self, fn, label="default", deadline_s=None, hedge=False, observe=None):
+        """
+        observe(seconds), if given, gets how long the answer took, or the
+        full deadline if the call failed: a quick error isn't a quick answer.
+        """
+        self.allow()
+        deadline_s = deadline_s or self.deadline_s
+        start = time.monotonic()
+        deadline = start + deadline_s
+        attempts = {self.executor.submit(fn, deadline_s): 0}
+        hedge_at = start + self.hedge_delay(label) if hedge else None
+        error = None
+
+        while attempts:
+            now = time.monotonic()
+            until = deadline if hedge_at is None else min(deadline, hedge_at)
+            done, _ = wait(
+                list(attempts),
+                timeout=max(0.0, until - now),
+                return_when=FIRST_COMPLETED,
+            )
+            for future in done:
+                attempt = attempts.pop(future)
+                try:
+                    result = future.result()
+                except Exception as e:
+                    error = e
+                    continue
+                for loser in attempts:
+                    loser.cancel()  # Still-running losers finish on their own
+                if attempt:
+                    self._count("hedge_wins")
+                self.record(label, time.monotonic() - start, True)
+                if observe:
+                    observe(time.monotonic() - start)
+                return result
+
+            now = time.monotonic()
+            if hedge_at is not None and now >= hedge_at:
+                hedge_at = None
+                if now < deadline:
+                    # Slower than usual: race a duplicate against the original
+                    self._count("hedged")
+                    attempts[self.executor.submit(fn, deadline - now)] = 1
+                continue
+            if now >= deadline:
+                self._count("deadline_exceeded")
+                self.record(label, now - start, False)
+                if observe:
+                    observe(deadline_s)
+                raise DeadlineExceeded(
+                    f"{self.name} {label} took longer than {deadline_s:.1f}s"
+                )
+
+        self.record(label, time.monotonic() - start, False)
+        if observe:
+            observe(deadline_s)
+        raise error
+
+    def stream(
+        self,
+        open_stream,
+        text_of,
+        label="default",
+        deadline_s=None,
+        observe=None,
+        on_complete=None,
+    ):
+        """
+        Streamed call: open_stream(timeout) -> iterable of chunks, and
+        text_of(chunk) -> the chunk's text or None. Yields text as it
+        arrives; deadline_s bounds the whole reply.
+
+        observe(seconds) gets the time to first token, or the full deadline
+        if the call failed before any text arrived. on_complete(text)
+        runs only if the stream finished cleanly, so a reply cut off
+        mid-stream is never passed on. Raises if the call fails before any
+        text arrived; a later failure just ends the stream.
+        """
+        self.allow()
+        deadline_s = deadline_s or self.deadline_s
+        start = time.monotonic()
+        parts = []
+        ttft = None
+        try:
+            for chunk in open_stream(deadline_s):
+                if time.monotonic() - start > deadline_s:
+                    self._count("deadline_exceeded")
+                    raise DeadlineExceeded(
+                        f"{self.name} {label} took longer than {deadline_s:.0f}s"
+                    )
+                text = text_of(chunk)
+                if text:
+                    if ttft is None:
+                        ttft = time.monotonic() - start
+                    parts.append(text)
+                    yield text
+        except GeneratorExit:
+            # Caller stopped listening (barge-in) while text was still arriving
+            self.breaker.record(True)
+            raise
+        except Exception as e:
+            self.record(label, time.monotonic() - start, False)
+            if observe:
+                # No text at all counts as the whole deadline, however fast
+                # it failed: a model that errors out must not look quick
+                observe(deadline_s if ttft is None else ttft)
+            if not parts:
+                raise
+            print(f"{self.name} {label} failed mid-stream: {e}")
+            return
+        self.record(label, time.monotonic() - start, True)
+        if observe:
+            observe(time.monotonic() - start if ttft is None else ttft)
+        if on_complete:
+            on_complete("".join(parts))
+
+    def stats(self):
+        with self.lock:
+            report = dict(self.counters)
+            p95 = {
+                label: metrics.percentile(list(samples), self.hedge_percentile)
+                for label, samples in self.latencies.items()
+            }
+        report["breaker"] = self.breaker.state
+        report["p95_s"] = p95
+        return report
@@ -0,0 +1,143 @@
+import hashlib
+import os
+import threading
+import unicodedata
+from collections import OrderedDict
+
+# --- PATH SETUP ---
+CURRENT_DIR = os.path.dirname(os.path.abspath(__file__))
+ROOT_DIR = os.path.dirname(CURRENT_DIR)
+CACHE_DIR = os.path.join(ROOT_DIR, "data", "tts_cache")
+
+# --- CONFIG ---
+MAX_CACHE_BYTES = 64 * 1024 * 1024  # ~64MB of mp3 is thousands of phrases
+AUDIO_EXT = ".mp3"
+
+
+def normalize_text(text):
+    """Collapses whitespace so 'On it. ' and 'On it.' share one cache entry."""
+    return " ".join(unicodedata.normalize("NFC", text).split())
+
+
+class SpeechCache:
+    """
+    On-disk cache of synthesized speech, keyed by (text, voice, rate, pitch).
+    Recency lives in the file mtime, so the LRU order survives restarts
+    without a separate index file.
+    """
+
+    def __init__(self, cache_dir=CACHE_DIR, max_bytes=MAX_CACHE_BYTES):
+        self.cache_dir = cache_dir
+        self.max_bytes = max_bytes
+        self.lock = threading.Lock()
+        self.entries = OrderedDict()  # key -> size in bytes (oldest first)
+        self.total_bytes = 0
+        self.hits = 0
+        self.misses = 0
+        self.evictions = 0
+        self._load()
+
+    def _load(self):
+        if not os.path.isdir(self.cache_dir):
+            os.makedirs(self.cache_dir, exist_ok=True)
+            return
+        found = []
+        for entry in os.scandir(self.cache_dir):
+            if entry.is_file() and entry.name.endswith(AUDIO_EXT):
+                st = entry.stat()
+                found.append((st.st_mtime, entry.name[: -len(AUDIO_EXT)], st.st_size))
+        for _, key, size in sorted(found):
+            self.entries[key] = size
+            self.total_bytes += size
+
+    @staticmethod
+    def make_key(text, voice, rate="+0%", pitch="+0Hz"):
+        raw = "\x1f".join([normalize_text(text), voice, rate, pitch])
+        return hashlib.sha256(raw.encode("utf-8")).hexdigest()
+
+    def path_for(self, key):
+        return os.path.join(self.cache_dir, key + AUDIO_EXT)
+
+    def get(self, text, voice, rate="+0%", pitch="+0Hz"):
+        """Returns the cached audio path, or None on a miss."""
+        key = self.make_key(text, voice, rate, pitch)
+        with self.lock:
+            if key not in self.entries:
+                self.misses += 1
+                return None
+            path = self.path_for(key)
+            if not os.path.exists(path):
+                # Someone cleaned the folder behind our back
+                self.total_bytes -= self.entries.pop(key)
+                self.misses += 1
+                return None
+            self.entries.move_to_end(key)
+            self.hits += 1
+        try:
+            os.utime(path)
+        except OSError:
+            pass
+        return path
+
+    def put(self, text, voice, rate="+0%", pitch="+0Hz", audio=b""):
+        """Stores synthesized audio and returns its path (None if empty)."""
+        if not audio:
+            return None
+        key = self.make_key(text, voice, rate, pitch)
+        path = self.path_for(key)
+        tmp_path = f"{path}.{threading.get_ident()}.tmp"
+        with open(tmp_path, "wb") as f:
+            f.write(audio)
+        os.replace(tmp_path, path)
+
+        with self.lock:
+            self.total_bytes -= self.entries.pop(key, 0)
+            self.entries[key] = len(audio)
+            self.total_bytes += len(audio)
+            self._evict()
+        return path
+
+    def _evict(self):
+        # Never evict the newest entry, even if it alone is over budget
+        for key in list(self.entries)[:-1]:
+            if self.total_bytes <= self.max_bytes:
+                break
+            try:
+                os.remove(self.path_for(key))
+            except FileNotFoundError:
+                pass
+            except OSError:
+                continue  # Still playing (Windows locks the file), try later
+            self.total_bytes -= self.entries.pop(key)
+            self.evictions += 1
+
+    def prewarm(self, phrases, synthesize, voice, rate="+0%", pitch="+0Hz"):
+        """
+        Synthesizes any phrase not already cached.
+        'synthesize' takes the text and returns mp3 bytes.
+        Returns how many phrases were added.
+        """
+        added = 0
+        for phrase in phrases:
+            key = self.make_key(phrase, voice, rate, pitch)
+            with self.lock:
+                if key in self.entries:
+                    continue
+            try:
+                if self.put(phrase, voice, rate, pitch, synthesize(phrase)):
+                    added += 1
+            except Exception as e:
+                print(f"TTS Cache Error: {e}")
+        return added
+
+    def stats(self):
+        with self.lock:
+            lookups = self.hits + self.misses
+            return {
+                "entries": len(self.entries),
+                "bytes": self.total_bytes,
+                "hits": self.hits,
+                "misses": self.misses,
+                "evictions": self.evictions,
+                "hit_rate": (self.hits / lookups) if lookups else 0.0,
+            }
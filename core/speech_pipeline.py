@@ -0,0 +1,216 @@
+import asyncio
+import re
+import time
+
+# --- CONFIG ---
+PIPELINE_LOOKAHEAD = 2  # Sentences synthesized ahead of the one playing
+MAX_SEGMENT_CHARS = 220  # Longer sentences get split again at clause breaks
+
+# Sentence ends: ., ! or ? followed by whitespace, or a blank line.
+# The lookbehinds keep "e.g." / "Mr." / "3.5" in one piece.
+SENTENCE_BREAK = re.compile(
+    r"(?<!\b[A-Z]\.)(?<!\be\.g\.)(?<!\bi\.e\.)(?<!\bMr\.)(?<!\bMrs\.)"
+    r"(?<!\bDr\.)(?<!\bvs\.)(?<=[.!?])\s+|\n\s*\n"
+)
+CLAUSE_BREAK = re.compile(r"(?<=[,;:])\s+")
+# Markup for the UI (e.g. <image_search>...</image_search>), never spoken.
+# Ignores case like the UI's IMAGE_TAG_PATTERN, so what it hides isn't read out
+MARKUP_TAG = re.compile(r"<(\w+)>.*?</\1>", re.DOTALL | re.IGNORECASE)
+TAG_OPEN = re.compile(r"<(\w+)>(?![\s\S]*</\1>)", re.IGNORECASE)
+PLACEHOLDER = re.compile(r"\x00(\d+)\x00")
+
+
+def strip_markup(text):
+    return " ".join(MARKUP_TAG.sub(" ", text).split())
+
+
+def _split_long(sentence, max_chars):
+    """Breaks a run-on sentence at commas/semicolons, packing clauses greedily."""
+    parts = []
+    current = ""
+    for clause in CLAUSE_BREAK.split(sentence):
+        if current and len(current) + 1 + len(clause) > max_chars:
+            parts.append(current)
+            current = clause
+        else:
+            current = f"{current} {clause}" if current else clause
+    if current:
+        parts.append(current)
+    return parts
+
+
+def split_sentences(text, max_chars=MAX_SEGMENT_CHARS):
+    """Splits a reply into speakable chunks, in order."""
+    segments = []
+    for sentence in SENTENCE_BREAK.split(text):
+        sentence = " ".join(sentence.split())
+        if not sentence:
+            continue
+        if len(sentence) > max_chars:
+            segments.extend(_split_long(sentence, max_chars))
+        else:
+            segments.append(sentence)
+    return segments
+
+
+def _protect_markup(text):
+    """
+    Swaps closed tags for opaque placeholders so sentence splitting never
+    looks inside them. Returns (text, restore) where restore(part) puts
+    the tags back into any piece of the protected text.
+    """
+    tags = []
+
+    def stash(match):
+        tags.append(match.group(0))
+        return f"\x00{len(tags) - 1}\x00"
+
+    def restore(part):
+        return PLACEHOLDER.sub(lambda m: tags[int(m.group(1))], part)
+
+    return MARKUP_TAG.sub(stash, text), restore
+
+
+class SentenceAssembler:
+    """
+    Collects streamed tokens and hands back each sentence as soon as the
+    whitespace after it arrives. Never cuts inside a <tag>...</tag>, open
+    or closed, so UI markup reaches the caller in one piece.
+    """
+
+    def __init__(self, max_chars=MAX_SEGMENT_CHARS):
+        self.max_chars = max_chars
+        self.buffer = ""
+
+    def feed(self, token):
+        """Returns the sentences completed by this token (often none)."""
+        self.buffer += token
+        hold = self._hold_from()
+        head, restore = _protect_markup(self.buffer[:hold])
+        end = 0
+        for match in SENTENCE_BREAK.finditer(head):
+            end = match.end()
+        if not end:
+            return []
+        self.buffer = restore(head[end:]) + self.buffer[hold:]
+        return [restore(s) for s in split_sentences(head[:end], self.max_chars)]
+
+    def _hold_from(self):
+        """Where the first still-open tag starts (end of buffer if none)."""
+        starts = [len(self.buffer)]
+        partial = self.buffer.rfind("<")
+        if partial > self.buffer.rfind(">"):
+            starts.append(partial)  # "<image_sea..." - the name is still arriving
+        match = TAG_OPEN.search(self.buffer)
+        if match:
+            starts.append(match.start())
+        return min(starts)
+
+    def finish(self):
+        """Whatever is left once the stream ends."""
+        rest, restore = _protect_markup(self.buffer)
+        self.buffer = ""
+        return [restore(s) for s in split_sentences(rest, self.max_chars)]
+
+
+class SegmentFeed:
+    """
+    Thread-safe bridge from a producer thread (an LLM stream) to an async
+    consumer on another loop. put() and close() may be called from any
+    thread; iterate it with 'async for' on 'loop'.
+    """
+
+    def __init__(self, loop):
+        self.loop = loop
+        self.queue = asyncio.Queue()
+
+    def put(self, segment):
+        self.loop.call_soon_threadsafe(self.queue.put_nowait, segment)
+
+    def close(self):
+        self.loop.call_soon_threadsafe(self.queue.put_nowait, None)
+
+    def __aiter__(self):
+        return self
+
+    async def __anext__(self):
+        segment = await self.queue.get()
+        if segment is None:
+            raise StopAsyncIteration
+        return segment
+
+
+async def _iterate(segments):
+    for segment in segments:
+        yield segment
+
+
+async def run_pipeline(
+    segments, synthesize, play, is_active, lookahead=PIPELINE_LOOKAHEAD
+):
+    """
+    Plays segment N while synthesizing up to 'lookahead' segments after it.
+    segments: a list, or an async iterable that is still being produced.
+    synthesize(text) -> audio (async), play(audio) -> True if not interrupted.
+    Any synthesis still in flight is cancelled on barge-in.
+    """
+    start = time.perf_counter()
+    stats = {"segments": 0, "played": 0, "first_audio_ms": None}
+    if not hasattr(segments, "__aiter__"):
+        segments = _iterate(segments)
+    arrived = []
+    tasks = {}
+    position = 0  # Segment being played
+    changed = asyncio.Event()
+    source_done = False
+
+    def schedule(i):
+        if i < len(arrived) and i not in tasks:
+            tasks[i] = asyncio.ensure_future(synthesize(arrived[i]))
+
+    async def collect():
+        nonlocal source_done
+        try:
+            async for segment in segments:
+                arrived.append(segment)
+                # Start synthesis right away if it's within the lookahead
+                if len(arrived) - 1 <= position + lookahead:
+                    schedule(len(arrived) - 1)
+                changed.set()
+        finally:
+            source_done = True
+            changed.set()
+
+    collector = asyncio.ensure_future(collect())
+    try:
+        while is_active():
+            while position >= len(arrived) and not source_done:
+                changed.clear()
+                await changed.wait()
+            if position >= len(arrived):
+                break
+            for ahead in range(position, position + lookahead + 1):
+                schedule(ahead)
+
+            audio = await tasks[position]
+            if not is_active():
+                break
+            if audio:
+                if stats["first_audio_ms"] is None:
+                    stats["first_audio_ms"] = (time.perf_counter() - start) * 1000
+                if not await play(audio):
+                    break
+                stats["played"] += 1
+            position += 1
+    finally:
+        pending = [t for t in tasks.values() if not t.done()]
+        if not collector.done():
+            pending.append(collector)
+        for task in pending:
+            task.cancel()
+        await asyncio.gather(*pending, return_exceptions=True)
+        if collector.done() and not collector.cancelled() and collector.exception():
+            print(f"Pipeline Source Error: {collector.exception()}")
+
+    stats["segments"] = len(arrived)
+    return stats
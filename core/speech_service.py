@@ -0,0 +1,133 @@
+import asyncio
+import itertools
+import os
+import sys
+import threading
+import time
+from collections import deque
+from concurrent.futures import Future
+
+try:
+    import metrics
+except ImportError:
+    # Fallback when imported as 'core.speech_service' (tests)
+    sys.path.append(os.path.dirname(__file__))
+    import metrics
+
+# --- PRIORITIES (lower plays first) ---
+PRIORITY_ALARM = 0  # Timers, security warnings: cut off whatever is playing
+PRIORITY_NORMAL = 5  # Replies to a command
+PRIORITY_CHATTER = 10  # Greetings, status chatter
+
+LATENCY_WINDOW = 200  # Utterances kept for the latency percentiles
+
+
+class _Utterance:
+    def __init__(self, text, priority):
+        self.text = text
+        self.priority = priority
+        self.future = Future()
+        self.submitted = time.perf_counter()
+
+
+class SpeechService:
+    """
+    One long-lived thread that owns the speech event loop (and with it the
+    audio device). Callers queue utterances and get a Future back, so timers,
+    workers and the voice loop no longer talk over each other.
+    """
+
+    def __init__(self, handler, preempt=None, name="VeraSpeech"):
+        self.handler = handler  # async fn(text) -> result
+        self.preempt = preempt  # Called when an urgent utterance arrives
+        self.name = name
+        self.loop = asyncio.new_event_loop()
+        self.queue = asyncio.PriorityQueue()
+        self.current = None
+        self.thread = None
+        self.counter = itertools.count()
+        self.lock = threading.Lock()
+        self.wait_ms = deque(maxlen=LATENCY_WINDOW)
+        self.total_ms = deque(maxlen=LATENCY_WINDOW)
+        self.completed = 0
+        self.failed = 0
+        self.preempted = 0
+
+    def _ensure_started(self):
+        with self.lock:
+            if self.thread is None:
+                self.thread = threading.Thread(
+                    target=self._run, name=self.name, daemon=True
+                )
+                self.thread.start()
+
+    def _run(self):
+        asyncio.set_event_loop(self.loop)
+        self.loop.run_until_complete(self._worker())
+
+    def in_worker(self):
+        return threading.current_thread() is self.thread
+
+    def submit(self, text, priority=PRIORITY_NORMAL):
+        """Queues text and returns a concurrent.futures.Future."""
+        self._ensure_started()
+        item = _Utterance(text, priority)
+        self.loop.call_soon_threadsafe(self._enqueue, item)
+        return item.future
+
+    def run(self, coro):
+        """Runs any coroutine on the speech loop (e.g. cache prewarming)."""
+        self._ensure_started()
+        return asyncio.run_coroutine_threadsafe(coro, self.loop)
+
+    def _enqueue(self, item):
+        self.queue.put_nowait((item.priority, next(self.counter), item))
+        current = self.current
+        if current and item.priority < current.priority and self.preempt:
+            with self.lock:
+                self.preempted += 1
+            self.preempt()
+
+    async def _worker(self):
+        while True:
+            _, _, item = await self.queue.get()
+            if not item.future.set_running_or_notify_cancel():
+                continue  # Caller gave up on it while it was queued
+
+            self.current = item
+            started = time.perf_counter()
+            try:
+                result = await self.handler(item.text)
+            except Exception as e:
+                item.future.set_exception(e)
+                ok = False
+            else:
+                item.future.set_result(result)
+                ok = True
+            finally:
+                self.current = None
+
+            finished = time.perf_counter()
+            with self.lock:
+                self.wait_ms.append((started - item.submitted) * 1000)
+                self.total_ms.append((finished - item.submitted) * 1000)
+                if ok:
+                    self.completed += 1
+                else:
+                    self.failed += 1
+
+    def stats(self):
+        with self.lock:
+            wait_ms = list(self.wait_ms)
+            total_ms = list(self.total_ms)
+            return {
+                "queue_depth": self.queue.qsize(),
+                "speaking": self.current is not None,
+                "completed": self.completed,
+                "failed": self.failed,
+                "preempted": self.preempted,
+                "wait_p50_ms": metrics.percentile(wait_ms, 50),
+                "wait_p95_ms": metrics.percentile(wait_ms, 95),
+                "total_p50_ms": metrics.percentile(total_ms, 50),
+                "total_p95_ms": metrics.percentile(total_ms, 95),
+            }
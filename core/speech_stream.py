@@ -0,0 +1,140 @@
+import asyncio
+import queue
+import shutil
+import subprocess
+import threading
+import time
+
+# --- CONFIG ---
+# edge_tts only hands out mp3, so we pipe it through ffmpeg to get raw PCM.
+FFMPEG_BIN = shutil.which("ffmpeg")
+STREAMING_AVAILABLE = FFMPEG_BIN is not None
+
+PCM_BLOCK_MS = 120  # Size of each chunk handed to the audio device
+POLL_INTERVAL = 0.01
+
+END_OF_STREAM = b""
+
+
+class StreamDecoder:
+    """Incremental mp3 -> 16-bit PCM decoder backed by an ffmpeg pipe."""
+
+    def __init__(self, sample_rate, channels):
+        self.proc = subprocess.Popen(
+            [
+                FFMPEG_BIN,
+                "-loglevel",
+                "quiet",
+                "-fflags",
+                "nobuffer",
+                "-probesize",
+                "32",
+                "-f",
+                "mp3",
+                "-i",
+                "pipe:0",
+                "-f",
+                "s16le",
+                "-ar",
+                str(sample_rate),
+                "-ac",
+                str(channels),
+                "pipe:1",
+            ],
+            stdin=subprocess.PIPE,
+            stdout=subprocess.PIPE,
+            stderr=subprocess.DEVNULL,
+        )
+        self.block_bytes = sample_rate * channels * 2 * PCM_BLOCK_MS // 1000
+        self.pcm = queue.Queue()
+        threading.Thread(target=self._read, daemon=True).start()
+
+    def _read(self):
+        try:
+            while True:
+                data = self.proc.stdout.read(self.block_bytes)
+                if not data:
+                    break
+                self.pcm.put(data)
+        except (OSError, ValueError):
+            pass
+        self.pcm.put(END_OF_STREAM)
+
+    def feed(self, data):
+        self.proc.stdin.write(data)
+        self.proc.stdin.flush()
+
+    def finish(self):
+        """Signals that no more mp3 is coming; the tail gets flushed out."""
+        try:
+            self.proc.stdin.close()
+        except OSError:
+            pass
+
+    def close(self):
+        self.finish()
+        if self.proc.poll() is None:
+            self.proc.kill()
+        self.proc.wait()
+
+
+async def play_stream(chunks, decoder, channel, make_sound, is_active):
+    """
+    Feeds mp3 chunks into the decoder while playing decoded PCM on 'channel'.
+    Stops early once is_active() goes False (barge-in).
+    Returns {"ttfa_ms", "completed"}.
+    """
+    start = time.perf_counter()
+    stats = {"ttfa_ms": None, "completed": False}
+
+    async def produce():
+        try:
+            async for data in chunks:
+                if not is_active():
+                    break
+                decoder.feed(data)
+        finally:
+            decoder.finish()
+
+    producer = asyncio.ensure_future(produce())
+    pending = None
+    finished = False
+
+    try:
+        while is_active():
+            if pending is None and not finished:
+                try:
+                    pending = decoder.pcm.get_nowait()
+                except queue.Empty:
+                    pass
+                else:
+                    if pending == END_OF_STREAM:
+                        pending = None
+                        finished = True
+
+            if pending is not None:
+                if not channel.get_busy():
+                    channel.play(make_sound(pending))
+                    pending = None
+                    if stats["ttfa_ms"] is None:
+                        stats["ttfa_ms"] = (time.perf_counter() - start) * 1000
+                elif channel.get_queue() is None:
+                    channel.queue(make_sound(pending))
+                    pending = None
+            elif finished and not channel.get_busy():
+                stats["completed"] = True
+                break
+
+            await asyncio.sleep(POLL_INTERVAL)
+    finally:
+        if not producer.done():
+            producer.cancel()
+        try:
+            await producer
+        except asyncio.CancelledError:
+            pass
+        finally:
+            if not stats["completed"]:
+                channel.stop()
+
+    return stats
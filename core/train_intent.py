@@ -0,0 +1,109 @@
+import argparse
+import os
+import sys
+import time
+import numpy as np
+
+# --- MAGIC GLUE ---
+sys.path.append(os.path.dirname(os.path.abspath(__file__)))
+
+import intent_model
+
+MIN_EXAMPLES = 30
+
+
+def split(texts, labels, holdout, seed):
+    order = np.random.default_rng(seed).permutation(len(texts))
+    cut = int(len(texts) * (1 - holdout))
+
+    def pick(idx):
+        return [texts[i] for i in idx], [labels[i] for i in idx]
+
+    return pick(order[:cut]), pick(order[cut:])
+
+
+def benchmark(model, texts, labels, threshold):
+    """Accuracy overall and above the confidence threshold, plus latency."""
+    latencies = []
+    correct = confident = confident_correct = 0
+    per_label = {}
+    for text, label in zip(texts, labels):
+        start = time.perf_counter()
+        predicted, confidence = model.predict(text)
+        latencies.append((time.perf_counter() - start) * 1000)
+
+        hit = predicted == label
+        correct += hit
+        total, ok = per_label.get(label, (0, 0))
+        per_label[label] = (total + 1, ok + hit)
+        if confidence >= threshold:
+            confident += 1
+            confident_correct += hit
+
+    n = max(len(texts), 1)
+    return {
+        "examples": len(texts),
+        "accuracy": correct / n,
+        "coverage": confident / n,  # Share of utterances that skip the LLM
+        "confident_accuracy": confident_correct / max(confident, 1),
+        "latency_mean_ms": float(np.mean(latencies)) if latencies else 0.0,
+        "latency_p95_ms": float(np.percentile(latencies, 95)) if latencies else 0.0,
+        "per_label": {k: ok / total for k, (total, ok) in sorted(per_label.items())},
+    }
+
+
+def main():
+    parser = argparse.ArgumentParser(
+        description="Train VERA's offline intent classifier from logged LLM labels."
+    )
+    parser.add_argument("--log", default=intent_model.INTENT_LOG_FILE)
+    parser.add_argument("--out", default=intent_model.MODEL_FILE)
+    parser.add_argument("--holdout", type=float, default=0.2)
+    parser.add_argument("--seed", type=int, default=0)
+    parser.add_argument(
+        "--threshold", type=float, default=intent_model.CONFIDENCE_THRESHOLD
+    )
+    args = parser.parse_args()
+
+    texts, labels = intent_model.load_examples(args.log)
+    print(f">> Loaded {len(texts)} labelled utterances from {args.log}")
+    if len(texts) < MIN_EXAMPLES:
+        print(f"Need at least {MIN_EXAMPLES}. Keep using VERA and try again later.")
+        sys.exit(1)
+
+    (train_x, train_y), (test_x, test_y) = split(texts, labels, args.holdout, args.seed)
+    start = time.perf_counter()
+    try:
+        model = intent_model.IntentModel.train(train_x, train_y)
+    except ValueError as e:
+        print(f"{e}. Keep using VERA and try again later.")
+        sys.exit(1)
+    print(f">> Trained on {len(train_x)} in {time.perf_counter() - start:.2f}s")
+
+    if test_x:
+        report = benchmark(model, test_x, test_y, args.threshold)
+        print(f">> Held-out accuracy: {report['accuracy']:.1%}")
+        print(
+            f">> Above {args.threshold:.2f} confidence: {report['coverage']:.1%} "
+            f"of utterances, {report['confident_accuracy']:.1%} accurate"
+        )
+        print(
+            f">> Latency: {report['latency_mean_ms']:.3f}ms mean, "
+            f"{report['latency_p95_ms']:.3f}ms p95"
+        )
+        for label, acc in report["per_label"].items():
+            print(f"   {label:<10} {acc:.1%}")
+
+    # Ship a model trained on everything we have
+    final = intent_model.IntentModel.train(texts, labels)
+    final.save(args.out)
+    start = time.perf_counter()
+    intent_model.IntentModel.load(args.out)
+    print(
+        f">> Saved {args.out} (v{intent_model.FORMAT_VERSION}, "
+        f"loads in {(time.perf_counter() - start) * 1000:.1f}ms)"
+    )
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,214 @@
+import sys
+import time
+import wave
+import numpy as np
+
+# --- CONFIG ---
+FRAME_MS = 30
+SPEECH_BAND_HZ = (100, 4000)  # Where voiced energy lives; hum and hiss don't
+ENERGY_MARGIN_DB = 10.0  # How far above the noise floor counts as loud
+MIN_BAND_RATIO = 0.6
+ZCR_RANGE = (0.01, 0.35)  # Hiss/clicks flip sign far more often than voice
+ONSET_FRAMES = 3  # ~90ms of speech before we call it speech
+HANGOVER_FRAMES = 10  # ~300ms of silence before we call it silence
+NOISE_ADAPT = 0.05
+INITIAL_FLOOR_DB = -60.0
+
+
+def frame_signal(signal, frame_len):
+    """(n_frames, frame_len) view of a 1-D signal; the ragged tail is dropped."""
+    n_frames = len(signal) // frame_len
+    return signal[: n_frames * frame_len].reshape(n_frames, frame_len)
+
+
+class VoiceActivityDetector:
+    """
+    Frame-based VAD: energy vs. an adaptive noise floor, zero-crossing rate
+    and speech-band energy ratio, computed for all frames at once, followed
+    by an onset/hangover state machine so single clicks don't count and
+    short pauses between words don't end the utterance.
+    """
+
+    def __init__(
+        self,
+        sample_rate=16000,
+        frame_ms=FRAME_MS,
+        energy_margin_db=ENERGY_MARGIN_DB,
+        min_band_ratio=MIN_BAND_RATIO,
+        zcr_range=ZCR_RANGE,
+        onset_frames=ONSET_FRAMES,
+        hangover_frames=HANGOVER_FRAMES,
+    ):
+        self.sample_rate = sample_rate
+        self.frame_len = int(sample_rate * frame_ms / 1000)
+        self.energy_margin_db = energy_margin_db
+        self.min_band_ratio = min_band_ratio
+        self.zcr_range = zcr_range
+        self.onset_frames = onset_frames
+        self.hangover_frames = hangover_frames
+
+        freqs = np.fft.rfftfreq(self.frame_len, d=1.0 / sample_rate)
+        self.band_mask = (freqs >= SPEECH_BAND_HZ[0]) & (freqs <= SPEECH_BAND_HZ[1])
+        self.window = np.hanning(self.frame_len).astype(np.float32)
+        self.reset()
+
+    def reset(self, calibration_frames=0):
+        """
+        calibration_frames: treat the next N frames as background no matter
+        what, e.g. to learn how loud VERA's own voice is in the mic.
+        """
+        self.noise_floor_db = None
+        self.min_floor_db = None  # Set by calibration: quiet gaps can't go below
+        self.in_speech = False
+        self.run = 0  # Consecutive frames disagreeing with the current state
+        self.calibration_left = calibration_frames
+        self.calibration = []
+        self.leftover = np.zeros(0, dtype=np.float32)
+
+    def features(self, frames):
+        """Returns (energy_db, zcr, band_ratio), one value per frame."""
+        frames = frames.astype(np.float32, copy=False)
+        power = np.mean(frames * frames, axis=1)
+        energy_db = 10.0 * np.log10(power + 1e-10)
+
+        signs = np.signbit(frames)
+        zcr = np.mean(signs[:, 1:] != signs[:, :-1], axis=1)
+
+        spectrum = np.abs(np.fft.rfft(frames * self.window, axis=1)) ** 2
+        total = spectrum.sum(axis=1) + 1e-10
+        band_ratio = spectrum[:, self.band_mask].sum(axis=1) / total
+        return energy_db, zcr, band_ratio
+
+    def _step(self, energy_db, zcr, band_ratio):
+        """Advances the state machine by one frame."""
+        if self.calibration_left > 0:
+            self.calibration_left -= 1
+            self.calibration.append(energy_db)
+            self.noise_floor_db = float(np.mean(self.calibration))
+            if not self.calibration_left:
+                self.min_floor_db = self.noise_floor_db
+            return self.in_speech
+
+        if self.noise_floor_db is None:
+            self.noise_floor_db = min(energy_db, INITIAL_FLOOR_DB + 20)
+
+        loud = energy_db > self.noise_floor_db + self.energy_margin_db
+        voiced = band_ratio >= self.min_band_ratio
+        shaped = self.zcr_range[0] <= zcr <= self.zcr_range[1]
+        is_speech = bool(loud and voiced and shaped)
+
+        if not is_speech:
+            # Track the floor on quiet frames; drop fast, rise slowly
+            if energy_db < self.noise_floor_db:
+                self.noise_floor_db = energy_db
+            else:
+                self.noise_floor_db += NOISE_ADAPT * (energy_db - self.noise_floor_db)
+            if self.min_floor_db is not None:
+                # A pause between VERA's sentences must not make her own
+                # voice look like someone talking over her
+                self.noise_floor_db = max(self.noise_floor_db, self.min_floor_db)
+
+        if is_speech != self.in_speech:
+            self.run += 1
+            needed = self.hangover_frames if self.in_speech else self.onset_frames
+            if self.run >= needed:
+                self.in_speech = is_speech
+                self.run = 0
+        else:
+            self.run = 0
+        return self.in_speech
+
+    def process(self, block):
+        """Streaming entry point: feed any-sized block, get the current state."""
+        if len(self.leftover):
+            block = np.concatenate((self.leftover, block))
+        frames = frame_signal(block, self.frame_len)
+        self.leftover = block[len(frames) * self.frame_len :].copy()
+        if len(frames):
+            for values in zip(*self.features(frames)):
+                self._step(*values)
+        return self.in_speech
+
+    def detect(self, signal):
+        """Offline: per-frame speech decisions for a whole recording."""
+        self.reset()
+        frames = frame_signal(np.asarray(signal, dtype=np.float32), self.frame_len)
+        energy_db, zcr, band_ratio = self.features(frames)
+        return np.array(
+            [self._step(e, z, b) for e, z, b in zip(energy_db, zcr, band_ratio)],
+            dtype=bool,
+        )
+
+
+# --- OFFLINE BENCHMARK ---
+def load_wav(path):
+    """Reads a 16-bit PCM wav as mono float32. Returns (samples, sample_rate)."""
+    with wave.open(path, "rb") as wf:
+        sample_rate = wf.getframerate()
+        channels = wf.getnchannels()
+        raw = wf.readframes(wf.getnframes())
+    samples = np.frombuffer(raw, dtype="<i2").astype(np.float32) / 32768.0
+    if channels > 1:
+        samples = samples.reshape(-1, channels).mean(axis=1)
+    return samples, sample_rate
+
+
+def load_labels(path):
+    """Speech segments from a sidecar file: one 'start_s end_s' pair per line."""
+    segments = []
+    with open(path, "r") as f:
+        for line in f:
+            parts = line.split()
+            if len(parts) >= 2:
+                segments.append((float(parts[0]), float(parts[1])))
+    return segments
+
+
+def benchmark(wav_path, labels=None, **vad_kwargs):
+    """
+    Runs the detector over a recording and reports speed (and accuracy if
+    labelled speech segments are given).
+    """
+    samples, sample_rate = load_wav(wav_path)
+    vad = VoiceActivityDetector(sample_rate=sample_rate, **vad_kwargs)
+
+    start = time.perf_counter()
+    decisions = vad.detect(samples)
+    elapsed = time.perf_counter() - start
+
+    duration = len(samples) / sample_rate
+    report = {
+        "file": wav_path,
+        "frames": len(decisions),
+        "speech_ratio": float(decisions.mean()) if len(decisions) else 0.0,
+        "elapsed_ms": elapsed * 1000,
+        "realtime_factor": duration / elapsed if elapsed else float("inf"),
+    }
+
+    if labels is not None:
+        frame_s = vad.frame_len / sample_rate
+        centers = (np.arange(len(decisions)) + 0.5) * frame_s
+        truth = np.zeros(len(decisions), dtype=bool)
+        for seg_start, seg_end in labels:
+            truth |= (centers >= seg_start) & (centers < seg_end)
+        report["accuracy"] = float((decisions == truth).mean())
+        report["false_alarms"] = int((decisions & ~truth).sum())
+        report["misses"] = int((~decisions & truth).sum())
+    return report
+
+
+if __name__ == "__main__":
+    # Usage: python core/vad.py clip.wav [clip.txt] [more.wav ...]
+    args = sys.argv[1:]
+    if not args:
+        print("Usage: python core/vad.py <file.wav> [labels.txt] ...")
+        sys.exit(1)
+    i = 0
+    while i < len(args):
+        wav_path = args[i]
+        labels = None
+        if i + 1 < len(args) and args[i + 1].endswith(".txt"):
+            labels = load_labels(args[i + 1])
+            i += 1
+        print(benchmark(wav_path, labels))
+        i += 1
@@ -0,0 +1,238 @@
+import json
+import os
+import re
+import threading
+import time
+import zlib
+import numpy as np
+
+# Try to import sentence_transformers, we fall back to hashing without it
+try:
+    from sentence_transformers import SentenceTransformer
+
+    SENTENCE_TRANSFORMERS_AVAILABLE = True
+except ImportError:
+    SENTENCE_TRANSFORMERS_AVAILABLE = False
+
+# --- PATH SETUP ---
+CURRENT_DIR = os.path.dirname(os.path.abspath(__file__))
+ROOT_DIR = os.path.dirname(CURRENT_DIR)
+SEMANTIC_DIR = os.path.join(ROOT_DIR, "data", "semantic")
+
+# --- CONFIG ---
+FORMAT_VERSION = 1
+HASH_DIM = 512
+LOCAL_MODEL = "all-MiniLM-L6-v2"  # Used only if already downloaded
+INITIAL_ROWS = 1024  # Matrix file grows by doubling from here
+WORD = re.compile(r"[a-z0-9']+")
+
+
+class HashingEmbedder:
+    """
+    Deterministic, dependency-free embedder: hashed words plus in-word
+    character trigrams, so 'stay' and 'stays' still land close together.
+    It has no notion of synonyms; plug in a real model for that.
+    """
+
+    def __init__(self, dim=HASH_DIM):
+        self.dim = dim
+        self.name = f"hashing-{dim}"
+
+    def _features(self, text):
+        for word in WORD.findall(text.lower()):
+            yield "w:" + word
+            padded = f"<{word}>"
+            for i in range(len(padded) - 2):
+                yield "c:" + padded[i : i + 3]
+
+    def embed(self, texts):
+        """(len(texts), dim) float32, rows L2-normalized."""
+        out = np.zeros((len(texts), self.dim), dtype=np.float32)
+        for row, text in enumerate(texts):
+            for feature in self._features(text):
+                h = zlib.crc32(feature.encode("utf-8"))
+                # The top bit picks a sign so collisions cancel instead of pile up
+                out[row, h % self.dim] += 1.0 if h & 0x80000000 else -1.0
+        norms = np.linalg.norm(out, axis=1, keepdims=True)
+        return out / np.maximum(norms, 1e-8)
+
+
+class SentenceEmbedder:
+    """Local sentence-transformers model; never downloads (raises if not cached)."""
+
+    def __init__(self, model_name=LOCAL_MODEL):
+        self.model = SentenceTransformer(model_name, local_files_only=True)
+        self.dim = self.model.get_sentence_embedding_dimension()
+        self.name = f"st-{model_name}"
+
+    def embed(self, texts):
+        vectors = self.model.encode(list(texts), normalize_embeddings=True)
+        return np.asarray(vectors, dtype=np.float32)
+
+
+def default_embedder():
+    """The best embedder available offline."""
+    if SENTENCE_TRANSFORMERS_AVAILABLE:
+        try:
+            return SentenceEmbedder()
+        except Exception as e:
+            print(f"DEBUG: Sentence model unavailable ({e}), using hashing.")
+    return HashingEmbedder()
+
+
+class VectorIndex:
+    """
+    Append-only float32 matrix in a memory-mapped file plus a JSONL sidecar
+    holding one metadata record per row (and tombstones for deletes).
+    Search is one matmul over the live rows.
+    """
+
+    def __init__(self, directory=SEMANTIC_DIR, embedder=None, name="memory"):
+        self.embedder = embedder or HashingEmbedder()
+        self.dim = self.embedder.dim
+        self.matrix_path = os.path.join(directory, f"{name}.f32")
+        self.meta_path = os.path.join(directory, f"{name}.jsonl")
+        self.lock = threading.Lock()
+        self.meta = []
+        self.alive = np.zeros(0, dtype=bool)
+        self.kind_ids = {}
+        self.kinds = np.zeros(0, dtype=np.int16)  # Per-row kind code for filters
+        self.matrix = None
+        os.makedirs(directory, exist_ok=True)
+        self._load()
+
+    def _header(self):
+        return {
+            "version": FORMAT_VERSION,
+            "dim": self.dim,
+            "embedder": self.embedder.name,
+        }
+
+    def _load(self):
+        deleted = set()
+        if os.path.exists(self.meta_path):
+            with open(self.meta_path, "r", encoding="utf-8") as f:
+                lines = f.read().splitlines()
+            header = json.loads(lines[0]) if lines else {}
+            if header != self._header():
+                # Vectors from another embedder are meaningless here
+                print("DEBUG: Vector index built by another embedder, rebuilding.")
+                lines = []
+            for line in lines[1:]:
+                try:
+                    record = json.loads(line)
+                except ValueError:
+                    continue  # Torn write at the end
+                if "tombstone" in record:
+                    deleted.add(record["tombstone"])
+                else:
+                    self.meta.append(record)
+            if not lines:
+                self._reset_files()
+        else:
+            self._reset_files()
+
+        rows = max(INITIAL_ROWS, len(self.meta))
+        if not os.path.exists(self.matrix_path):
+            self._resize(rows)
+        elif os.path.getsize(self.matrix_path) < rows * self.dim * 4:
+            self._resize(rows)
+        self._map()
+        self.alive = np.ones(len(self.meta), dtype=bool)
+        self.kinds = np.array(
+            [self._kind_id(m["kind"]) for m in self.meta], dtype=np.int16
+        )
+        for row in deleted:
+            if row < len(self.alive):
+                self.alive[row] = False
+
+    def _reset_files(self):
+        self.meta = []
+        with open(self.meta_path, "w", encoding="utf-8") as f:
+            f.write(json.dumps(self._header()) + "\n")
+        if os.path.exists(self.matrix_path):
+            os.remove(self.matrix_path)
+
+    def _resize(self, rows):
+        self.matrix = None  # Drop the old mapping before growing the file
+        with open(self.matrix_path, "ab") as f:
+            f.truncate(rows * self.dim * 4)
+
+    def _map(self):
+        rows = os.path.getsize(self.matrix_path) // (self.dim * 4)
+        self.matrix = np.memmap(
+            self.matrix_path, dtype=np.float32, mode="r+", shape=(rows, self.dim)
+        )
+
+    def _kind_id(self, kind):
+        return self.kind_ids.setdefault(kind, len(self.kind_ids))
+
+    def __len__(self):
+        return int(self.alive.sum())
+
+    def add(self, texts, kind="fact", **extra):
+        """Embeds and appends texts; returns their row ids."""
+        if not texts:
+            return []
+        vectors = self.embedder.embed(texts)
+        with self.lock:
+            start = len(self.meta)
+            end = start + len(texts)
+            if end > self.matrix.shape[0]:
+                self.matrix.flush()
+                self._resize(max(end, 2 * self.matrix.shape[0]))
+                self._map()
+            self.matrix[start:end] = vectors
+            self.matrix.flush()
+
+            records = [
+                {"text": t, "kind": kind, "ts": time.time(), **extra} for t in texts
+            ]
+            self.meta.extend(records)
+            self.alive = np.concatenate((self.alive, np.ones(len(texts), dtype=bool)))
+            self.kinds = np.concatenate(
+                (self.kinds, np.full(len(texts), self._kind_id(kind), dtype=np.int16))
+            )
+            self._append_meta(records)
+        return list(range(start, end))
+
+    def texts(self, kind=None):
+        """Texts of the live rows (of one kind), e.g. to find what's missing."""
+        with self.lock:
+            return {
+                meta["text"]
+                for meta, alive in zip(self.meta, self.alive)
+                if alive and (kind is None or meta["kind"] == kind)
+            }
+
+    def delete(self, row):
+        """Tombstones a row; its vector stays on disk but never matches."""
+        with self.lock:
+            if 0 <= row < len(self.alive) and self.alive[row]:
+                self.alive[row] = False
+                self._append_meta([{"tombstone": row}])
+
+    def _append_meta(self, records):
+        with open(self.meta_path, "a", encoding="utf-8") as f:
+            f.write("".join(json.dumps(r, ensure_ascii=False) + "\n" for r in records))
+
+    def search(self, query, k=5, kind=None, min_score=0.0):
+        """Top-k (row, score, metadata) by cosine similarity."""
+        q = self.embedder.embed([query])[0]
+        with self.lock:
+            n = len(self.meta)
+            if not n:
+                return []
+            scores = np.asarray(self.matrix[:n] @ q)
+            mask = self.alive.copy()
+            if kind is not None:
+                mask &= self.kinds == self.kind_ids.get(kind, -1)
+            scores[~mask] = -np.inf
+            k = min(k, n)
+            top = np.argpartition(-scores, k - 1)[:k]
+            top = top[np.argsort(-scores[top])]
+            return [
+                (int(i), float(scores[i]), self.meta[i])
+                for i in top
+                if scores[i] > min_score
+            ]
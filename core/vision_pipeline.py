@@ -0,0 +1,248 @@
+import hashlib
+import io
+import os
+import sys
+import threading
+import time
+from collections import OrderedDict, deque
+
+import numpy as np
+from PIL import Image, ImageFilter, features
+
+try:
+    import metrics
+except ImportError:
+    # Fallback when imported as 'core.vision_pipeline' (tests)
+    sys.path.append(os.path.dirname(__file__))
+    import metrics
+
+# --- CONFIG ---
+MAX_EDGE = 1600  # Longest side sent; 4K text stays readable at this size
+IMAGE_FORMAT = "WEBP"  # Falls back to JPEG where Pillow lacks WebP
+QUALITY = {"WEBP": 80, "JPEG": 85}
+ANSWER_CACHE_SIZE = 16
+ANSWER_TTL_S = 120.0  # Same screen much later is probably a new question
+REPORT_WINDOW = 50
+
+MIME_TYPES = {"WEBP": "image/webp", "JPEG": "image/jpeg", "PNG": "image/png"}
+
+
+def clamp_box(box, size):
+    """(left, top, right, bottom) limited to an image of size (w, h), or None."""
+    width, height = size
+    left, top, right, bottom = (int(round(v)) for v in box)
+    left, top = max(0, left), max(0, top)
+    right, bottom = min(width, right), min(height, bottom)
+    if right - left < 2 or bottom - top < 2:
+        return None  # Off-screen or minimized: keep the whole capture
+    return left, top, right, bottom
+
+
+def downscale(image, max_edge=MAX_EDGE):
+    """Caps the longest side at max_edge, keeping the aspect ratio."""
+    width, height = image.size
+    scale = max_edge / max(width, height)
+    if scale >= 1:
+        return image
+    size = (max(1, round(width * scale)), max(1, round(height * scale)))
+    return image.resize(size, Image.LANCZOS)
+
+
+def encode(image, fmt=IMAGE_FORMAT, quality=None):
+    """(bytes, format) with lossy compression tuned for screen text."""
+    fmt = fmt.upper()
+    if fmt == "WEBP" and not features.check("webp"):
+        fmt = "JPEG"
+    if image.mode not in ("RGB", "L"):
+        image = image.convert("RGB")
+    buffer = io.BytesIO()
+    options = {"quality": quality or QUALITY.get(fmt, 85)}
+    if fmt == "WEBP":
+        options["method"] = 4  # Encoder effort: 6 is barely smaller, much slower
+    elif fmt == "JPEG":
+        options["optimize"] = True
+    image.save(buffer, format=fmt, **options)
+    return buffer.getvalue(), fmt
+
+
+def image_digest(image):
+    """
+    Exact digest of the pixels being sent. Layout hashes can't tell one
+    traceback from another in the same window, so only an identical
+    capture counts as the same screen.
+    """
+    return hashlib.sha1(
+        f"{image.mode}{image.size}".encode() + image.tobytes()
+    ).hexdigest()
+
+
+def prepare(image, box=None, max_edge=MAX_EDGE, fmt=IMAGE_FORMAT, quality=None):
+    """
+    Crop -> downscale -> encode. Returns a dict with the upload part
+    ("blob": {"mime_type", "data"}) plus what the report needs: original
+    and sent size, bytes, format, pixel digest and prep time.
+    """
+    start = time.perf_counter()
+    original = image.size
+    if box:
+        box = clamp_box(box, original)
+        if box:
+            image = image.crop(box)
+    image = downscale(image, max_edge)
+    data, fmt = encode(image, fmt, quality)
+    return {
+        "blob": {"mime_type": MIME_TYPES[fmt], "data": data},
+        "original": original,
+        "size": image.size,
+        "cropped": bool(box),
+        "format": fmt,
+        "bytes": len(data),
+        "digest": image_digest(image),
+        "prep_ms": (time.perf_counter() - start) * 1000,
+    }
+
+
+class AnswerCache:
+    """
+    Recent vision answers keyed by (prompt, pixel digest): the identical
+    capture asked the same question gets the cached answer without an
+    upload.
+    """
+
+    def __init__(self, max_entries=ANSWER_CACHE_SIZE, ttl_s=ANSWER_TTL_S):
+        self.max_entries = max_entries
+        self.ttl_s = ttl_s
+        self.lock = threading.Lock()
+        self.entries = OrderedDict()  # (prompt, digest) -> (answer, stored_at)
+        self.hits = 0
+        self.misses = 0
+
+    @staticmethod
+    def _key(digest, prompt):
+        return " ".join(prompt.lower().split()).rstrip(".?!, "), digest
+
+    def get(self, digest, prompt, now=None):
+        now = time.monotonic() if now is None else now
+        key = self._key(digest, prompt)
+        with self.lock:
+            cached = self.entries.get(key)
+            if cached is None or now - cached[1] > self.ttl_s:
+                self.entries.pop(key, None)
+                self.misses += 1
+                return None
+            self.entries.move_to_end(key)
+            self.hits += 1
+            return cached[0]
+
+    def put(self, digest, prompt, answer, now=None):
+        now = time.monotonic() if now is None else now
+        with self.lock:
+            key = self._key(digest, prompt)
+            self.entries[key] = (answer, now)
+            self.entries.move_to_end(key)
+            while len(self.entries) > self.max_entries:
+                self.entries.popitem(last=False)
+
+    def stats(self):
+        with self.lock:
+            lookups = self.hits + self.misses
+            return {
+                "answers": len(self.entries),
+                "hits": self.hits,
+                "misses": self.misses,
+                "hit_rate": self.hits / lookups if lookups else 0.0,
+            }
+
+
+class VisionReports:
+    """Bytes uploaded and end-to-end latency for the last vision requests."""
+
+    def __init__(self, window=REPORT_WINDOW):
+        self.lock = threading.Lock()
+        self.reports = deque(maxlen=window)
+
+    def add(self, report):
+        with self.lock:
+            self.reports.append(report)
+        print(format_report(report))
+
+    def stats(self):
+        with self.lock:
+            reports = list(self.reports)
+        uploads = [r for r in reports if not r["cached"]]
+        return {
+            "requests": len(reports),
+            "cached": len(reports) - len(uploads),
+            "bytes_p50": metrics.percentile([r["bytes"] for r in uploads], 50),
+            "total_ms_p50": metrics.percentile([r["total_ms"] for r in reports], 50),
+            "total_ms_p90": metrics.percentile([r["total_ms"] for r in reports], 90),
+            "last": reports[-1] if reports else None,
+        }
+
+
+def format_report(report):
+    (w0, h0), (w1, h1) = report["original"], report["size"]
+    if report["cached"]:
+        sent = "cached answer, nothing uploaded"
+    else:
+        sent = f"{report['format'].lower()} {report['bytes'] / 1024:.0f}KB"
+    return (
+        f"DEBUG: Vision {report['label']}: {w0}x{h0} -> {w1}x{h1}, {sent} "
+        f"(prep {report['prep_ms']:.0f}ms, total {report['total_ms']:.0f}ms)"
+    )
+
+
+def benchmark(image, runs=3):
+    """The old upload (full-size lossless WebP) vs prepare(): bytes and ms."""
+
+    def measure(fn):
+        best = None
+        for _ in range(runs):
+            start = time.perf_counter()
+            size = fn()
+            ms = (time.perf_counter() - start) * 1000
+            best = ms if best is None else min(best, ms)
+        return size, best
+
+    def old_upload():
+        buffer = io.BytesIO()
+        image.save(buffer, format="webp", lossless=True)
+        return len(buffer.getvalue())
+
+    old_bytes, old_ms = measure(old_upload)
+    new_bytes, new_ms = measure(lambda: prepare(image)["bytes"])
+    return {
+        "size": image.size,
+        "old_bytes": old_bytes,
+        "old_encode_ms": old_ms,
+        "new_bytes": new_bytes,
+        "new_prep_ms": new_ms,
+    }
+
+
+def _synthetic_screen(width=3840, height=2160):
+    """A desktop-like test card: photo wallpaper, a window of anti-aliased text."""
+    rng = np.random.default_rng(0)
+    y, x = np.mgrid[0:height, 0:width]
+    wallpaper = np.stack(
+        [x * 200 // width, y * 160 // height, 120 + (x + y) * 100 // (width + height)],
+        axis=-1,
+    ) + rng.normal(0, 6, (height, width, 3))
+    screen = np.clip(wallpaper, 0, 255).astype(np.uint8)
+    top, left, bottom, right = height // 8, width // 8, height * 7 // 8, width * 5 // 8
+    screen[top:bottom, left:right] = 245  # Window
+    screen[top : top + 40, left:right] = (32, 32, 40)  # Title bar
+    for row in range(top + 80, bottom - 40, 28):
+        for col in range(left + 40, right - 400, 520):
+            run = rng.integers(120, 480)
+            glyphs = rng.random((14, run)) < 0.35
+            screen[row : row + 14, col : col + run][glyphs] = (20, 20, 20)
+    return Image.fromarray(screen).filter(ImageFilter.GaussianBlur(0.7))
+
+
+if __name__ == "__main__":
+    # Usage: python core/vision_pipeline.py [screenshot.png]
+    if len(sys.argv) > 1:
+        print(benchmark(Image.open(sys.argv[1]).convert("RGB")))
+    else:
+        print(benchmark(_synthetic_screen()))
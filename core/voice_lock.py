@@ -54,27 +54,46 @@ class VoiceSecurity:
         self.master_embed = embed
         print(f"Voice Identity Saved to {MASTER_VOICE_FILE}")
 
+    def verify_samples(self, samples, sample_rate=16000):
+        """Checks float32 mono samples (e.g. a view of the shared mic ring)."""
+        if self.master_embed is None:
+            print("WARNING: No master voice found. Security is OPEN.")
+            return True
+
+        try:
+            processed_wav = preprocess_wav(samples, source_sr=sample_rate)
+            embed = self.encoder.embed_utterance(processed_wav)
+            score = np.dot(embed, self.master_embed)
+
+            print(f"DEBUG: Voice Match Score: {score:.2f}")
+            return score > SIMILARITY_THRESHOLD
+
+        except Exception as e:
+            print(f"Verification Error: {e}")
+            return False
+
     def verify_audio(self, audio_object):
         """Checks if the speech_recognition AudioData matches the user."""
+        if isinstance(audio_object, np.ndarray):
+            return self.verify_samples(audio_object)
+
         if self.master_embed is None:
             print("WARNING: No master voice found. Security is OPEN.")
             return True
 
         try:
+            if audio_object.sample_rate == 16000 and audio_object.sample_width == 2:
+                # Already 16kHz PCM from the shared mic: skip the wav round trip
+                pcm = np.frombuffer(audio_object.get_raw_data(), dtype="<i2")
+                return self.verify_samples(pcm.astype(np.float32) / 32768.0)
+
             # Convert AudioData to raw bytes (16kHz mono)
             wav_bytes = audio_object.get_wav_data(convert_rate=16000, convert_width=2)
             wav_stream = io.BytesIO(wav_bytes)
 
             # Load with Librosa
             wav, source_sr = librosa.load(wav_stream, sr=16000)
-
-            # Embed & Compare
-            processed_wav = preprocess_wav(wav)
-            embed = self.encoder.embed_utterance(processed_wav)
-            score = np.dot(embed, self.master_embed)
-
-            print(f"DEBUG: Voice Match Score: {score:.2f}")
-            return score > SIMILARITY_THRESHOLD
+            return self.verify_samples(wav)
 
         except Exception as e:
             print(f"Verification Error: {e}")
@@ -68,3 +68,25 @@ def minimize_window(app_name):
         except:
             pass
     return False
+
+
+def list_window_ids():
+    """Ids of all titled top-level windows, to spot one that just opened."""
+    try:
+        return {
+            getattr(win, "_hWnd", win.title) for win in gw.getAllWindows() if win.title
+        }
+    except Exception as e:
+        print(f"Window Find Error: {e}")
+        return set()
+
+
+def active_window_box():
+    """(left, top, right, bottom) of the focused window, or None."""
+    try:
+        win = gw.getActiveWindow()
+        if win and not win.isMinimized:
+            return (win.left, win.top, win.right, win.bottom)
+    except Exception as e:
+        print(f"Window Find Error: {e}")
+    return None
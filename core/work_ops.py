@@ -1,7 +1,6 @@
 import time
 import webbrowser
 import os
-import subprocess
 import threading
 
 # --- LOCAL IMPORTS ---
@@ -28,19 +27,14 @@ def work_mode_init(speak_func):
     speak_func("Initializing Workspace Protocol...")
 
     # 1. LAUNCH VS CODE
-    # Try finding it via the smart library first
-    code_path = ai_ops.find_installed_app("visual studio code")
-    if not code_path:
-        code_path = ai_ops.find_installed_app("code")
-
-    if code_path:
-        os.startfile(code_path)
-    else:
-        # Fallback: Assume it's in the system PATH
-        try:
-            subprocess.Popen("code", shell=True)
-        except:
-            speak_func("I couldn't find VS Code.")
+    # Try finding it via the smart library first (started without a shell)
+    try:
+        launched = ai_ops.launch_app("visual studio code") or ai_ops.launch_app("code")
+        if not launched:
+            # Fallback: Assume it's in the system PATH
+            ai_ops.launcher.launch_command("code")
+    except OSError:
+        speak_func("I couldn't find VS Code.")
 
     # 2. LAUNCH BROWSER
     webbrowser.open("https://google.com")
@@ -79,7 +73,7 @@ def study_mode_init(speak_func):
     speak_func("Study mode engaged.")
 
     webbrowser.open("https://music.youtube.com")
-    subprocess.Popen("notepad")
+    ai_ops.launcher.launch_command("notepad")
 
     time.sleep(3)
 
@@ -0,0 +1,379 @@
+import json
+import os
+import shutil
+import struct
+import sys
+import time
+
+# --- 1. DYNAMIC PATHING ---
+sys.path.insert(0, os.path.abspath(os.path.join(os.path.dirname(__file__), "..")))
+
+from core import app_index
+from core import app_launcher
+from core import app_scanner
+from core import launch_history
+
+LIBRARY = {
+    "visual studio code": r"C:\Start Menu\Visual Studio Code.lnk",
+    "spotify": r"C:\Start Menu\Spotify.lnk",
+    "blender 4.1": r"C:\Start Menu\Blender 4.1.lnk",
+    "vlc media player": r"C:\Start Menu\VLC media player.lnk",
+    "microsoft teams": r"C:\Start Menu\Microsoft Teams.lnk",
+}
+
+
+def _write(path, app_map):
+    with open(path, "w") as f:
+        json.dump(app_map, f)
+
+
+def test_trigrams_pad_word_boundaries():
+    """Short names still get trigrams, including their first and last letters."""
+    assert app_index.trigrams("VLC") == {" vl", "vlc", "lc "}
+
+
+def test_search_ranks_with_scores():
+    """Top-k comes back best first, with the fuzzy score attached."""
+    index = app_index.AppIndex(path="")
+    index.build(LIBRARY)
+    matches = index.search("blender", k=3)
+    assert matches[0][0] == "blender 4.1"
+    assert matches[0][1] == LIBRARY["blender 4.1"]
+    assert [m[2] for m in matches] == sorted((m[2] for m in matches), reverse=True)
+    assert index.find("vlc") == LIBRARY["vlc media player"]
+    assert index.find("code") == LIBRARY["visual studio code"]
+    assert index.find("photoshop") is None
+
+
+def test_exact_name_skips_fuzzy_scoring(monkeypatch):
+    """An app said exactly as listed is found without any fuzzy scoring."""
+    index = app_index.AppIndex(path="")
+    index.build(LIBRARY)
+    monkeypatch.setattr(app_index.fuzz, "WRatio", lambda a, b: 1 / 0)
+    assert index.search("Spotify", k=1) == [("spotify", LIBRARY["spotify"], 100)]
+
+
+def test_exact_name_skips_scoring_when_ranking_candidates(monkeypatch):
+    """Ranking asks for several candidates; an exact name still skips scoring."""
+    index = app_index.AppIndex(path="")
+    index.build(LIBRARY)
+    monkeypatch.setattr(app_index.fuzz, "WRatio", lambda a, b: 1 / 0)
+    assert index.search("vlc media  player", k=5) == [
+        ("vlc media player", LIBRARY["vlc media player"], 100)
+    ]
+
+
+def test_prefilter_bounds_fuzzy_work(monkeypatch):
+    """On a big library only PREFILTER names get the slow fuzzy score."""
+    app_map = {f"vendor{i % 97} tool{i}": f"p{i}" for i in range(10000)}
+    app_map["acme photo editor"] = "acme.lnk"
+    index = app_index.AppIndex(path="", prefilter=20)
+    index.build(app_map)
+    calls = []
+    real = app_index.fuzz.WRatio
+    monkeypatch.setattr(
+        app_index.fuzz, "WRatio", lambda a, b: calls.append(b) or real(a, b)
+    )
+    assert index.find("acme photo") == "acme.lnk"
+    assert len(calls) <= 20
+
+
+def test_reloads_only_when_file_changes(tmp_path):
+    """The library is parsed once; a rescan (new mtime) is picked up."""
+    path = str(tmp_path / "app_library.json")
+    index = app_index.AppIndex(path=path)
+    assert index.find("spotify") is None  # No library yet
+    _write(path, LIBRARY)
+    assert index.find("spotify") == LIBRARY["spotify"]
+    index.find("blender")
+    assert index.loads == 2  # Missing file, then the first real load
+
+    _write(path, {"obs studio": "obs.lnk"})
+    stat = os.stat(path)
+    os.utime(path, ns=(stat.st_atime_ns, stat.st_mtime_ns + 10**9))
+    assert index.find("obs") == "obs.lnk"
+    assert index.find("spotify") is None
+    assert index.loads == 3
+
+
+def _desktop(path, name, extra=""):
+    with open(path, "w") as f:
+        f.write(f"[Desktop Entry]\nType=Application\nName={name}\nExec=true\n{extra}")
+
+
+def _age(path, seconds=10):
+    """Backdates a folder so the scanner trusts its mtime right away."""
+    stat = os.stat(path)
+    os.utime(path, ns=(stat.st_atime_ns, stat.st_mtime_ns - seconds * 10**9))
+
+
+def _scanner(tmp_path, roots):
+    return app_scanner.AppScanner(
+        roots=[str(r) for r in roots],
+        library_path=str(tmp_path / "app_library.json"),
+        manifest_path=str(tmp_path / "app_manifest.json"),
+    )
+
+
+def _menu(tmp_path):
+    root = tmp_path / "applications"
+    (root / "games").mkdir(parents=True)
+    _desktop(root / "firefox.desktop", "Firefox")
+    _desktop(root / "hidden.desktop", "Helper", "NoDisplay=true\n")
+    _desktop(root / "games" / "chess.desktop", "GNOME Chess")
+    (root / "Notes Shortcut.lnk").write_bytes(b"")
+    (root / "readme.txt").write_text("not an app")
+    for folder in (root / "games", root):
+        _age(folder)
+    return root
+
+
+def test_scan_finds_shortcuts_and_reports_counts(tmp_path):
+    """First scan lists every visible app and says how many it found."""
+    root = _menu(tmp_path)
+    report = _scanner(tmp_path, [root]).scan()
+    assert report["apps"] == 3 and report["added"] == 3
+    with open(tmp_path / "app_library.json") as f:
+        library = json.load(f)
+    assert set(library) == {"firefox", "gnome chess", "notes"}
+    assert library["gnome chess"]["path"].endswith("chess.desktop")
+    assert library["gnome chess"]["target"] == shutil.which("true")
+    assert library["notes"]["target"] is None  # Not a real shortcut
+
+
+def test_rescan_reuses_unchanged_folders(tmp_path):
+    """A second scan (even after a restart) only stats the folders."""
+    root = _menu(tmp_path)
+    _scanner(tmp_path, [root]).scan()
+    library = tmp_path / "app_library.json"
+    version = os.stat(library).st_mtime_ns
+    report = _scanner(tmp_path, [root]).scan()  # Fresh process, same manifest
+    assert report["dirs_reused"] == report["dirs"] == 2
+    assert os.stat(library).st_mtime_ns == version  # Indexes stay valid
+    assert report["unchanged"] == 3
+    assert report["added"] == report["removed"] == 0
+
+
+def test_rescan_picks_up_added_and_removed_apps(tmp_path):
+    """Only the folders whose mtime moved are listed again."""
+    root = _menu(tmp_path)
+    scanner = _scanner(tmp_path, [root])
+    scanner.scan()
+    _desktop(root / "games" / "mines.desktop", "Mines")
+    os.remove(root / "firefox.desktop")
+    report = scanner.scan()
+    assert report["added"] == 1 and report["removed"] == 1
+    assert report["unchanged"] == 2
+    assert set(scanner.library()) == {"gnome chess", "notes", "mines"}
+
+
+def test_formats_and_missing_roots_are_configurable(tmp_path):
+    """Only the configured shortcut types count; a missing root is skipped."""
+    root = _menu(tmp_path)
+    scanner = app_scanner.AppScanner(
+        roots=[str(root), str(tmp_path / "nope")],
+        formats=(".lnk",),
+        library_path=str(tmp_path / "lib.json"),
+        manifest_path=str(tmp_path / "manifest.json"),
+    )
+    assert scanner.scan()["apps"] == 1
+    assert list(scanner.library()) == ["notes"]
+
+
+def test_watcher_refreshes_without_a_manual_scan(tmp_path):
+    """New shortcuts show up on their own in watch mode."""
+    root = _menu(tmp_path)
+    scanner = _scanner(tmp_path, [root])
+    scanner.scan()
+    changes = []
+    watcher = app_scanner.AppWatcher(scanner, changes.append, interval_s=0.05)
+    watcher.start()
+    try:
+        _desktop(root / "gimp.desktop", "GIMP")
+        deadline = time.time() + 3
+        while not changes and time.time() < deadline:
+            time.sleep(0.02)
+    finally:
+        watcher.stop()
+    assert changes and changes[0]["added"] == 1
+    assert "gimp" in scanner.library()
+
+
+def _lnk(path, target, args, cwd):
+    """A minimal Windows shortcut: LinkInfo with a local path, plus strings."""
+    flags = (
+        app_scanner.HAS_LINK_INFO
+        | app_scanner.HAS_WORKING_DIR
+        | app_scanner.HAS_ARGUMENTS
+        | app_scanner.IS_UNICODE
+    )
+    header = struct.pack("<I16sI", 0x4C, bytes(16), flags).ljust(0x4C, b"\0")
+    volume = struct.pack("<IIII", 0x11, 3, 0, 0x10) + b"\0"
+    base = target.encode("latin-1") + b"\0"
+    base_offset = 0x1C + len(volume)
+    suffix_offset = base_offset + len(base)
+    body = volume + base + b"\0"
+    info = struct.pack(
+        "<IIIIIII", 0x1C + len(body), 0x1C, 1, 0x1C, base_offset, 0, suffix_offset
+    )
+
+    def string(text):
+        return struct.pack("<H", len(text)) + text.encode("utf-16-le")
+
+    with open(path, "wb") as f:
+        f.write(header + info + body + string(cwd) + string(args))
+
+
+def test_lnk_target_args_and_cwd_are_read_at_scan_time(tmp_path):
+    """Shortcuts are resolved once, so launching them needs no shell lookup."""
+    root = tmp_path / "menu"
+    root.mkdir()
+    _lnk(
+        root / "Blender.lnk",
+        r"C:\Program Files\Blender\blender.exe",
+        '--factory-startup "C:\\My Scenes\\a.blend"',
+        r"C:\Program Files\Blender",
+    )
+    _age(root)
+    scanner = _scanner(tmp_path, [root])
+    scanner.scan()
+    entry = scanner.library()["blender"]
+    assert entry["target"] == r"C:\Program Files\Blender\blender.exe"
+    assert entry["args"] == ["--factory-startup", r"C:\My Scenes\a.blend"]
+    assert entry["cwd"] == r"C:\Program Files\Blender"
+
+
+def test_desktop_exec_drops_field_codes_and_terminal_apps():
+    """%u/%F placeholders are for file managers; terminal apps need a shell."""
+    launch = app_scanner.parse_desktop_exec(
+        {"Exec": 'true --new-window %u "a b"', "Path": "/tmp"}
+    )
+    assert launch == {
+        "target": shutil.which("true"),
+        "args": ["--new-window", "a b"],
+        "cwd": "/tmp",
+    }
+    terminal = app_scanner.parse_desktop_exec({"Exec": "top", "Terminal": "true"})
+    assert terminal["target"] is None
+
+
+def test_resolved_entry_is_exec_directly(tmp_path):
+    """A resolved target starts without the shell and records its timings."""
+    marker = tmp_path / "started.txt"
+    opened = []
+    launcher = app_launcher.AppLauncher(opener=opened.append)
+    entry = {
+        "path": str(tmp_path / "App.lnk"),
+        "target": sys.executable,
+        "args": ["-c", f"open({str(marker)!r}, 'w').write('ok')"],
+        "cwd": str(tmp_path),
+    }
+    assert launcher.launch(entry, "app") == "direct"
+    deadline = time.time() + 10
+    while not marker.exists() and time.time() < deadline:
+        time.sleep(0.02)
+    assert marker.exists() and not opened
+    stats = launcher.stats()
+    assert stats["direct"]["launches"] == 1 and stats["shell"]["launches"] == 0
+    assert stats["direct"]["spawn_p50_ms"] is not None
+
+
+def test_unresolved_entry_falls_back_to_shell_and_times_window(tmp_path):
+    """Advertised shortcuts still open; a new window ends the launch timer."""
+    windows = [{1}]
+    opened = []
+
+    def opener(path):
+        opened.append(path)
+        windows.append({1, 2})  # The app's window shows up
+
+    launcher = app_launcher.AppLauncher(
+        list_windows=lambda: windows[-1], poll_s=0.01, opener=opener
+    )
+    entry = {"path": "Office.lnk", "target": None, "args": [], "cwd": None}
+    assert launcher.launch(entry) == "shell"
+    assert opened == ["Office.lnk"]
+    deadline = time.time() + 3
+    while not launcher.stats()["shell"]["windows_seen"] and time.time() < deadline:
+        time.sleep(0.01)
+    assert launcher.stats()["shell"]["windows_seen"] == 1
+
+
+def _history():
+    return launch_history.LaunchHistory(path="")
+
+
+def test_history_breaks_fuzzy_ties_toward_used_apps():
+    """Two similar names: the one actually launched comes first."""
+    history = _history()
+    matches = [("codeblocks", "cb.lnk", 90), ("code", "code.lnk", 90)]
+    assert history.rank(matches)[0][0] == "codeblocks"
+    history.record("code", "code")
+    ranked = history.rank(matches)
+    assert ranked[0][0] == "code" and ranked[0][2] == 90  # Score untouched
+    assert history.stats()["reranked"] == 1
+
+
+def test_history_boost_cannot_beat_a_much_better_match():
+    """Usage nudges close calls only."""
+    history = _history()
+    for _ in range(20):
+        history.record("blender", "blender")
+    matches = [("vlc media player", "vlc.lnk", 100), ("blender", "b.lnk", 80)]
+    assert history.rank(matches)[0][0] == "vlc media player"
+
+
+def test_history_decays_with_time():
+    """Frequency halves every half-life; recency fades within days."""
+    history = _history()
+    now = 1_000_000.0
+    history.record("spotify", "spotify", now=now)
+    fresh = history.boost("spotify", now=now)
+    later = history.boost("spotify", now=now + launch_history.FREQUENCY_HALF_LIFE_S)
+    assert fresh > later > 0
+    assert history.boost("unknown", now=now) == 0.0
+
+
+def test_hot_cache_is_bounded_lru():
+    """Repeated queries resolve from memory; the oldest drop out."""
+    history = launch_history.LaunchHistory(path="", hot_size=2)
+    history.record("Open Code", "visual studio code")
+    history.record("music", "spotify")
+    assert history.hot("open  code") == "visual studio code"
+    history.record("video", "vlc media player")  # Evicts "music"
+    assert history.hot("music") is None
+    assert history.hot("video") == "vlc media player"
+    stats = history.stats()
+    assert stats["hot"] == 2 and stats["hot_hits"] == 2
+
+
+def test_history_survives_restart(tmp_path):
+    """Counts persist; the hot cache is memory only."""
+    path = str(tmp_path / "launch_history.json")
+    history = launch_history.LaunchHistory(path)
+    history.record("code", "visual studio code")
+    history.save()
+    reloaded = launch_history.LaunchHistory(path)
+    assert reloaded.boost("visual studio code") > 0
+    assert reloaded.hot("code") is None
+
+
+def test_history_saves_a_burst_of_launches_once(tmp_path):
+    """Launches only flag a save; one writer thread does the writing."""
+    path = str(tmp_path / "launch_history.json")
+    history = launch_history.LaunchHistory(path)
+    history.saver.delay_s = 0.1
+    for i in range(20):
+        history.record(f"app {i}", f"app {i}")
+        history.save_later()
+    history.close()
+    assert history.saver.saves == 1
+    assert launch_history.LaunchHistory(path).boost("app 19") > 0
+
+
+def test_index_get_is_exact():
+    """Hot cache hits look the entry up by name, not by fuzzy search."""
+    index = app_index.AppIndex(path="")
+    index.build(LIBRARY)
+    assert index.get("Spotify") == LIBRARY["spotify"]
+    assert index.get("spot") is None
@@ -0,0 +1,151 @@
+import os
+import sys
+import threading
+import time
+import numpy as np
+
+# --- 1. DYNAMIC PATHING ---
+sys.path.insert(0, os.path.abspath(os.path.join(os.path.dirname(__file__), "..")))
+
+from core import mic_capture
+from core import vad
+
+
+def test_ring_window_is_contiguous_view_after_wrap():
+    """Windows that straddle the wrap point are still views, in order."""
+    ring = mic_capture.RingBuffer(8)
+    ring.write(np.arange(6, dtype=np.float32))
+    ring.write(np.arange(6, 11, dtype=np.float32))
+
+    window = ring.window(8)
+    assert window.tolist() == list(range(3, 11))
+    assert np.shares_memory(window, ring.data)
+    assert ring.window(3, end=6).tolist() == [3, 4, 5]
+
+
+def test_capture_fans_out_blocks_to_subscribers():
+    """Each subscriber sees the same block without its own stream."""
+    capture = mic_capture.MicCapture(sample_rate=100, seconds=1)
+    seen_a, seen_b = [], []
+    token = capture.subscribe(lambda block: seen_a.append(block.copy()))
+    capture.subscribe(lambda block: seen_b.append(float(block.sum())))
+
+    capture.push(np.ones(10, dtype=np.float32))
+    capture.unsubscribe(token)
+    capture.push(np.ones(10, dtype=np.float32))
+
+    assert len(seen_a) == 1
+    assert seen_b == [10.0, 10.0]
+
+
+def test_ring_reader_serves_recognizer_pcm():
+    """The recognizer gets 16-bit PCM and can rewind to catch a word onset."""
+    capture = mic_capture.MicCapture(sample_rate=100, seconds=1)
+    reader = mic_capture._RingReader(capture)
+    capture.push(np.full(20, 0.5, dtype=np.float32))
+
+    pcm = np.frombuffer(reader.read(10), dtype="<i2")
+    assert len(pcm) == 10
+    assert pcm[0] == int(0.5 * 32767)
+
+    reader.rewind(5)
+    assert reader.cursor == 5
+
+
+# --- VAD ---
+SR = 16000
+
+
+def _voice(seconds, f0=150.0):
+    """Harmonic-rich, amplitude-modulated tone: close enough to a vowel."""
+    t = np.arange(int(SR * seconds)) / SR
+    harmonics = sum(np.sin(2 * np.pi * f0 * k * t) / k for k in range(1, 20))
+    return (0.1 * harmonics * (1 + 0.3 * np.sin(2 * np.pi * 4 * t))).astype(np.float32)
+
+
+def _noise(seconds, level=0.003, seed=0):
+    rng = np.random.default_rng(seed)
+    return rng.normal(0, level, int(SR * seconds)).astype(np.float32)
+
+
+def _write_wav(path, samples):
+    import wave
+
+    with wave.open(str(path), "wb") as wf:
+        wf.setnchannels(1)
+        wf.setsampwidth(2)
+        wf.setframerate(SR)
+        wf.writeframes((np.clip(samples, -1, 1) * 32767).astype("<i2").tobytes())
+
+
+def test_vad_detects_voice_between_silences():
+    """Speech in the middle is flagged; the lead-in silence is not."""
+    signal = np.concatenate([_noise(1), _noise(1) + _voice(1), _noise(1)])
+    decisions = vad.VoiceActivityDetector().detect(signal)
+    third = len(decisions) // 3
+    assert not decisions[:third].any()
+    assert decisions[third : 2 * third].mean() > 0.9
+
+
+def test_vad_ignores_clicks_hiss_and_hum():
+    """Keyboard clicks, loud hiss and mains hum never open the gate."""
+    clicks = _noise(1)
+    clicks[::1600] = 0.9
+    t = np.arange(SR) / SR
+    hum = (0.3 * np.sin(2 * np.pi * 50 * t)).astype(np.float32) + _noise(1)
+    signal = np.concatenate([_noise(1), clicks, _noise(1, level=0.2, seed=1), hum])
+    assert not vad.VoiceActivityDetector().detect(signal).any()
+
+
+def test_vad_calibrated_floor_survives_pauses():
+    """VERA's own voice after a pause between sentences is not a barge-in."""
+    detector = vad.VoiceActivityDetector()
+    detector.reset(calibration_frames=10)
+    detector.process(_noise(0.3) + _voice(0.3))  # Calibrate on her voice
+    detector.process(_noise(0.15, level=0.0001))  # Gap between sentences
+    fired = [detector.process(block) for block in np.split(_voice(2), 40)]
+    assert not any(fired)
+
+
+def test_vad_benchmark_on_wav_fixture(tmp_path):
+    """The offline benchmark scores a labelled recording."""
+    wav_path = tmp_path / "fixture.wav"
+    _write_wav(wav_path, np.concatenate([_noise(1), _noise(1) + _voice(1)]))
+    report = vad.benchmark(str(wav_path), labels=[(1.0, 2.0)])
+    assert report["accuracy"] > 0.9
+    assert report["realtime_factor"] > 1
+
+
+def _push_later(capture, *blocks):
+    """Feeds blocks from another thread, like the audio callback does."""
+
+    def push():
+        time.sleep(0.05)
+        for block in blocks:
+            capture.push(block)
+
+    thread = threading.Thread(target=push, daemon=True)
+    thread.start()
+    return thread
+
+
+def test_listening_gate_rewinds_to_word_onset():
+    """The gate fires on speech and leaves the cursor before the onset."""
+    capture = mic_capture.MicCapture(sample_rate=SR, seconds=5)
+    reader = mic_capture._RingReader(capture)
+    _push_later(capture, _noise(1), _noise(1) + _voice(1))
+
+    assert reader.wait_for_speech(vad.VoiceActivityDetector(), timeout=1)
+    assert SR // 2 < reader.cursor < SR
+
+
+def test_listening_gate_skips_stale_backlog():
+    """Audio captured while VERA was busy (her own reply) never opens the gate."""
+    capture = mic_capture.MicCapture(sample_rate=SR, seconds=10)
+    reader = mic_capture._RingReader(capture)
+    capture.push(_noise(1))
+    capture.push(_noise(3) + _voice(3))  # VERA answering
+    capture.push(_noise(1))
+
+    assert not reader.wait_for_speech(vad.VoiceActivityDetector(), timeout=0.3)
+    assert reader.cursor >= 5 * SR - int(0.3 * SR)
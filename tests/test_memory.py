@@ -0,0 +1,345 @@
+import json
+import math
+import random
+import os
+import sys
+import threading
+import time
+import numpy as np
+
+# --- 1. DYNAMIC PATHING ---
+sys.path.insert(0, os.path.abspath(os.path.join(os.path.dirname(__file__), "..")))
+
+from core import conversation_store
+from core import facts_index
+from core import vector_index
+from core import context_builder
+from core import fact_learner
+
+
+def test_store_appends_and_reloads(tmp_path):
+    """Messages written behind the caller's back are there after a restart."""
+    path = str(tmp_path / "chat.jsonl")
+    store = conversation_store.ConversationStore(path, tail_size=4)
+    for i in range(6):
+        store.append("user", f"q{i}")
+        store.append("assistant", f"a{i}")
+    assert store.last(2) == [
+        {"role": "user", "content": "q5"},
+        {"role": "assistant", "content": "a5"},
+    ]
+    store.close()
+
+    reloaded = conversation_store.ConversationStore(path, tail_size=4)
+    assert [m["content"] for m in reloaded.last(4)] == ["q4", "a4", "q5", "a5"]
+    # Past the in-memory tail it reads the file backwards
+    assert [m["content"] for m in reloaded.last(7)][0] == "a2"
+    reloaded.close()
+
+
+def test_read_tail_skips_the_rest_of_the_file(tmp_path):
+    """Only the last n lines are parsed, even across read blocks."""
+    path = tmp_path / "chat.jsonl"
+    lines = [json.dumps({"role": "user", "content": str(i)}) for i in range(5000)]
+    path.write_text("\n".join(lines) + "\n")
+    tail = conversation_store.read_tail(str(path), 3, block_size=64)
+    assert [r["content"] for r in tail] == ["4997", "4998", "4999"]
+    assert conversation_store.read_tail(str(tmp_path / "missing.jsonl"), 3) == []
+
+
+def test_compaction_keeps_newest_messages(tmp_path):
+    """Compaction rewrites the log down to the newest records."""
+    path = str(tmp_path / "chat.jsonl")
+    store = conversation_store.ConversationStore(path, compact_keep=5)
+    for i in range(50):
+        store.append("user", str(i))
+    store.compact()
+    store.flush()
+    store.append("assistant", "after")
+    store.close()
+
+    with open(path) as f:
+        contents = [json.loads(line)["content"] for line in f]
+    assert contents == ["45", "46", "47", "48", "49", "after"]
+    assert store.stats()["compactions"] == 1
+
+
+def test_legacy_history_is_imported_once(tmp_path):
+    """The old whole-file JSON history moves into the log on first start."""
+    legacy = tmp_path / "vera_memory.json"
+    legacy.write_text(
+        json.dumps(
+            [
+                {"role": "system", "content": "prompt"},
+                {"role": "user", "content": "hi"},
+                {"role": "assistant", "content": "hello"},
+            ]
+        )
+    )
+    store = conversation_store.ConversationStore(str(tmp_path / "chat.jsonl"))
+    assert conversation_store.import_legacy(store, str(legacy)) == 2
+    assert conversation_store.import_legacy(store, str(legacy)) == 0
+    assert store.last(5) == [
+        {"role": "user", "content": "hi"},
+        {"role": "assistant", "content": "hello"},
+    ]
+    store.close()
+
+
+def test_facts_index_ranks_and_ignores_stopwords(tmp_path):
+    """Rare shared words rank first; 'is' and 'a' don't match everything."""
+    index = facts_index.FactsIndex(str(tmp_path / "facts.json"))
+    index.add("User lives in Cape Town")
+    index.add("User likes jazz music")
+    index.add("User is a Python developer")
+    index.add("User likes hiking in the mountains")
+
+    assert index.search("what music do I like?")[0][0] == "User likes jazz music"
+    assert index.search("is a") == []
+    assert [f for f, _ in index.search("cape town hiking")][:2] == [
+        "User lives in Cape Town",
+        "User likes hiking in the mountains",
+    ]
+
+
+def test_facts_index_dedups_and_persists(tmp_path):
+    """Variants of a known fact are rejected; inserts survive a reload."""
+    path = str(tmp_path / "facts.json")
+    index = facts_index.FactsIndex(path)
+    assert index.add("User lives in Cape Town.")
+    assert not index.add("  user lives in cape  town ")
+    assert len(index) == 1
+
+    with open(path) as f:
+        assert json.load(f) == ["User lives in Cape Town."]
+    reloaded = facts_index.FactsIndex(path)
+    assert "USER LIVES IN CAPE TOWN" in reloaded
+    assert reloaded.search("town")[0][0] == "User lives in Cape Town."
+
+
+def _bm25_reference(index, query, k=3):
+    """Plain BM25 over every posting, for checking the pruned search."""
+    terms = set(facts_index.tokenize(query))
+    n = len(index.facts)
+    avg_length = index.total_length / n
+    scores = {}
+    for term in terms:
+        postings = index.postings.get(term, {})
+        idf = math.log(1 + (n - len(postings) + 0.5) / (len(postings) + 0.5))
+        for fact_id, tf in postings.items():
+            scores[fact_id] = scores.get(fact_id, 0.0) + idf * index._weight(
+                tf, index.lengths[fact_id], avg_length
+            )
+    best = sorted(scores.items(), key=lambda kv: (-kv[1], kv[0]))[:k]
+    return [(index.facts[i], round(score, 9)) for i, score in best]
+
+
+def test_facts_search_prunes_common_terms_without_changing_results():
+    """'likes' is in every fact; queries with it still return the true top k."""
+    rng = random.Random(1)
+    words = [f"w{i}" for i in range(300)]
+    index = facts_index.FactsIndex(path="")
+    for i in range(2000):
+        extra = " ".join(rng.sample(words, rng.randint(1, 6)))
+        index.add(f"User likes {extra}" + " really" * (i % 3), save=False)
+    queries = ["which things he likes", "likes", "likes w1 w2", "really likes w7"]
+    queries += [f"{rng.choice(words)} likes {rng.choice(words)}" for _ in range(50)]
+    for query in queries:
+        got = [(fact, round(score, 9)) for fact, score in index.search(query)]
+        assert got == _bm25_reference(index, query), query
+    assert "likes" in index.impacts  # Served from its best postings
+
+
+def test_hashing_embedder_is_deterministic():
+    """Same text, same unit vector; shared word stems score higher."""
+    embedder = vector_index.HashingEmbedder(dim=128)
+    a, b, c = embedder.embed(["where I stay", "User stays in Cape Town", "jazz"])
+    assert np.allclose(embedder.embed(["where I stay"])[0], a)
+    assert np.isclose(np.linalg.norm(a), 1.0)
+    assert a @ b > a @ c
+
+
+def test_vector_index_search_delete_and_reload(tmp_path, monkeypatch):
+    """Top-k cosine with kind filters; tombstones and growth survive reopening."""
+    monkeypatch.setattr(vector_index, "INITIAL_ROWS", 4)
+    index = vector_index.VectorIndex(str(tmp_path), vector_index.HashingEmbedder(64))
+    index.add(["User lives in Cape Town", "User likes jazz music"], kind="fact")
+    rows = index.add([f"User: tell me about topic {i}" for i in range(6)], kind="turn")
+    assert index.matrix.shape[0] >= 8
+
+    best = index.search("Cape Town weather", k=1, kind="fact")[0]
+    assert best[2]["text"] == "User lives in Cape Town"
+    assert all(m["kind"] == "turn" for _, _, m in index.search("topic", kind="turn"))
+
+    index.delete(rows[3])
+    hits = [row for row, _, _ in index.search("topic 3", k=8, kind="turn")]
+    assert rows[3] not in hits
+
+    reloaded = vector_index.VectorIndex(str(tmp_path), vector_index.HashingEmbedder(64))
+    assert len(reloaded) == 7
+    assert reloaded.search("jazz", k=1)[0][2]["text"] == "User likes jazz music"
+    assert rows[3] not in [r for r, _, _ in reloaded.search("topic 3", k=8)]
+
+
+def test_vector_index_rebuilds_for_another_embedder(tmp_path):
+    """Vectors from a different embedder are discarded, not mixed."""
+    vector_index.VectorIndex(str(tmp_path), vector_index.HashingEmbedder(64)).add(
+        ["User likes jazz music"]
+    )
+    other = vector_index.VectorIndex(str(tmp_path), vector_index.HashingEmbedder(32))
+    assert len(other) == 0
+    assert other.search("jazz") == []
+
+
+def test_sentence_model_is_never_downloaded(monkeypatch):
+    """Only a cached model is used; a missing one means the hashing embedder."""
+    calls = []
+
+    def offline_model(name, **kwargs):
+        calls.append(kwargs)
+        raise OSError("not in the local cache")
+
+    monkeypatch.setattr(vector_index, "SENTENCE_TRANSFORMERS_AVAILABLE", True)
+    monkeypatch.setattr(
+        vector_index, "SentenceTransformer", offline_model, raising=False
+    )
+    embedder = vector_index.default_embedder()
+    assert calls == [{"local_files_only": True}]
+    assert isinstance(embedder, vector_index.HashingEmbedder)
+
+
+def test_vector_index_lists_live_texts_by_kind(tmp_path):
+    """What's already embedded, so a late loader can add only the rest."""
+    index = vector_index.VectorIndex(str(tmp_path), vector_index.HashingEmbedder(64))
+    rows = index.add(["User likes jazz", "User lives in Cape Town"], kind="fact")
+    index.add(["User: hi\nVera: hello"], kind="turn")
+    index.delete(rows[0])
+    assert index.texts(kind="fact") == {"User lives in Cape Town"}
+    assert len(index.texts()) == 2
+
+
+def _chat(n, size=40):
+    roles = ["user", "assistant"]
+    return [{"role": roles[i % 2], "content": f"m{i} " + "x" * size} for i in range(n)]
+
+
+def test_context_builder_fits_budget_and_clips():
+    """Newest messages win; a pasted trace is clipped to head and tail."""
+    trace = "Traceback start " + "y" * 5000 + " ValueError: boom"
+    history = [{"role": "user", "content": trace}] + _chat(6)
+    builder = context_builder.ContextBuilder()
+    messages, report = builder.build("sys", history, "why?", budget=10_000)
+    assert report["clipped"] == 1
+    assert messages[1]["content"].startswith("Traceback start")
+    assert messages[1]["content"].endswith("ValueError: boom")
+
+    messages, report = builder.build("sys", _chat(20), "why?", budget=120)
+    assert report["prompt_tokens"] <= 120
+    assert messages[-2]["content"].startswith("m19")
+    assert report["dropped"] == 20 - report["kept"] > 0
+    assert builder.stats()["saved_tokens"] > 0
+
+
+def test_context_builder_summarizes_in_background():
+    """Dropped turns are folded off the hot path and used on the next build."""
+    release = threading.Event()
+    folded = []
+
+    def summarize(previous, messages):
+        release.wait(2)
+        folded.append(len(messages))
+        return "They talked about m0 to m9."
+
+    builder = context_builder.ContextBuilder(summarize=summarize)
+    history = _chat(20)
+    messages, report = builder.build("sys", history, "next", budget=150)
+    assert report["summary_tokens"] == 0  # Not computed yet, and we didn't wait
+    release.set()
+    for _ in range(100):
+        if builder.stats()["summaries"]:
+            break
+        time.sleep(0.02)
+
+    messages, report = builder.build("sys", history, "next", budget=150)
+    assert "They talked about m0 to m9." in messages[0]["content"]
+    assert report["summary_tokens"] > 0
+    assert folded and report["prompt_tokens"] <= 150
+
+
+def test_context_builder_folds_turns_leaving_the_window(tmp_path):
+    """Turns that age out of the history window are summarized, repeats too."""
+    store = conversation_store.ConversationStore(
+        str(tmp_path / "chat.jsonl"), tail_size=8
+    )
+    folded = []
+
+    def summarize(previous, messages):
+        folded.extend(m["content"] for m in messages)
+        return f"{len(folded)} messages so far."
+
+    builder = context_builder.ContextBuilder(summarize=summarize, fetch=store.between)
+
+    def ask():
+        first, history = store.window(4)
+        builder.build("sys", history, "next", budget=10_000, first=first)
+        for _ in range(100):
+            if not builder.folding:
+                break
+            time.sleep(0.02)
+
+    for i in range(12):
+        store.append("user", "ok" if i % 2 else f"q{i}")
+        ask()
+    store.close()
+    # Nothing was dropped for budget, yet everything outside the window
+    # got folded once, including the identical "ok" replies
+    assert folded == ["ok" if i % 2 else f"q{i}" for i in range(8)]
+    assert store.between(9, 11) == [
+        {"role": "user", "content": "ok"},
+        {"role": "user", "content": "q10"},
+    ]
+
+
+def test_fact_learner_batches_and_dedups(tmp_path):
+    """A burst becomes one call; repeats coalesce and known facts aren't re-added."""
+    calls = []
+    index = facts_index.FactsIndex(str(tmp_path / "facts.json"))
+    index.add("User likes jazz")
+
+    def extract(texts):
+        calls.append(list(texts))
+        return ["User likes jazz", "User lives in Cape Town"]
+
+    learner = fact_learner.FactLearner(
+        extract, index.add, linger_s=0.2, min_interval_s=0.0
+    )
+    learner.submit("i like jazz")
+    learner.submit("i live in   cape town")
+    learner.submit("i like jazz")
+    assert learner.flush(timeout=2)
+
+    assert calls == [["i like jazz", "i live in cape town"]]
+    stats = learner.stats()
+    assert stats["queued"] == 2 and stats["merged"] == 2
+    assert stats["learned"] == 1 and stats["duplicates"] == 1
+    assert "User lives in Cape Town" in index
+    learner.close()
+
+
+def test_fact_learner_bounds_queue_and_flushes_on_close():
+    """Overflow is dropped and counted; close() still processes what's queued."""
+    seen = []
+    learner = fact_learner.FactLearner(
+        lambda texts: seen.extend(texts) or [],
+        lambda fact: True,
+        max_pending=2,
+        batch_size=1,
+        linger_s=60,
+        min_interval_s=60,
+    )
+    assert learner.submit("a") and learner.submit("b")
+    assert not learner.submit("c")
+    assert learner.close(timeout=2)
+    assert seen == ["a", "b"]
+    assert learner.stats()["dropped"] == 1
+    assert not learner.submit("d")
@@ -0,0 +1,349 @@
+import os
+import sys
+import threading
+import time
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+
+# --- 1. DYNAMIC PATHING ---
+sys.path.insert(0, os.path.abspath(os.path.join(os.path.dirname(__file__), "..")))
+
+import httpx
+import pytest
+
+from core import model_clients
+from core import request_policy
+from core import model_selector
+from core import metrics
+
+
+# --- 2. LOCAL STUB PROVIDER ---
+class _StubHandler(BaseHTTPRequestHandler):
+    """Answers from server.script: one (delay_s, status) per request."""
+
+    protocol_version = "HTTP/1.1"  # Keep-alive, like the real APIs
+
+    def do_GET(self):
+        with self.server.lock:
+            self.server.hits += 1
+            delay, status = (
+                self.server.script.pop(0) if self.server.script else (0, 200)
+            )
+        time.sleep(delay)
+        body = b'{"ok": true}'
+        self.send_response(status)
+        self.send_header("Content-Type", "application/json")
+        self.send_header("Content-Length", str(len(body)))
+        self.end_headers()
+        try:
+            self.wfile.write(body)
+        except BrokenPipeError:
+            pass  # The client gave up on us (deadline or lost hedge)
+
+    def log_message(self, *args):
+        pass
+
+
+def _start_stub(script=None):
+    server = ThreadingHTTPServer(("127.0.0.1", 0), _StubHandler)
+    server.daemon_threads = True
+    server.script = list(script or [])
+    server.hits = 0
+    server.lock = threading.Lock()
+    threading.Thread(target=server.serve_forever, daemon=True).start()
+    return server, f"http://127.0.0.1:{server.server_port}"
+
+
+def _getter(http, url):
+    """A model call as the policy sees it: fn(timeout) -> result or raise."""
+
+    def call(timeout):
+        response = http.get(url, timeout=timeout)
+        response.raise_for_status()
+        return response.status_code
+
+    return call
+
+
+def test_pooled_client_reuses_connection():
+    """Only the first request pays connection setup; the next one rides the pool."""
+    server, url = _start_stub()
+    manager = model_clients.ClientManager()
+    http = model_clients.pooled_http_client()
+    manager.add(model_clients.Provider("stub", lambda: http))
+    try:
+        with manager.timed("stub", "first") as first:
+            http.get(url)
+        with manager.timed("stub", "second") as second:
+            http.get(url)
+    finally:
+        http.close()
+        server.shutdown()
+    assert first.connect_ms > 0
+    assert second.connect_ms == 0
+    assert manager.stats()["stub"]["cold"] == 1
+
+
+def test_manager_states_and_warm_up():
+    """Providers come up in the background; a missing key is OFFLINE, not a hang."""
+    warmed = []
+    manager = model_clients.ClientManager()
+    manager.add(model_clients.Provider("brain", lambda: "client", warm=warmed.append))
+    manager.add(model_clients.Provider("eyes", lambda: None))
+    manager.add(model_clients.Provider("broken", lambda: 1 / 0))
+    manager.start()
+    try:
+        assert manager.get("brain", wait=2) == "client"
+        assert manager.get("eyes", wait=2) is None
+        assert manager.get("broken", wait=2) is None
+        deadline = time.time() + 2
+        while manager.state("brain") != model_clients.READY and time.time() < deadline:
+            time.sleep(0.01)
+        assert warmed == ["client"]
+        assert manager.state("eyes") == model_clients.OFFLINE
+        assert manager.state("broken") == model_clients.FAILED
+    finally:
+        manager.close()
+
+
+def test_get_waits_for_slow_connect():
+    """A request arriving during start-up waits for the client instead of failing."""
+    manager = model_clients.ClientManager()
+
+    def slow_connect():
+        time.sleep(0.1)
+        return "client"
+
+    manager.add(model_clients.Provider("brain", slow_connect))
+    manager.start()
+    try:
+        assert manager.state("brain") == model_clients.CONNECTING
+        assert manager.get("brain", wait=2) == "client"
+    finally:
+        manager.close()
+
+
+def test_idle_provider_is_rewarmed():
+    """After the idle window the keeper sends another warm-up."""
+    warmed = []
+    manager = model_clients.ClientManager(rewarm_idle_s=0.1, retry_s=0.1)
+    manager.add(model_clients.Provider("brain", lambda: "client", warm=warmed.append))
+    manager.start()
+    try:
+        deadline = time.time() + 2
+        while len(warmed) < 2 and time.time() < deadline:
+            time.sleep(0.02)
+    finally:
+        manager.close()
+    assert len(warmed) >= 2
+    assert manager.stats()["brain"]["warmups"] >= 2
+
+
+def test_policy_enforces_deadline():
+    """A hung provider costs the deadline, not the whole voice loop."""
+    server, url = _start_stub([(1.0, 200)])
+    policy = request_policy.RequestPolicy("stub", deadline_s=0.2)
+    start = time.monotonic()
+    try:
+        with httpx.Client() as http:
+            try:
+                policy.call(_getter(http, url))
+                assert False, "expected DeadlineExceeded"
+            except request_policy.DeadlineExceeded:
+                pass
+            elapsed = time.monotonic() - start
+    finally:
+        server.shutdown()
+    assert elapsed < 0.6
+    assert policy.stats()["deadline_exceeded"] == 1
+
+
+def test_policy_hedges_slow_call():
+    """Past the hedge delay a duplicate goes out and the faster answer wins."""
+    server, url = _start_stub([(1.0, 200), (0, 200)])
+    policy = request_policy.RequestPolicy("stub", deadline_s=3, hedge_default_s=0.1)
+    start = time.monotonic()
+    try:
+        with httpx.Client() as http:
+            assert policy.call(_getter(http, url), hedge=True) == 200
+            elapsed = time.monotonic() - start  # Before close waits on the loser
+    finally:
+        server.shutdown()
+    assert elapsed < 0.6
+    stats = policy.stats()
+    assert stats["hedged"] == 1 and stats["hedge_wins"] == 1
+
+
+def test_hedge_delay_tracks_p95():
+    """Once enough calls are seen, the hedge fires at their p95 latency."""
+    policy = request_policy.RequestPolicy(
+        "stub", hedge_default_s=1.5, hedge_min_samples=20
+    )
+    assert policy.hedge_delay("fast") == 1.5
+    for i in range(100):
+        policy.record("fast", 0.1 if i < 95 else 0.9, True)
+    assert policy.hedge_delay("fast") == 0.9
+    assert policy.hedge_delay("other") == 1.5
+
+
+def test_circuit_opens_and_recovers():
+    """Repeated errors fail fast without touching the provider, then a trial heals it."""
+    server, url = _start_stub([(0, 500), (0, 500)])
+    breaker = request_policy.CircuitBreaker(failure_threshold=2, reset_s=0.2)
+    policy = request_policy.RequestPolicy("stub", deadline_s=2, breaker=breaker)
+    try:
+        with httpx.Client() as http:
+            call = _getter(http, url)
+            for _ in range(2):
+                try:
+                    policy.call(call)
+                except httpx.HTTPStatusError:
+                    pass
+            assert breaker.is_open()
+            try:
+                policy.call(call)
+                assert False, "expected CircuitOpen"
+            except request_policy.CircuitOpen:
+                pass
+            assert server.hits == 2  # The open circuit never reached the server
+
+            time.sleep(0.25)
+            assert policy.call(call) == 200  # Half-open trial succeeds
+            assert breaker.state == request_policy.CLOSED
+    finally:
+        server.shutdown()
+    assert policy.stats()["short_circuited"] == 1
+
+
+def _chunks(*texts, fail_after=None):
+    """Stub stream: yields texts, raising once fail_after of them are out."""
+
+    def open_stream(timeout):
+        for i, text in enumerate(texts):
+            if i == fail_after:
+                raise httpx.ReadError("connection dropped")
+            yield text
+
+    return open_stream
+
+
+def test_stream_saves_only_a_finished_reply():
+    """A reply cut off mid-stream is spoken as far as it got but never saved."""
+    policy = request_policy.RequestPolicy("stub", deadline_s=2)
+    saved = []
+    spoken = list(
+        policy.stream(
+            _chunks("Hello ", "there ", "friend", fail_after=2),
+            lambda chunk: chunk,
+            on_complete=saved.append,
+        )
+    )
+    assert spoken == ["Hello ", "there "]
+    assert saved == []
+    assert policy.stats()["failed"] == 1
+
+    spoken = list(
+        policy.stream(
+            _chunks("Hello ", "there"), lambda chunk: chunk, on_complete=saved.append
+        )
+    )
+    assert saved == ["Hello there"]
+
+
+def test_stream_error_before_any_text_raises():
+    """With nothing said yet, the caller gets the error to report."""
+    policy = request_policy.RequestPolicy("stub", deadline_s=2)
+    saved = []
+    with pytest.raises(httpx.ReadError):
+        list(policy.stream(_chunks("Hi", fail_after=0), str, on_complete=saved.append))
+    assert saved == []
+
+
+def test_failed_call_counts_as_the_full_deadline():
+    """A model that errors out at once must not look like a fast model."""
+    policy = request_policy.RequestPolicy("stub", deadline_s=2)
+    seen = []
+
+    def refuse(timeout):
+        raise httpx.ConnectError("refused")
+
+    with pytest.raises(httpx.ConnectError):
+        policy.call(refuse, observe=seen.append)
+    with pytest.raises(httpx.ReadError):
+        list(policy.stream(_chunks("Hi", fail_after=0), str, observe=seen.append))
+    assert seen == [2, 2]
+
+    policy.call(lambda timeout: "ok", observe=seen.append)
+    assert seen[-1] < 0.5
+
+
+def _selector(**kwargs):
+    return model_selector.ModelSelector(
+        {"CHAT_DEEP": ["smart", "fast"]}, {"CHAT_DEEP": 2.0}, **kwargs
+    )
+
+
+def test_selector_prefers_smart_model_within_budget():
+    """With no data, or data in budget, the best model is used."""
+    selector = _selector()
+    assert selector.choose("CHAT_DEEP")[0] == "smart"
+    for _ in range(5):
+        selector.observe("smart", "stream", 0.8)
+    model, reason = selector.choose("CHAT_DEEP")
+    assert model == "smart"
+    assert "within" in reason
+
+
+def test_selector_downgrades_slow_model_and_logs_why():
+    """A slow spell on the smart model hands the request to the fast one."""
+    selector = _selector()
+    for _ in range(5):
+        selector.observe("smart", "stream", 0.8)
+        selector.observe("fast", "stream", 0.3)
+    for _ in range(3):
+        selector.observe("smart", "stream", 6.0)  # EWMA reacts within a few calls
+    model, reason = selector.choose("CHAT_DEEP")
+    assert model == "fast"
+    assert "smart ewma" in reason
+    assert selector.stats()["decisions"]["downgraded"] == 1
+
+
+def test_selector_tail_latency_counts():
+    """A good average doesn't hide a slow p90."""
+    selector = _selector()
+    for i in range(20):
+        selector.observe("smart", "stream", 5.0 if i % 5 == 0 else 0.5)
+    selector.observe("smart", "stream", 0.5)
+    model, reason = selector.choose("CHAT_DEEP")
+    assert model == "fast"
+    assert "p90" in reason
+
+
+def test_selector_probes_downgraded_model_again():
+    """After the probe interval the smart model gets another chance."""
+    selector = _selector(probe_after_s=0.05)
+    for _ in range(5):
+        selector.observe("smart", "stream", 6.0)
+    assert selector.choose("CHAT_DEEP")[0] == "fast"
+    time.sleep(0.1)
+    model, reason = selector.choose("CHAT_DEEP")
+    assert model == "smart"
+    assert "re-trying" in reason
+
+
+def test_selector_picks_fastest_when_nothing_fits():
+    """If every model is over budget, the quickest one still answers."""
+    selector = _selector()
+    for _ in range(5):
+        selector.observe("smart", "stream", 9.0)
+        selector.observe("fast", "stream", 3.0)
+    model, reason = selector.choose("CHAT_DEEP")
+    assert model == "fast"
+    assert "fastest" in reason
+
+
+def test_percentile_is_nearest_rank():
+    """The one percentile every latency report shares."""
+    assert metrics.percentile([], 50) is None
+    assert metrics.percentile([3, 1, 2], 50) == 2
+    assert metrics.percentile(list(range(1, 101)), 95) == 96
+    assert metrics.percentile([5], 99) == 5
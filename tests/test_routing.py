@@ -0,0 +1,263 @@
+import os
+import sys
+
+import pytest
+
+# --- 1. DYNAMIC PATHING ---
+sys.path.insert(0, os.path.abspath(os.path.join(os.path.dirname(__file__), "..")))
+
+from core import intent_rules
+from core import intent_model
+from core import action_cache
+
+
+def test_rules_cover_process_command_intents():
+    """Every intent process_command handles has a local rule."""
+    cases = {
+        "scan for apps": "CMD_SCAN",
+        "What time is it?": "CMD_TIME",
+        "system status": "CMD_STATUS",
+        "what's on the screen": "CMD_SEE",
+        "check the camera": "CMD_CAM",
+        "open spotify": "CMD_OPEN",
+        "type my email": "CMD_TYPE",
+        "explain quantum physics": "CHAT_DEEP",
+        "hello vera": "CHAT_FAST",
+    }
+    for utterance, intent in cases.items():
+        assert intent_rules.match(utterance)["intent"] == intent, utterance
+
+
+def test_rules_extract_slots():
+    """Slots come back with the match, keyed by their plain names."""
+    assert intent_rules.match("Launch Visual Studio Code")["slots"] == {
+        "target": "visual studio code"
+    }
+    assert intent_rules.match("type hello world.")["slots"] == {"text": "hello world"}
+    assert intent_rules.match("type my username")["slots"] == {"field": "username"}
+
+
+def test_question_guard_beats_commands():
+    """'Do you have access...' stays chat instead of becoming CMD_TYPE."""
+    assert intent_rules.match("do you have access to type")["intent"] == "CHAT_FAST"
+    assert intent_rules.match("can you list files")["intent"] == "CHAT_DEEP"
+
+
+def test_questions_mentioning_devices_stay_chat():
+    """Screen/camera/time words inside a question don't trigger the command."""
+    assert intent_rules.match("what is a webcam")["intent"] == "CHAT_FAST"
+    assert (
+        intent_rules.match("how do I draw text on the screen in pygame")["intent"]
+        == "CHAT_FAST"
+    )
+    assert (
+        intent_rules.match("what is the time complexity of quicksort")["intent"]
+        == "CHAT_FAST"
+    )
+    assert intent_rules.match("take a screenshot")["intent"] == "CMD_SEE"
+
+
+def test_open_and_type_verbs_are_not_greedy():
+    """'type out' isn't typed literally; 'start the timer' isn't an app."""
+    assert intent_rules.match("type out hello world")["slots"] == {
+        "text": "hello world"
+    }
+    assert intent_rules.match("write out hello")["slots"] == {"text": "hello"}
+    assert intent_rules.match("start the timer") is None
+
+
+def test_ambiguous_utterances_fall_through_and_are_counted():
+    """No match means 'ask the LLM'; hit counters show both outcomes."""
+    router = intent_rules.IntentRouter()
+    assert router.match("open the door to my heart and let me in") is None
+    router.match("open notepad")
+    assert router.stats() == {"<no match>": 1, "open": 1}
+
+
+# --- OFFLINE CLASSIFIER ---
+TRAINING = {
+    "CMD_OPEN": ["fire up spotify", "bring up chrome", "get discord going"],
+    "CMD_TYPE": ["put hello in the box", "enter my password", "key in 1234"],
+    "CMD_SEE": ["what am i looking at", "read my monitor", "see this window"],
+    "CHAT_FAST": ["i'm bored", "nice one", "that's funny"],
+}
+
+
+def _examples():
+    texts, labels = [], []
+    for label, phrases in TRAINING.items():
+        for phrase in phrases:
+            for suffix in ("", " please", " now", " vera"):
+                texts.append(phrase + suffix)
+                labels.append(label)
+    return texts, labels
+
+
+def test_llm_route_validation():
+    """The combined reply maps onto rule-style slots; bad replies are rejected."""
+    opened = intent_rules.validate_llm_route(
+        {"intent": "CMD_OPEN", "target_type": "web", "target": "github.com"}
+    )
+    assert opened == {
+        "intent": "CMD_OPEN",
+        "slots": {"target": "https://github.com", "type": "web"},
+    }
+    typed = intent_rules.validate_llm_route(
+        {"intent": "cmd_type.", "target": None, "text": " hello "}
+    )
+    assert typed == {"intent": "CMD_TYPE", "slots": {"text": "hello"}}
+
+    # Intent is fine but the slot isn't: keep the intent, let extraction retry
+    partial = intent_rules.validate_llm_route(
+        {"intent": "CMD_OPEN", "target_type": "folder", "target": "x"}
+    )
+    assert partial == {"intent": "CMD_OPEN", "slots": {}}
+
+    assert intent_rules.validate_llm_route({"intent": "CMD_SCAN"}) is None
+    assert intent_rules.validate_llm_route(["CMD_OPEN"]) is None
+    assert intent_rules.validate_llm_route({"target": "spotify"}) is None
+
+
+def test_failed_llm_route_falls_back_to_the_local_guess():
+    """If the router call raises, the model's guess answers; no second LLM call."""
+    asked = []
+
+    def route_llm(text):
+        raise TimeoutError("groq timed out")
+
+    def label_llm(text):
+        asked.append(text)
+        return "CHAT_DEEP"
+
+    def unsure(text):
+        return "CMD_SEE", 0.4
+
+    route = intent_rules.route(
+        "peek at this thing",
+        classify=unsure,
+        threshold=0.75,
+        route_llm=route_llm,
+        label_llm=label_llm,
+    )
+    assert route == {"intent": "CMD_SEE", "slots": {}, "rule": "fallback"}
+    assert asked == []
+
+    # A usable route still wins, and an empty one asks for the label
+    routed = {"intent": "CMD_OPEN", "slots": {"target": "x", "type": "app"}}
+    assert intent_rules.route(
+        "peek at this thing", unsure, 0.75, lambda text: routed, label_llm
+    ) == dict(routed, rule=None)
+    assert (
+        intent_rules.route(
+            "peek at this thing", unsure, 0.75, lambda text: None, label_llm
+        )["intent"]
+        == "CHAT_DEEP"
+    )
+
+
+def test_log_example_roundtrip(tmp_path):
+    """Logged LLM labels are cleaned up and deduplicated per utterance."""
+    log = str(tmp_path / "intent_log.jsonl")
+    intent_model.log_example("fire up spotify", "CMD_OPEN.", log)
+    intent_model.log_example("fire up spotify", "cmd_open", log)
+    intent_model.log_example("nonsense", "I think CMD_OPEN", log)
+    assert intent_model.load_examples(log) == (["fire up spotify"], ["CMD_OPEN"])
+
+
+def test_model_learns_and_reloads(tmp_path):
+    """A trained model predicts its classes and survives save/load."""
+    texts, labels = _examples()
+    model = intent_model.IntentModel.train(texts, labels)
+    label, confidence = model.predict("fire up steam please")
+    assert label == "CMD_OPEN"
+    assert 0 < confidence <= 1
+
+    path = str(tmp_path / "intent_model.npz")
+    model.save(path)
+    loaded = intent_model.IntentModel.load(path)
+    assert loaded.predict("read my monitor")[0] == "CMD_SEE"
+    assert loaded.meta["version"] == intent_model.FORMAT_VERSION
+
+
+def test_model_needs_two_classes_with_enough_examples():
+    """One label can't be a classifier; rare labels are left to the LLM."""
+    texts, labels = _examples()
+    opens = [t for t, l in zip(texts, labels) if l == "CMD_OPEN"]
+    with pytest.raises(ValueError):
+        intent_model.IntentModel.train(opens, ["CMD_OPEN"] * len(opens))
+    with pytest.raises(ValueError):
+        intent_model.IntentModel.train(
+            opens + ["hi"], ["CMD_OPEN"] * len(opens) + ["CHAT_FAST"]
+        )
+
+    model = intent_model.IntentModel.train(
+        texts + ["take a picture"], labels + ["CMD_CAM"], epochs=5
+    )
+    assert "CMD_CAM" not in model.labels and len(model.labels) == len(TRAINING)
+
+
+def test_model_ignores_outdated_format(tmp_path, monkeypatch):
+    """Bumping FORMAT_VERSION makes old files fall back to the LLM path."""
+    texts, labels = _examples()
+    path = str(tmp_path / "intent_model.npz")
+    intent_model.IntentModel.train(texts, labels, epochs=5).save(path)
+    monkeypatch.setattr(intent_model, "FORMAT_VERSION", 99)
+    assert intent_model.IntentModel.load(path) is None
+
+
+def test_action_cache_roundtrip_and_lru(tmp_path):
+    """Plans survive a restart and the least recently used one goes first."""
+    path = str(tmp_path / "plans.json")
+    cache = action_cache.ActionCache(path, max_plans=2)
+    web = {"intent": "CMD_OPEN", "slots": {}, "target": {"type": "web"}}
+    cache.put("Open Google.", web)
+    cache.put("open bing", web)
+    assert cache.get("open google") == web  # Now the most recent
+    cache.put("open github", web)
+    assert cache.get("open bing") is None
+    assert cache.stats()["evictions"] == 1
+    cache.save()
+
+    reloaded = action_cache.ActionCache(path, max_plans=2)
+    assert reloaded.get("OPEN GOOGLE") == web
+    assert reloaded.get("open github") == web
+
+
+def test_action_cache_keeps_typed_text_off_disk(tmp_path):
+    """Plans with text to type aren't cached; bursts of saves share one write."""
+    path = str(tmp_path / "plans.json")
+    cache = action_cache.ActionCache(path)
+    cache.saver.delay_s = 0.1
+    typed = {"intent": "CMD_TYPE", "slots": {}, "target": None, "text": "hunter2"}
+    assert not cache.put("type my password", typed)
+    assert not cache.put("type hi", {"intent": "CMD_TYPE", "slots": {"text": "hi"}})
+    assert cache.get("type my password") is None
+
+    web = {"intent": "CMD_OPEN", "slots": {}, "target": {"type": "web"}}
+    for i in range(20):
+        assert cache.put(f"open site {i}", web)
+        cache.save_later()
+    cache.close()
+    assert cache.saver.saves == 1
+    with open(path, encoding="utf-8") as f:
+        assert "hunter2" not in f.read()
+    assert len(action_cache.ActionCache(path).plans) == 20
+
+
+def test_action_cache_expires_and_tracks_library(tmp_path):
+    """Old plans expire; app paths die with the library version they came from."""
+    cache = action_cache.ActionCache(str(tmp_path / "plans.json"), ttl_s=60)
+    app = {"intent": "CMD_OPEN", "slots": {}, "path": "C:/Blender.lnk"}
+    cache.put("open blender", app, library_version=1)
+    cache.put("open google", {"intent": "CMD_OPEN", "slots": {}})
+    assert cache.get("open blender", library_version=1) == app
+    assert cache.get("open blender", library_version=2) is None
+    assert cache.get("open google", library_version=2) is not None  # Not app-bound
+
+    cache.put("open blender", app, library_version=2)
+    cache.invalidate_library()
+    assert cache.get("open blender", library_version=2) is None
+
+    cache.plans["open google"]["created"] -= 120
+    assert cache.get("open google") is None
+    assert cache.stats()["expired"] == 1
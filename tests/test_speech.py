@@ -0,0 +1,377 @@
+import asyncio
+import os
+import queue
+import sys
+import threading
+import time
+
+# --- 1. DYNAMIC PATHING ---
+sys.path.insert(0, os.path.abspath(os.path.join(os.path.dirname(__file__), "..")))
+
+from core import speech_cache
+from core import speech_stream
+from core import speech_pipeline
+from core import speech_service
+from core import latency_masker
+
+VOICE = "en-US-AriaNeural"
+
+
+def test_cache_roundtrip(tmp_path):
+    """A stored phrase comes back as a path, whitespace differences included."""
+    cache = speech_cache.SpeechCache(cache_dir=str(tmp_path))
+    assert cache.get("On it.", VOICE) is None
+
+    path = cache.put("On it.", VOICE, audio=b"ID3fake")
+    assert os.path.exists(path)
+    assert cache.get("  On   it. ", VOICE) == path
+    assert cache.get("On it.", "en-GB-SoniaNeural") is None
+
+    stats = cache.stats()
+    assert stats["hits"] == 1
+    assert stats["misses"] == 2
+
+
+def test_cache_lru_eviction(tmp_path):
+    """The least recently played phrase is evicted once over budget."""
+    cache = speech_cache.SpeechCache(cache_dir=str(tmp_path), max_bytes=20)
+    first = cache.put("first", VOICE, audio=b"x" * 10)
+    cache.put("second", VOICE, audio=b"x" * 10)
+    cache.get("first", VOICE)  # 'second' is now the oldest
+    cache.put("third", VOICE, audio=b"x" * 10)
+
+    assert cache.get("second", VOICE) is None
+    assert cache.get("first", VOICE) == first
+    assert cache.stats()["evictions"] == 1
+
+
+def test_cache_prewarm_and_reload(tmp_path):
+    """Prewarm only synthesizes missing phrases and survives a restart."""
+    calls = []
+
+    def fake_synth(text):
+        calls.append(text)
+        return b"audio:" + text.encode()
+
+    cache = speech_cache.SpeechCache(cache_dir=str(tmp_path))
+    assert cache.prewarm(["Typing.", "On it."], fake_synth, VOICE) == 2
+    assert cache.prewarm(["Typing.", "On it."], fake_synth, VOICE) == 0
+    assert calls == ["Typing.", "On it."]
+
+    reloaded = speech_cache.SpeechCache(cache_dir=str(tmp_path))
+    assert reloaded.get("Typing.", VOICE) is not None
+
+
+class FakeDecoder:
+    """Passes 'mp3' through untouched so playback order is easy to check."""
+
+    def __init__(self):
+        self.pcm = queue.Queue()
+
+    def feed(self, data):
+        self.pcm.put(data)
+
+    def finish(self):
+        self.pcm.put(speech_stream.END_OF_STREAM)
+
+
+class FakeChannel:
+    def __init__(self):
+        self.played = []
+        self.stopped = False
+
+    def get_busy(self):
+        return False
+
+    def get_queue(self):
+        return None
+
+    def play(self, sound):
+        self.played.append(sound)
+
+    def queue(self, sound):
+        self.played.append(sound)
+
+    def stop(self):
+        self.stopped = True
+
+
+async def _chunks(items):
+    for item in items:
+        yield item
+        await asyncio.sleep(0)
+
+
+def test_stream_plays_chunks_in_order():
+    """Every decoded block reaches the device and TTFA gets recorded."""
+    channel = FakeChannel()
+    stats = asyncio.run(
+        speech_stream.play_stream(
+            _chunks([b"a", b"b", b"c"]),
+            FakeDecoder(),
+            channel,
+            lambda pcm: pcm,
+            lambda: True,
+        )
+    )
+    assert channel.played == [b"a", b"b", b"c"]
+    assert stats["completed"]
+    assert stats["ttfa_ms"] is not None
+
+
+def test_stream_stops_on_barge_in():
+    """Dropping is_active() ends playback early and marks it incomplete."""
+    channel = FakeChannel()
+    active = [True]
+
+    def make_sound(pcm):
+        active[0] = False  # User talks over the first block
+        return pcm
+
+    stats = asyncio.run(
+        speech_stream.play_stream(
+            _chunks([b"a", b"b", b"c"]),
+            FakeDecoder(),
+            channel,
+            make_sound,
+            lambda: active[0],
+        )
+    )
+    assert not stats["completed"]
+    assert channel.stopped
+    assert channel.played == [b"a"]
+
+
+def test_split_sentences_keeps_abbreviations():
+    """Sentence breaks ignore 'Mr.', 'e.g.' and decimals."""
+    text = "Hi there. Mr. Smith paid 3.5 dollars, e.g. cash! Ready?\n\nNext"
+    assert speech_pipeline.split_sentences(text) == [
+        "Hi there.",
+        "Mr. Smith paid 3.5 dollars, e.g. cash!",
+        "Ready?",
+        "Next",
+    ]
+
+
+def test_split_sentences_breaks_run_ons_at_clauses():
+    """A sentence over the limit is split at commas, never mid-clause."""
+    parts = speech_pipeline.split_sentences("alpha beta, " * 20, max_chars=40)
+    assert len(parts) > 1
+    assert all(len(p) <= 40 for p in parts)
+
+
+def test_pipeline_bounded_lookahead_and_cancel():
+    """Synthesis runs ahead by at most 'lookahead' and stops on barge-in."""
+    segments = [f"Sentence {i}." for i in range(6)]
+    started = []
+    in_flight = [0]
+    peak = [0]
+    active = [True]
+
+    async def synthesize(text):
+        started.append(text)
+        in_flight[0] += 1
+        peak[0] = max(peak[0], in_flight[0])
+        await asyncio.sleep(0.01)
+        in_flight[0] -= 1
+        return text
+
+    async def play(audio):
+        if audio == "Sentence 2.":
+            active[0] = False  # User talks over the third sentence
+        return active[0]
+
+    stats = asyncio.run(
+        speech_pipeline.run_pipeline(
+            segments, synthesize, play, lambda: active[0], lookahead=2
+        )
+    )
+    assert stats["played"] == 2
+    assert stats["first_audio_ms"] is not None
+    assert peak[0] <= 3
+    assert "Sentence 5." not in started
+
+
+def test_assembler_emits_sentences_as_tokens_arrive():
+    """Each sentence comes out once the space after it streams in."""
+    assembler = speech_pipeline.SentenceAssembler()
+    tokens = ["Hel", "lo there", ". Dr", ". Who is", " e.g. fine", "! End"]
+    out = [assembler.feed(t) for t in tokens]
+    assert out[:3] == [[], [], ["Hello there."]]
+    assert out[4] == []  # "Dr." and "e.g." are not sentence ends
+    assert out[5] == ["Dr. Who is e.g. fine!"]
+    assert assembler.finish() == ["End"]
+
+
+def test_markup_is_stripped_in_any_case():
+    """Tags the UI hides are never spoken, whatever their case."""
+    reply = "<Image_Search>red panda</IMAGE_SEARCH>"
+    assert speech_pipeline.strip_markup(reply) == ""  # Nothing left to say
+    assert speech_pipeline.strip_markup(f"Here. {reply} Cute.") == "Here. Cute."
+
+    assembler = speech_pipeline.SentenceAssembler()
+    sentences = assembler.feed("See <IMAGE_SEARCH>a. b</image_search> now. ")
+    assert sentences == ["See <IMAGE_SEARCH>a. b</image_search> now."]
+
+
+def test_assembler_never_splits_markup():
+    """An <image_search> tag reaches the UI whole, even with a '.' inside."""
+    assembler = speech_pipeline.SentenceAssembler()
+    sentences = []
+    for token in ["Look <image_", "search>a red. pan", "da</image_search> ok. ", "Bye"]:
+        sentences += assembler.feed(token)
+    sentences += assembler.finish()
+    assert sentences == ["Look <image_search>a red. panda</image_search> ok.", "Bye"]
+    assert speech_pipeline.strip_markup(sentences[0]) == "Look ok."
+
+
+def test_pipeline_speaks_feed_before_it_ends():
+    """The first sentence plays while the producer is still generating."""
+    played = []
+    both_sent = threading.Event()
+
+    async def synthesize(text):
+        return text
+
+    async def play(audio):
+        played.append((audio, both_sent.is_set()))
+        return True
+
+    async def main():
+        loop = asyncio.get_running_loop()
+        feed = speech_pipeline.SegmentFeed(loop)
+
+        def producer():
+            feed.put("One.")
+            time.sleep(0.2)  # The LLM is still thinking
+            both_sent.set()
+            feed.put("Two.")
+            feed.close()
+
+        threading.Thread(target=producer, daemon=True).start()
+        return await speech_pipeline.run_pipeline(feed, synthesize, play, lambda: True)
+
+    stats = asyncio.run(main())
+    assert played == [("One.", False), ("Two.", True)]
+    assert stats["segments"] == 2 and stats["played"] == 2
+
+
+def test_service_priority_order_and_stats():
+    """Queued alarms jump ahead of chatter, and every caller gets a Future."""
+    gate = threading.Event()
+    spoken = []
+
+    async def handler(text):
+        while not gate.is_set():
+            await asyncio.sleep(0.001)
+        spoken.append(text)
+        return text.upper()
+
+    preempted = []
+    service = speech_service.SpeechService(
+        handler, preempt=lambda: preempted.append(True)
+    )
+    first = service.submit("first", speech_service.PRIORITY_CHATTER)
+    while not service.stats()["speaking"]:
+        threading.Event().wait(0.001)
+    service.submit("chatter", speech_service.PRIORITY_CHATTER)
+    alarm = service.submit("alarm", speech_service.PRIORITY_ALARM)
+    gate.set()
+
+    assert alarm.result(timeout=2) == "ALARM"
+    assert first.result(timeout=2) == "FIRST"
+    service.submit("last").result(timeout=2)
+    assert spoken == ["first", "alarm", "chatter", "last"]
+    assert preempted == [True]
+
+    stats = service.stats()
+    assert stats["completed"] == 4
+    assert stats["queue_depth"] == 0
+    assert stats["total_p95_ms"] is not None
+
+
+def test_service_reports_handler_errors():
+    """A failing utterance surfaces on its Future without killing the worker."""
+
+    async def handler(text):
+        if text == "bad":
+            raise RuntimeError("tts down")
+        return text
+
+    service = speech_service.SpeechService(handler)
+    bad = service.submit("bad")
+    good = service.submit("good")
+    assert good.result(timeout=2) == "good"
+    assert isinstance(bad.exception(timeout=2), RuntimeError)
+    assert service.stats()["failed"] == 1
+
+
+def _masker(busy=None, repeat_s=0):
+    events = []
+    masker = latency_masker.LatencyMasker(
+        lambda: events.append("play"),
+        lambda ms: events.append(f"fade {ms}"),
+        busy=busy,
+        threshold_s=0.05,
+        repeat_s=repeat_s,
+        fade_ms=100,
+    )
+    return masker, events
+
+
+def test_masker_quiet_for_fast_calls():
+    """A call that beats the threshold never hears the filler."""
+    masker, events = _masker()
+    with masker.mask("fast"):
+        time.sleep(0.01)
+    time.sleep(0.1)
+    masker.fade()
+    assert events == []
+
+
+def test_masker_fills_slow_call_then_fades():
+    """Past the threshold the filler starts, and the answer fades it out."""
+    masker, events = _masker()
+    with masker.mask("slow"):
+        time.sleep(0.15)
+    assert events == ["play"]
+    masker.fade()  # Answer audio starts
+    masker.fade()  # Later sentences don't fade again
+    assert events == ["play", "fade 100"]
+    assert masker.stats()["fillers"] == 1
+
+
+def test_masker_waits_for_acknowledgement():
+    """The filler never plays over audio that is still going."""
+    busy = [True]
+    masker, events = _masker(busy=lambda: busy[0])
+    with masker.mask("ack"):
+        time.sleep(0.15)
+        assert events == []
+        busy[0] = False
+        time.sleep(0.05)
+    assert events == ["play"]
+
+
+def test_masker_finish_cancels_pending_filler():
+    """Once the answer text is in, no filler starts even if audio is late."""
+    masker, events = _masker()
+    with masker.mask("stream"):
+        masker.finish()
+        time.sleep(0.15)
+    assert events == []
+
+
+def test_masker_answer_unmasks_before_speaking():
+    """A fast answer that takes long to speak never gets a filler over it."""
+    masker, events = _masker(repeat_s=0.05)
+    spoken = []
+
+    def speak(reply):
+        time.sleep(0.15)  # Slow TTS, well past the threshold
+        spoken.append(reply)
+
+    masker.answer("chat", lambda: "hi there", speak)
+    assert spoken == ["hi there"]
+    assert events == []
+    assert masker.stats()["fillers"] == 0
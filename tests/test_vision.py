@@ -0,0 +1,105 @@
+import io
+import os
+import sys
+
+import numpy as np
+from PIL import Image, ImageDraw
+
+# --- 1. DYNAMIC PATHING ---
+sys.path.insert(0, os.path.abspath(os.path.join(os.path.dirname(__file__), "..")))
+
+from core import vision_pipeline
+
+
+def _screen(width=3840, height=2160):
+    """Flat desktop with a dark title bar."""
+    screen = np.full((height, width, 3), 230, dtype=np.uint8)
+    screen[:60] = (30, 30, 40)
+    screen[200:260, 100:1400] = (90, 90, 90)  # A line of "text"
+    return Image.fromarray(screen)
+
+
+def test_downscale_caps_longest_edge_and_keeps_aspect():
+    """A 4K capture is sent at MAX_EDGE; small images are left alone."""
+    small = vision_pipeline.downscale(_screen(800, 600), 1600)
+    assert small.size == (800, 600)
+    assert vision_pipeline.downscale(_screen(), 1600).size == (1600, 900)
+
+
+def test_crop_box_is_clamped_to_the_capture():
+    """Window boxes hanging off screen are trimmed; off-screen ones ignored."""
+    assert vision_pipeline.clamp_box((-20, 10, 500, 5000), (1920, 1080)) == (
+        0,
+        10,
+        500,
+        1080,
+    )
+    assert vision_pipeline.clamp_box((3000, 0, 3500, 400), (1920, 1080)) is None
+
+
+def test_prepare_crops_downscales_and_compresses():
+    """Only the selected region is encoded, lossy, well under the raw size."""
+    prepared = vision_pipeline.prepare(_screen(), box=(0, 0, 1920, 1080))
+    assert prepared["original"] == (3840, 2160)
+    assert prepared["size"] == (1600, 900) and prepared["cropped"]
+    blob = prepared["blob"]
+    assert blob["mime_type"] == vision_pipeline.MIME_TYPES[prepared["format"]]
+    assert prepared["bytes"] == len(blob["data"]) < 3840 * 2160 * 3 // 100
+    decoded = Image.open(io.BytesIO(blob["data"]))
+    assert decoded.size == (1600, 900)
+
+
+def test_jpeg_encoding_is_available():
+    """JPEG is the fallback wherever Pillow was built without WebP."""
+    data, fmt = vision_pipeline.encode(_screen(640, 360), "jpeg")
+    assert fmt == "JPEG" and data[:2] == b"\xff\xd8"
+
+
+def _traceback(message, width=2560, height=1440):
+    """The same terminal window, differing only in the error text."""
+    image = Image.new("RGB", (width, height), (30, 30, 30))
+    draw = ImageDraw.Draw(image)
+    lines = ["Traceback (most recent call last):"]
+    lines += [f'  File "app.py", line {n}, in handler' for n in (10, 42, 97)]
+    for row, line in enumerate(lines + [message]):
+        draw.text((40, 40 + row * 18), line, fill=(220, 220, 220))
+    return image
+
+
+def test_same_layout_with_different_text_is_a_different_screen():
+    """A NameError where a KeyError was must not get the KeyError answer."""
+    key_error = vision_pipeline.prepare(_traceback("KeyError: 'user_id'"))
+    name_error = vision_pipeline.prepare(_traceback("NameError: name 'usr' is not"))
+    again = vision_pipeline.prepare(_traceback("KeyError: 'user_id'"))
+    assert key_error["digest"] == again["digest"]
+    assert key_error["digest"] != name_error["digest"]
+
+    cache = vision_pipeline.AnswerCache()
+    cache.put(key_error["digest"], "What is this error?", "A missing dict key.")
+    assert cache.get(name_error["digest"], "What is this error?") is None
+    assert cache.get(again["digest"], "what is this error") == "A missing dict key."
+
+
+def test_answer_cache_needs_same_screen_and_same_question():
+    """Identical screen + same prompt reuses the answer; anything else asks."""
+    cache = vision_pipeline.AnswerCache(ttl_s=60)
+    cache.put("abc", "What is this error?", "A missing DLL.", now=0)
+    assert cache.get("abc", "what is this error", now=1) == "A missing DLL."
+    assert cache.get("abc", "Summarize this page", now=1) is None
+    assert cache.get("abd", "What is this error?", now=1) is None
+    assert cache.get("abc", "What is this error?", now=61) is None  # Expired
+    stats = cache.stats()
+    assert stats["hits"] == 1 and stats["misses"] == 3
+
+
+def test_reports_track_bytes_and_latency():
+    """Cached answers count as requests with nothing uploaded."""
+    reports = vision_pipeline.VisionReports()
+    base = {"original": (3840, 2160), "size": (1600, 900), "format": "WEBP"}
+    base.update(label="screen", prep_ms=40.0)
+    reports.add(dict(base, cached=False, bytes=120_000, total_ms=2400.0))
+    reports.add(dict(base, cached=True, bytes=0, total_ms=60.0))
+    stats = reports.stats()
+    assert stats["requests"] == 2 and stats["cached"] == 1
+    assert stats["bytes_p50"] == 120_000
+    assert stats["total_ms_p90"] == 2400.0
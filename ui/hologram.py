@@ -485,8 +485,11 @@ class VeraHologram:
         self.fetcher = ImageFetcher()
         self.vision_process = None
         self._cleanup_registered = False
+        self.stream_text = ""  # Reply being streamed into the bubble
+        self.bubble_timer = None
         self.current_accent = ACCENT_PRIMARY
         self.audio_monitor_active = False
+        self._monitor_token = None
 
         # Window setup
         self.root.overrideredirect(True)
@@ -625,6 +628,7 @@ class VeraHologram:
 
         # Hooks
         processor.gui_popup_hook = self.thread_safe_display
+        processor.gui_stream_hook = self.thread_safe_stream
         processor.toggle_hand_mouse = self.toggle_vision
 
         # Cleanup
@@ -633,9 +637,10 @@ class VeraHologram:
         # Start
         self.flash_status(self.current_accent, "ready")
         threading.Thread(target=self.run_voice_loop, daemon=True).start()
+        threading.Thread(target=processor.prewarm_speech_cache, daemon=True).start()
 
         if SOUNDDEVICE_AVAILABLE:
-            threading.Thread(target=self.audio_monitor, daemon=True).start()
+            self.audio_monitor()
 
         self.root.mainloop()
 
@@ -704,15 +709,15 @@ class VeraHologram:
 
         self.audio_monitor_active = True
 
-        def audio_callback(indata, frames, time_info, status):
+        def audio_callback(block):
             if self.audio_monitor_active:
-                volume = np.linalg.norm(indata) * 10
+                volume = np.linalg.norm(block) * 10
                 self.waveform.update_audio(min(volume, 100))
 
         try:
-            with sd.InputStream(callback=audio_callback):
-                while self.audio_monitor_active:
-                    sd.sleep(100)
+            # Rides on the shared capture instead of opening its own stream
+            if processor.mic.start():
+                self._monitor_token = processor.mic.subscribe(audio_callback)
         except Exception as e:
             print(f"!! AUDIO MONITOR ERROR: {e}")
 
@@ -768,6 +773,32 @@ class VeraHologram:
             except Exception as e:
                 print(f"!! REGEX ERROR: {e}")
 
+    def thread_safe_stream(self, text, done):
+        self.root.after(0, lambda: self.process_stream(text, done))
+
+    def process_stream(self, text, done):
+        """Streamed replies: one sentence at a time, then the full text once."""
+        if done:
+            clean_text = IMAGE_TAG_PATTERN.sub("", text).strip()
+            if len(clean_text) > LONG_TEXT_THRESHOLD:
+                ResultPopup(clean_text)
+                self.show_bubble("View full output →")
+            self.stream_text = ""
+            return
+
+        # Fetch images as soon as their tag arrives, not when the reply ends
+        for match in IMAGE_TAG_PATTERN.finditer(text):
+            try:
+                query = match.group(1).strip()
+                self.fetcher.executor.submit(self.render_image, query)
+            except Exception as e:
+                print(f"!! REGEX ERROR: {e}")
+
+        clean_text = IMAGE_TAG_PATTERN.sub("", text).strip()
+        if clean_text:
+            self.stream_text = f"{self.stream_text} {clean_text}".strip()
+            self.show_bubble(self.stream_text[-LONG_TEXT_THRESHOLD:])
+
     def render_image(self, query):
         img = self.fetcher.search_and_download(query)
         if img:
@@ -777,8 +808,11 @@ class VeraHologram:
         self.bubble.pack(side="bottom", pady=(10, 15))
         self.lbl_text.configure(text=text)
 
+        # A newer text (e.g. the next streamed sentence) restarts the clock
+        if self.bubble_timer:
+            self.root.after_cancel(self.bubble_timer)
         read_time = max(MIN_BUBBLE_TIME, len(text) * BUBBLE_TIME_PER_CHAR)
-        self.root.after(read_time, self.hide_bubble)
+        self.bubble_timer = self.root.after(read_time, self.hide_bubble)
 
     def hide_bubble(self):
         self.bubble.pack_forget()
@@ -820,10 +854,24 @@ class VeraHologram:
     def run_voice_loop(self):
         r = sr.Recognizer()
 
+        # Share the app-wide capture; fall back to PyAudio if sounddevice is missing
+        listen_gate = None
+        if SOUNDDEVICE_AVAILABLE:
+            mic_source = processor.mic_capture.SharedMicSource(processor.mic)
+            # Only hand audio to the recognizer once the VAD hears a voice
+            listen_gate = processor.vad.VoiceActivityDetector(
+                sample_rate=processor.mic.sample_rate
+            )
+        else:
+            mic_source = sr.Microphone()
+
         try:
-            with sr.Microphone() as source:
+            with mic_source as source:
                 r.adjust_for_ambient_noise(source, duration=0.8)
-                processor.speak("V.E.R.A. Systems online. Listening.")
+                processor.speak(
+                    "V.E.R.A. Systems online. Listening.",
+                    priority=processor.PRIORITY_CHATTER,
+                )
                 self.history_panel.add_command("System online", "success")
 
                 while True:
@@ -832,6 +880,8 @@ class VeraHologram:
                             self.waveform.set_listening(True)
                         self.flash_status(TEXT_SECONDARY, "listening")
 
+                        if listen_gate:
+                            source.stream.wait_for_speech(listen_gate)
                         audio = r.listen(source, timeout=None, phrase_time_limit=12)
 
                         self.flash_status(ACCENT_PRIMARY, "processing")
@@ -870,6 +920,24 @@ class VeraHologram:
 
     def _cleanup(self):
         self.audio_monitor_active = False
+        if self._monitor_token is not None:
+            processor.mic.unsubscribe(self._monitor_token)
+            self._monitor_token = None
+
+        try:
+            processor.mic.stop()
+        except:
+            pass
+
+        try:
+            processor.ai_ops.shutdown()
+        except:
+            pass
+
+        try:
+            processor.plan_cache.close()
+        except:
+            pass
 
         try:
             if self.vision_process: